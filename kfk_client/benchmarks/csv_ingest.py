@@ -0,0 +1,90 @@
+"""
+Rows/sec of CSV result ingestion: one INSERT and commit per row (the
+path before EmailInsertSink), bulk_create (executemany) and bulk_copy
+(COPY), each with the batch size of the sink.
+
+Runs against the database from the service settings, the inserted rows
+are deleted afterwards:
+
+    uv run python -m benchmarks.csv_ingest --rows 20000 --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from src.core.models.emails import Emails
+from src.core.repository.emails import EmailRepository
+from src.core.schemas.emails import EmailCreate
+from src.core.services.emails import EmailsService
+from src.database import async_session_factory, dispose
+
+
+def make_rows(count: int, tag: str) -> list[EmailCreate]:
+    return [
+        EmailCreate(
+            subject=tag,
+            from_email="sender@example.com",
+            to_email=f"user{i}@example.com",
+            message_body="Hello from the benchmark",
+            status="sent",
+        )
+        for i in range(count)
+    ]
+
+
+async def per_row(rows: list[EmailCreate]) -> None:
+    async with async_session_factory() as session:
+        service = EmailsService(EmailRepository(session))
+        for row in rows:
+            await service.create(row)
+
+
+async def bulk(rows: list[EmailCreate], batch_size: int, copy: bool) -> None:
+    for start in range(0, len(rows), batch_size):
+        async with async_session_factory() as session:
+            service = EmailsService(EmailRepository(session))
+            batch = rows[start : start + batch_size]
+            if copy:
+                await service.bulk_copy(batch)
+            else:
+                await service.bulk_create(batch)
+
+
+async def cleanup(tag: str) -> None:
+    async with async_session_factory() as session:
+        await session.execute(delete(Emails).where(Emails.subject == tag))
+        await session.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    strategies = {
+        "per-row create": per_row,
+        "bulk_create": lambda rows: bulk(rows, args.batch_size, copy=False),
+        "bulk_copy": lambda rows: bulk(rows, args.batch_size, copy=True),
+    }
+    try:
+        for name, ingest in strategies.items():
+            tag = f"benchmark-{uuid.uuid4().hex[:8]}"
+            rows = make_rows(args.rows, tag)
+            started = time.perf_counter()
+            try:
+                await ingest(rows)
+                elapsed = time.perf_counter() - started
+            finally:
+                await cleanup(tag)
+            print(f"{name:>15}: {args.rows / elapsed:10.1f} rows/sec")
+    finally:
+        await dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Send latency of a producer started per message vs one shared producer.
+
+Runs against the broker from docker-compose (or any local Kafka):
+
+    uv run python -m benchmarks.producer_latency --messages 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiokafka import AIOKafkaProducer
+
+
+def percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return (
+        f"p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms "
+        f"mean={statistics.fmean(samples) * 1000:.2f}ms"
+    )
+
+
+async def per_message(bootstrap: str, topic: str, payload: bytes, n: int) -> list[float]:
+    """The old path: a new producer is started and stopped for every send."""
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        producer = AIOKafkaProducer(bootstrap_servers=bootstrap)
+        await producer.start()
+        try:
+            await producer.send_and_wait(topic, payload)
+        finally:
+            await producer.stop()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def shared(bootstrap: str, topic: str, payload: bytes, n: int) -> list[float]:
+    """The lifespan path: one producer started once per process."""
+    producer = AIOKafkaProducer(bootstrap_servers=bootstrap)
+    await producer.start()
+    samples = []
+    try:
+        for _ in range(n):
+            start = time.perf_counter()
+            await producer.send_and_wait(topic, payload)
+            samples.append(time.perf_counter() - start)
+    finally:
+        await producer.stop()
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bootstrap", default="localhost:9092")
+    parser.add_argument("--topic", default="benchmark_producer")
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+    payload = b'{"subject": "benchmark", "to_email": "user@example.com"}'
+
+    # warm-up creates the topic and the broker connections
+    await shared(args.bootstrap, args.topic, payload, 10)
+    for name, run in (("per message", per_message), ("shared", shared)):
+        samples = await run(args.bootstrap, args.topic, payload, args.messages)
+        print(f"{name:>12}: {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Rows/sec of turning selected email rows into a JSON listing.
+
+"validate" builds every EmailRead with model_validate (the path before
+trusted reads), "construct" with model_construct (trusted_reads), both
+serialized with orjson as ORJSONResponse does. "orjson" dumps the row
+mappings straight, without read schemas.
+
+Needs no database, the rows are synthetic:
+
+    uv run python -m benchmarks.read_schema --rows 100000
+"""
+
+import argparse
+from datetime import datetime, timezone
+import time
+from typing import Callable
+
+import orjson
+
+from src.core.repository.emails import EmailRepository
+
+NOW = datetime.now(timezone.utc)
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "subject": f"Benchmark {i}",
+            "from_email": "sender@example.com",
+            "to_email": f"user{i}@example.com",
+            "message_body": "Hello from the benchmark",
+            "status": "sent",
+            "created_at": NOW,
+            "updated_at": NOW,
+        }
+        for i in range(count)
+    ]
+
+
+def schema_path(trusted: bool) -> Callable[[list[dict]], bytes]:
+    repository = EmailRepository(session=None)  # type: ignore[arg-type]
+    repository.trusted_reads = trusted
+
+    def run(rows: list[dict]) -> bytes:
+        objects = [repository.to_read_schema(row) for row in rows]  # type: ignore[arg-type]
+        return orjson.dumps([o.model_dump() for o in objects])
+
+    return run
+
+
+def raw_path(rows: list[dict]) -> bytes:
+    return orjson.dumps(rows)
+
+
+def measure(path: Callable[[list[dict]], bytes], rows: list[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        path(rows)
+        best = min(best, time.perf_counter() - started)
+    return len(rows) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    paths = {
+        "validate": schema_path(trusted=False),
+        "construct": schema_path(trusted=True),
+        "orjson": raw_path,
+    }
+    for name, path in paths.items():
+        rate = measure(path, rows, args.repeat)
+        print(f"{name:>9}: {rate:10.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,15 @@ from typing import Annotated, Any
 
 from fastapi import APIRouter, Form, HTTPException, status
 
-from src.api.dependencies.pagination import PaginationDep
+from src.api.dependencies.pagination import CursorPaginationDep
 from src.broker.broker import BrokerProducer
 from src.broker.dependencies import SendEmailTopicDep
 from src.core.schemas.api_message import BaseOutputMessage
+from src.core.repository.emails import EmailRepository
+from src.core.schemas.base import CursorPaginationResultSchema
 from src.core.schemas.emails import EmailCreate, EmailRead, EmailRequest
 from src.core.services.emails import EmailsService, EmailsServiceDep
+from src.utils.export import ExportFormat, export_response
 from src.utils.string import NOT_IMPLEMENTED
 from src.config import settings
 
@@ -50,10 +53,19 @@ async def send_test_email(
 
 @router.get(
     "/",
-    response_model=BaseOutputMessage[list[EmailRead]],
+    response_model=BaseOutputMessage[CursorPaginationResultSchema[EmailRead]],
 )
 async def get_emails(
     service: Annotated[EmailsService, EmailsServiceDep],
+    pagination: CursorPaginationDep,
 ):
-    emails = await service.get_all()
-    return BaseOutputMessage(data=emails, message="all_emails")
+    emails = await service.paginate_keyset(pagination)
+    return BaseOutputMessage(data=emails, message="all_emails").to_response()
+
+
+@router.get("/export")
+async def export_emails(export_format: ExportFormat = "ndjson"):
+    """
+    All emails as NDJSON or CSV, streamed from a server-side cursor.
+    """
+    return export_response(EmailRepository, export_format, filename="emails")
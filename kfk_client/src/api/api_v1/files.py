@@ -1,23 +1,55 @@
+import asyncio
 from logging import getLogger
 from pathlib import Path
-from typing import Annotated, Any
+from typing import Annotated, Any, AsyncIterator
 
 from fastapi.responses import FileResponse
-from fastapi import APIRouter, HTTPException, UploadFile, status, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, status, Depends
 
 
 from src.broker.broker import BrokerProducer
 from src.broker.dependencies import SendCsvTopicDep
 from src.config import settings
 from src.core.models.users import User
+from src.api.dependencies.pagination import CursorPaginationDep
 from src.core.schemas.api_message import BaseOutputMessage
+from src.core.repository.uploaded_file import UploadedFileRepository
+from src.core.schemas.base import CursorPaginationResultSchema
+from src.utils.export import ExportFormat, export_response
 from src.utils.string import NOT_IMPLEMENTED, name_to_snake
-from src.storage.dependencies import CsvStorageDep, validate_csv
-from src.storage.storage import StorageService
+from src.storage.dependencies import (
+    HEADER_SAMPLE_SIZE,
+    CsvStorageDep,
+    UploadStorageDep,
+    validate_csv,
+    validate_csv_header,
+)
+from src.storage.storage import (
+    LocalStorageService,
+    StorageService,
+    StoredFile,
+    iter_upload,
+)
+from src.storage.validation import CsvValidationResult, cleaned_csv
 
 # from src.broker.broker import broker, exch
 from src.api.api_v1.fastapi_users_main import current_active_user
-from src.core.schemas.uploaded_file import UploadedFileCreate, UploadedFileRead
+from src.core.schemas.uploaded_file import (
+    UploadedFileCreate,
+    UploadedFileRead,
+    UploadedFileValidationRead,
+    UploadSessionCreate,
+    UploadSessionRead,
+)
+from src.core.schemas.campaign_shard import (
+    CampaignProgressRead,
+    CampaignShardCreate,
+    CampaignShardMessage,
+)
+from src.core.services.campaign_shard import (
+    CampaignShardsService,
+    CampaignShardsServiceDep,
+)
 from src.core.services.uploaded_file import (
     UploadedFilesService,
     UploadedFilesServiceDep,
@@ -52,6 +84,166 @@ async def get_csv():
     )
 
 
+async def store_validated_csv(
+    filename: str,
+    chunks: AsyncIterator[bytes],
+    storage_service: StorageService,
+) -> tuple[StoredFile, CsvValidationResult]:
+    """
+    Validates every row and stores only the valid ones,
+    so invalid addresses never reach the broker.
+    """
+    async with cleaned_csv(chunks) as cleaned:
+        result = cleaned.result
+        if result.row_count == result.invalid_row_count:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": "CSV file has no valid rows",
+                    "invalid_rows": result.invalid_rows[:10],
+                },
+            )
+        stored_file = await storage_service.save_stream(filename, cleaned.chunks())
+    return stored_file, result
+
+
+async def register_uploaded_file(
+    filename: str,
+    stored_file: StoredFile,
+    validation: CsvValidationResult,
+    user: User,
+    response: Response,
+    storage_service: StorageService,
+    service: UploadedFilesService,
+    shards_service: CampaignShardsService,
+    broker: BrokerProducer,
+) -> BaseOutputMessage[UploadedFileRead]:
+    """
+    Creates the campaign record for a stored file and queues it,
+    applying `duplicate_policy` to files the user has already uploaded.
+    """
+    policy = settings.storage.duplicate_policy
+    if stored_file.sha256:
+        # held until the campaign is created: a concurrent delete_file of
+        # the same content removed the object before, or keeps it after
+        await service.lock_content(stored_file.sha256)
+        if not await storage_service.exists(stored_file.path):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The stored file was deleted while uploading, upload it again",
+            )
+    if stored_file.sha256 and policy != "allow":
+        existing = await service.get_by_content_hash(user.id, stored_file.sha256)
+        if existing and policy == "reject":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"File with the same content was already uploaded (id={existing.id})",
+            )
+        if existing:
+            logger.info(
+                "Duplicate upload of file %s by user %s, campaign is not queued",
+                existing.id,
+                user.id,
+            )
+            response.status_code = status.HTTP_200_OK
+            return BaseOutputMessage(data=existing, message="File Already Uploaded")
+
+    new_file = UploadedFileCreate(
+        file_name=filename,
+        user_id=user.id,
+        file_path=stored_file.path,
+        content_hash=stored_file.sha256,
+        file_size=stored_file.size,
+        row_count=validation.row_count,
+        invalid_row_count=validation.invalid_row_count,
+        invalid_rows=validation.invalid_rows,
+        fieldnames=validation.fieldnames,
+    )
+    new_file_record = await service.create(new_file)
+    if not new_file_record:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=NOT_IMPLEMENTED
+        )
+    ranges = validation.shard_ranges()
+    await shards_service.bulk_create(
+        [
+            CampaignShardCreate(
+                file_id=new_file_record.id,
+                shard=shard,
+                row_start=row_start,
+                row_count=row_count,
+                byte_start=byte_start,
+                byte_end=byte_end,
+            )
+            for shard, (row_start, row_count, byte_start, byte_end) in enumerate(ranges)
+        ]
+    )
+    failed = await publish_campaign(
+        new_file_record, validation.fieldnames, len(ranges), shards_service, broker
+    )
+    if failed:
+        return BaseOutputMessage(
+            data=new_file_record,
+            message=f"File Uploaded, {failed} of {len(ranges)} shards were not queued, "
+            f"retry with POST /files/{new_file_record.id}/publish",
+        )
+    return BaseOutputMessage(data=new_file_record, message="File Uploaded")
+
+
+async def publish_campaign(
+    uploaded_file: UploadedFileRead,
+    fieldnames: list[str],
+    shard_count: int,
+    shards_service: CampaignShardsService,
+    broker: BrokerProducer,
+) -> int:
+    """
+    Publishes the campaign as one message per shard, keyed by `file_id:shard`
+    so the shards spread over the topic partitions and its consumers.
+
+    Only shards that are not published yet or failed to publish are sent,
+    so calling it again for the same file is safe. Shards that fail to
+    publish are marked "failed", the number of them is returned.
+    """
+    shards = await shards_service.claim_unpublished(uploaded_file.id)
+    results = await asyncio.gather(
+        *(
+            broker.send_message(
+                value=CampaignShardMessage(
+                    **uploaded_file.model_dump(exclude={"row_count"}),
+                    shard=shard.shard,
+                    shard_count=shard_count,
+                    row_start=shard.row_start,
+                    row_count=shard.row_count,
+                    byte_start=shard.byte_start,
+                    byte_end=shard.byte_end,
+                    fieldnames=fieldnames,
+                ),
+                key=f"{uploaded_file.id}:{shard.shard}",
+            )
+            for shard in shards
+        ),
+        return_exceptions=True,
+    )
+    published, failed = [], []
+    for shard, result in zip(shards, results):
+        if isinstance(result, BaseException):
+            logger.error(
+                "Failed to queue shard %s of file %s: %s",
+                shard.shard,
+                uploaded_file.id,
+                result,
+            )
+            failed.append(shard.shard)
+        else:
+            published.append(shard.shard)
+    await shards_service.finish_publishing(uploaded_file.id, published, failed)
+    logger.info(
+        "File %s: %s shards queued, %s failed", uploaded_file.id, len(published), len(failed)
+    )
+    return len(failed)
+
+
 @router.post(
     "/upload_csv",
     dependencies=[Depends(validate_csv)],
@@ -60,31 +252,292 @@ async def get_csv():
 )
 async def upload_csv(
     file: UploadFile,
+    response: Response,
     storage_service: Annotated[StorageService, CsvStorageDep],
     user: Annotated[User, Depends(current_active_user)],
     service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+    shards_service: Annotated[CampaignShardsService, CampaignShardsServiceDep],
     broker: Annotated[BrokerProducer, SendCsvTopicDep],
 ) -> Any:
     """
     Uploads a CSV file and creates a campaign, queuing it for processing.
+    Answers 200 instead of 201 when the "skip" duplicate policy returns
+    an existing campaign.
     """
     filename = name_to_snake(file.filename, "csv")  # type: ignore
-    file_path = await storage_service.save_file(filename=filename, file=file)
-    new_file = UploadedFileCreate(
-        file_name=filename, user_id=user.id, file_path=file_path
+    stored_file, validation = await store_validated_csv(
+        filename, iter_upload(file), storage_service
     )
-    new_file_record = await service.create(new_file)
-    if not new_file_record:
+    return await register_uploaded_file(
+        filename,
+        stored_file,
+        validation,
+        user,
+        response,
+        storage_service,
+        service,
+        shards_service,
+        broker,
+    )
+
+
+######################
+## CHUNKED UPLOADS  ##
+######################
+
+
+async def get_user_upload(
+    upload_id: str,
+    storage_service: LocalStorageService,
+    user: User,
+) -> UploadSessionRead:
+    upload = await storage_service.get_upload(upload_id)
+    if upload.user_id != user.id:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail=NOT_IMPLEMENTED
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
         )
-    await broker.send_message(value=new_file_record)
-    return BaseOutputMessage(data=new_file_record, message="File Uploaded")
+    return upload
 
 
-@router.get("/", response_model=BaseOutputMessage[list[UploadedFileRead]])
+@router.post(
+    "/uploads",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BaseOutputMessage[UploadSessionRead],
+)
+async def create_upload(
+    upload_in: UploadSessionCreate,
+    storage_service: Annotated[LocalStorageService, UploadStorageDep],
+    user: Annotated[User, Depends(current_active_user)],
+) -> Any:
+    """
+    Starts a chunked upload session. Parts are sent with
+    `PUT /files/uploads/{upload_id}/parts/{part_number}` starting from 1.
+    """
+    if not upload_in.file_name.lower().endswith(".csv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV",
+        )
+    filename = name_to_snake(upload_in.file_name, "csv")
+    upload = await storage_service.create_upload(filename=filename, user_id=user.id)
+    return BaseOutputMessage(data=upload, message="Upload Created")
+
+
+@router.get(
+    "/uploads/{upload_id}",
+    response_model=BaseOutputMessage[UploadSessionRead],
+)
+async def get_upload(
+    upload_id: str,
+    storage_service: Annotated[LocalStorageService, UploadStorageDep],
+    user: Annotated[User, Depends(current_active_user)],
+) -> Any:
+    """
+    Returns the parts received so far, so an interrupted upload can be resumed.
+    """
+    upload = await get_user_upload(upload_id, storage_service, user)
+    return BaseOutputMessage(data=upload, message="Upload")
+
+
+@router.put(
+    "/uploads/{upload_id}/parts/{part_number}",
+    response_model=BaseOutputMessage[UploadSessionRead],
+)
+async def upload_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    storage_service: Annotated[LocalStorageService, UploadStorageDep],
+    user: Annotated[User, Depends(current_active_user)],
+) -> Any:
+    """
+    Streams the raw request body as a single part. Sending the same
+    part number again replaces the part.
+    """
+    if part_number < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Part number must start from 1",
+        )
+    await get_user_upload(upload_id, storage_service, user)
+    upload = await storage_service.write_part(
+        upload_id, part_number, request.stream()
+    )
+    return BaseOutputMessage(data=upload, message="Part Uploaded")
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BaseOutputMessage[UploadedFileRead],
+)
+async def complete_upload(
+    upload_id: str,
+    response: Response,
+    storage_service: Annotated[LocalStorageService, UploadStorageDep],
+    target_storage: Annotated[StorageService, CsvStorageDep],
+    user: Annotated[User, Depends(current_active_user)],
+    service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+    shards_service: Annotated[CampaignShardsService, CampaignShardsServiceDep],
+    broker: Annotated[BrokerProducer, SendCsvTopicDep],
+) -> Any:
+    """
+    Assembles the parts into the final CSV and creates a campaign.
+    The campaign is queued only after the file has been fully assembled.
+    """
+    upload = await get_user_upload(upload_id, storage_service, user)
+    if upload.parts:
+        validate_csv_header(
+            await storage_service.read_upload_head(upload_id, HEADER_SAMPLE_SIZE)
+        )
+    stored_file, validation = await store_validated_csv(
+        upload.file_name,
+        await storage_service.assemble_upload(upload_id),
+        target_storage,
+    )
+    await storage_service.abort_upload(upload_id)
+    return await register_uploaded_file(
+        upload.file_name,
+        stored_file,
+        validation,
+        user,
+        response,
+        target_storage,
+        service,
+        shards_service,
+        broker,
+    )
+
+
+@router.delete(
+    "/uploads/{upload_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def abort_upload(
+    upload_id: str,
+    storage_service: Annotated[LocalStorageService, UploadStorageDep],
+    user: Annotated[User, Depends(current_active_user)],
+) -> None:
+    await get_user_upload(upload_id, storage_service, user)
+    await storage_service.abort_upload(upload_id)
+
+
+@router.get(
+    "/",
+    response_model=BaseOutputMessage[CursorPaginationResultSchema[UploadedFileRead]],
+)
 async def get_all_files(
     service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+    pagination: CursorPaginationDep,
 ):
-    resutl = await service.get_all()
-    return BaseOutputMessage(data=resutl, message="all_uploaded_files")
+    resutl = await service.paginate_keyset(pagination)
+    return BaseOutputMessage(data=resutl, message="all_uploaded_files").to_response()
+
+
+@router.get("/export")
+async def export_files(export_format: ExportFormat = "ndjson"):
+    """
+    All uploaded file records as NDJSON or CSV, streamed from a server-side cursor.
+    """
+    return export_response(UploadedFileRepository, export_format, filename="files")
+
+
+@router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_file(
+    file_id: int,
+    storage_service: Annotated[StorageService, CsvStorageDep],
+    user: Annotated[User, Depends(current_active_user)],
+    service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+) -> None:
+    """
+    Deletes the campaign record. The stored object is removed
+    only when no other campaign references the same content.
+    """
+    uploaded_file = await service.get_by_id(file_id)
+    if uploaded_file is None or uploaded_file.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    if uploaded_file.content_hash is None:
+        await service.delete(file_id)
+        await storage_service.delete_file(uploaded_file.file_path)
+        return
+    await service.delete_with_content(
+        file_id,
+        uploaded_file.content_hash,
+        lambda: storage_service.delete_file(uploaded_file.file_path),
+    )
+
+
+@router.get(
+    "/{file_id}/validation",
+    response_model=BaseOutputMessage[UploadedFileValidationRead],
+)
+async def get_file_validation(
+    file_id: int,
+    user: Annotated[User, Depends(current_active_user)],
+    service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+) -> Any:
+    """
+    Row counts and the report of rows dropped at upload time.
+    """
+    uploaded_file = await service.get_by_id(file_id)
+    if uploaded_file is None or uploaded_file.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    report = await service.get_validation_report(file_id)
+    return BaseOutputMessage(data=report, message="File Validation")
+
+
+@router.get(
+    "/{file_id}/progress",
+    response_model=BaseOutputMessage[CampaignProgressRead],
+)
+async def get_file_progress(
+    file_id: int,
+    user: Annotated[User, Depends(current_active_user)],
+    service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+    shards_service: Annotated[CampaignShardsService, CampaignShardsServiceDep],
+) -> Any:
+    """
+    Campaign progress summed over its shards.
+    """
+    uploaded_file = await service.get_by_id(file_id)
+    if uploaded_file is None or uploaded_file.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    progress = await shards_service.get_progress(file_id)
+    return BaseOutputMessage(data=progress, message="Campaign Progress")
+
+
+@router.post(
+    "/{file_id}/publish",
+    response_model=BaseOutputMessage[CampaignProgressRead],
+)
+async def publish_file(
+    file_id: int,
+    user: Annotated[User, Depends(current_active_user)],
+    service: Annotated[UploadedFilesService, UploadedFilesServiceDep],
+    shards_service: Annotated[CampaignShardsService, CampaignShardsServiceDep],
+    broker: Annotated[BrokerProducer, SendCsvTopicDep],
+) -> Any:
+    """
+    Queues the shards of a campaign that failed to publish.
+    Shards that are already queued are not sent again.
+    """
+    uploaded_file = await service.get_by_id(file_id)
+    if uploaded_file is None or uploaded_file.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    fieldnames = await service.get_fieldnames(file_id)
+    if fieldnames is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The CSV header of this file was not kept, upload it again",
+        )
+    progress = await shards_service.get_progress(file_id)
+    failed = await publish_campaign(
+        uploaded_file, fieldnames, len(progress.shards), shards_service, broker
+    )
+    if failed:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{failed} shards could not be queued, try again later",
+        )
+    progress = await shards_service.get_progress(file_id)
+    return BaseOutputMessage(data=progress, message="Campaign Queued")
@@ -1,6 +1,7 @@
 from typing import Annotated
 from fastapi import Depends
-from src.core.schemas.base import PaginationBaseSchema
+from src.core.schemas.base import CursorPaginationSchema, PaginationBaseSchema
 
 
 PaginationDep = Annotated[PaginationBaseSchema, Depends(PaginationBaseSchema)]
+CursorPaginationDep = Annotated[CursorPaginationSchema, Depends(CursorPaginationSchema)]
@@ -2,7 +2,10 @@ __all__ = [
     "MessageConsumer",
     "start_consumers",
     "stop_consumers",
+    "start_producer",
+    "stop_producer",
 ]
 
 from .consumer_base import MessageConsumer
+from .broker import start_producer, stop_producer
 from .utils import start_consumers, stop_consumers
@@ -1,8 +1,9 @@
 import logging
 
 from aiokafka import AIOKafkaProducer
+from pydantic import BaseModel
 
-from src.core.schemas.base import CreateBaseModel
+from src.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -16,22 +17,51 @@ class BrokerProducer:
         self.producer = producer
         self.topic = topic
 
-    async def open_connection(self) -> None:
-        await self.producer.start()
-
-    async def close_connection(self) -> None:
-        if self.producer is not None:
-            await self.producer.stop()
-
     # Send message and confirm
-    async def send_message(self, value: CreateBaseModel) -> None:
-        await self.open_connection()
+    async def send_message(self, value: BaseModel, key: str | None = None) -> None:
         encoded_value = value.model_dump_json().encode()
+        encoded_key = key.encode() if key is not None else None
         try:
-            await self.producer.send(topic=self.topic, value=encoded_value)
+            await self.producer.send_and_wait(
+                topic=self.topic, value=encoded_value, key=encoded_key
+            )
         except Exception as e:
             logger.error("Failed, error: %s", (str(e)))
             raise Exception(f"Failed to send message: {str(e)}")
-        finally:
-            await self.close_connection()
-            logger.debug("Stopping producer")
+
+
+#######################
+### Shared Producer ###
+#######################
+
+# One producer per process (gunicorn worker), started in the app lifespan
+_producer: AIOKafkaProducer | None = None
+
+
+async def start_producer() -> None:
+    global _producer
+    if _producer is not None:
+        return
+    producer = AIOKafkaProducer(
+        bootstrap_servers=settings.broker.kafka_bootstrap_servers
+    )
+    await producer.start()
+    _producer = producer
+    logger.info("Producer started")
+
+
+async def stop_producer() -> None:
+    global _producer
+    if _producer is None:
+        return
+    try:
+        await _producer.stop()
+    finally:
+        _producer = None
+        logger.info("Producer stopped")
+
+
+def get_producer() -> AIOKafkaProducer:
+    if _producer is None:
+        raise RuntimeError("Producer is not started")
+    return _producer
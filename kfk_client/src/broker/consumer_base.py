@@ -4,9 +4,10 @@ import asyncio
 from typing import Self
 import logging
 
-logger = logging.getLogger(__name__)
+from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition
+from kfk_common.partitions import PartitionRunner
 
-from aiokafka import AIOKafkaConsumer
+logger = logging.getLogger(__name__)
 
 ######################
 ### Consumer Base  ###
@@ -18,6 +19,40 @@ class ConsumeBase(ABC):
     async def process_message(self, msg: str):
         pass
 
+    async def process_record(self, record: ConsumerRecord) -> None:
+        """Process a raw Kafka record. Override to use topic/partition/offset."""
+        if record.value is not None:
+            await self.process_message(record.value.decode("utf-8"))
+
+    async def process_batch(self, records: list[ConsumerRecord]) -> None:
+        """
+        Process a whole getmany() batch. Offsets are committed once this
+        returns, so buffered writes must be flushed before returning.
+        Raising makes the consumer redeliver the batch.
+        """
+        for record in records:
+            try:
+                await self.process_record(record)
+            except Exception as e:
+                logger.error(f"Error while processing message: {e}")
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Persist buffered state."""
+        pass
+
+    async def reset(self) -> None:
+        """Drop buffered state of a failed batch before it is redelivered."""
+        pass
+
+    async def close(self) -> None:
+        """Flush any buffered state before the consumer stops."""
+        pass
+
+
+# Pause before a failed batch is redelivered
+BATCH_RETRY_DELAY = 1
+
 
 class MessageConsumer:
     def __init__(
@@ -26,12 +61,16 @@ class MessageConsumer:
         group_id: str,
         bootstrap_servers: str,
         loop: AbstractEventLoop,
+        enable_auto_commit: bool = True,
     ):
+        self.topic = topic
+        self.runner: PartitionRunner | None = None
         self.consumer = AIOKafkaConsumer(
             topic,
             group_id=group_id,
             bootstrap_servers=bootstrap_servers,
             loop=loop,
+            enable_auto_commit=enable_auto_commit,
             # auto_offset_reset="latest",  # Начинать с последних сообщений
             # max_poll_records=10,  # Ограничить количество сообщений за опрос
             # max_poll_interval_ms=10000,  # Увеличить интервал опроса
@@ -39,6 +78,9 @@ class MessageConsumer:
             # heartbeat_interval_ms=3000,  # Интервал heartbeat
         )
 
+    async def commit(self, offsets: dict[TopicPartition, int]) -> None:
+        await self.consumer.commit(offsets)
+
     async def consume_message(
         self: Self,
         message_service: ConsumeBase,
@@ -48,9 +90,7 @@ class MessageConsumer:
         try:
             async for message in self.consumer:
                 try:
-                    if message.value is not None:
-                        decoded_message = message.value.decode("utf-8")
-                        await message_service.process_message(decoded_message)
+                    await message_service.process_record(message)
                 except Exception as e:
                     logger.error(f"Error while processing message: {e}")
                 continue
@@ -61,5 +101,90 @@ class MessageConsumer:
             logger.warning("KeyboardInterrupt. Buy!")
             await self.consumer.stop()
         finally:
+            try:
+                await message_service.close()
+            except Exception as e:
+                logger.error("Failed to close message service: %s", e)
+            await self.consumer.stop()
+            logger.info("Consumer stopped")
+
+    async def consume_batches(
+        self: Self,
+        message_service: ConsumeBase,
+        max_records: int,
+        timeout_ms: int,
+    ):
+        """
+        At-least-once batch consumption, requires `enable_auto_commit=False`.
+        Offsets are committed only after `process_batch` succeeds, a failed
+        batch is fetched again from its first offset.
+        """
+        await self.consumer.start()
+        logger.info("Consumer started in batch mode")
+        try:
+            while True:
+                batches = await self.consumer.getmany(
+                    timeout_ms=timeout_ms,
+                    max_records=max_records,
+                )
+                if not batches:
+                    continue
+                records = [record for part in batches.values() for record in part]
+                try:
+                    await message_service.process_batch(records)
+                except Exception as e:
+                    logger.error("Error while processing batch: %s", e)
+                    await message_service.reset()
+                    for tp, part in batches.items():
+                        self.consumer.seek(tp, part[0].offset)
+                    await asyncio.sleep(BATCH_RETRY_DELAY)
+                    continue
+                try:
+                    await self.consumer.commit(
+                        {tp: part[-1].offset + 1 for tp, part in batches.items()}
+                    )
+                except Exception as e:
+                    logger.error("Failed to commit batch offsets: %s", e)
+
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+        finally:
+            try:
+                await message_service.close()
+            except Exception as e:
+                logger.error("Failed to close message service: %s", e)
+            await self.consumer.stop()
+            logger.info("Consumer stopped")
+
+    async def consume_partitions(
+        self: Self,
+        message_service: ConsumeBase,
+        queue_size: int,
+        commit_interval_ms: int,
+        max_records: int,
+    ):
+        """
+        Process partitions concurrently, keeping order inside each partition.
+        Requires `enable_auto_commit=False`.
+        """
+        self.runner = PartitionRunner(
+            consumer=self.consumer,
+            message_service=message_service,
+            queue_size=queue_size,
+            commit_interval_ms=commit_interval_ms,
+            max_records=max_records,
+        )
+        self.consumer.subscribe([self.topic], listener=self.runner)
+        await self.consumer.start()
+        logger.info("Consumer started in partitioned mode")
+        try:
+            await self.runner.run()
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+        finally:
+            try:
+                await message_service.close()
+            except Exception as e:
+                logger.error("Failed to close message service: %s", e)
             await self.consumer.stop()
             logger.info("Consumer stopped")
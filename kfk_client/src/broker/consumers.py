@@ -1,23 +1,17 @@
-from abc import ABC, abstractmethod
-import asyncio
-from email.message import EmailMessage
 import logging
-from typing import AsyncGenerator, Final
 
-from pydantic import BaseModel, ValidationError
-from sqlalchemy.exc import DatabaseError
+from aiokafka import ConsumerRecord, TopicPartition
+from pydantic import ValidationError
 
-from src.core.repository.emails import EmailRepository
 from src.core.schemas.emails import (
     CsvQueueReturn,
     EmailCreate,
     EmailQueueReturn,
     EmailUpdate,
 )
-from src.core.services.emails import EmailsService
-from src.database import get_db_async
 
 from .consumer_base import ConsumeBase
+from .sinks import CommitOffsets, CsvResult, EmailInsertSink, StatusUpdateSink
 
 from src.config import settings
 
@@ -25,48 +19,109 @@ logger = logging.getLogger(__name__)
 
 
 class ConsumeEmail(ConsumeBase):
+    """
+    Status replies are micro-batched by StatusUpdateSink and applied in a
+    single transaction. Offsets are committed only after the DB commit.
+    """
+
+    def __init__(self, commit: CommitOffsets | None = None):
+        self.sink = StatusUpdateSink(
+            batch_size=settings.consumer.status_batch_size,
+            flush_interval_ms=settings.consumer.status_flush_interval_ms,
+            commit=commit,
+            max_retries=settings.consumer.sink_max_retries,
+        )
+
     async def process_message(self, msg: str):
+        await self.sink.add(self._parse(msg))
+
+    async def process_record(self, record: ConsumerRecord) -> None:
+        tp = TopicPartition(record.topic, record.partition)
+        email_to_update = None
+        if record.value is not None:
+            email_to_update = self._parse(record.value.decode("utf-8"))
+        await self.sink.add(email_to_update, tp, record.offset)
+
+    async def process_batch(self, records: list[ConsumerRecord]) -> None:
+        with self.sink.hold():
+            await super().process_batch(records)
+
+    async def flush(self) -> None:
+        await self.sink.flush()
 
+    async def reset(self) -> None:
+        await self.sink.clear()
+
+    async def close(self) -> None:
+        await self.sink.stop()
+
+    def _parse(self, msg: str) -> EmailUpdate | None:
         try:
-            db_session_gen = get_db_async()
-            session = await anext(db_session_gen)
-            service = EmailsService(EmailRepository(session))
-            await asyncio.sleep(0)
             message: EmailQueueReturn = EmailQueueReturn.model_validate_json(msg)
             logger.info('Received message:  "%s"', message.status_message)
-            email_to_update = EmailUpdate(**message.__dict__)
-            await service.update(email_to_update)
-            logger.info('Message processed:  "%s"', message.status_message)
-        except DatabaseError as e:
-            logger.error("Database error: %s", e)
-        except Exception as e:
-            logger.error("Unexpected error: %s", e)
-        finally:
-            await session.close()
-            await asyncio.sleep(0)
+            if message.id is None:
+                logger.error('Message has no email id: "%s"', message.status_message)
+                return None
+            return EmailUpdate(**message.__dict__)
+        except ValidationError as e:
+            logger.error("Validation error: %s", e)
+        return None
 
 
 class ConsumeCSV(ConsumeBase):
+    """
+    CSV campaign results are inserted in batches by EmailInsertSink.
+    Offsets are committed only after the rows are stored.
+    """
+
+    def __init__(self, commit: CommitOffsets | None = None):
+        self.sink = EmailInsertSink(
+            batch_size=settings.consumer.csv_batch_size,
+            flush_interval_ms=settings.consumer.csv_flush_interval_ms,
+            commit=commit,
+            max_retries=settings.consumer.sink_max_retries,
+            mode=settings.consumer.csv_ingest_mode,
+        )
+
     async def process_message(self, msg: str):
-        try:
-            db_session_gen = get_db_async()
+        await self.sink.add(self._parse(msg))
 
-            session = await anext(db_session_gen)
-            service = EmailsService(EmailRepository(session))
-            message: CsvQueueReturn = CsvQueueReturn.model_validate_json(msg)
-            logger.info('Received message:  "%s"', message.status_message)
+    async def process_record(self, record: ConsumerRecord) -> None:
+        tp = TopicPartition(record.topic, record.partition)
+        email_to_create = None
+        if record.value is not None:
+            email_to_create = self._parse(record.value.decode("utf-8"))
+        await self.sink.add(email_to_create, tp, record.offset)
+
+    async def process_batch(self, records: list[ConsumerRecord]) -> None:
+        with self.sink.hold():
+            await super().process_batch(records)
 
-            if message.status == "error" or message.subject == "no_subject":
-                logger.error('Message has error: "%s"', message.status_message)
-                return
+    async def flush(self) -> None:
+        await self.sink.flush()
 
-            email_to_create = EmailCreate(**message.__dict__)
-            await service.create(email_to_create)
+    async def reset(self) -> None:
+        await self.sink.clear()
 
-        except DatabaseError as e:
-            logger.error('Database error: "%s"', e)
-        except Exception as e:
-            logger.error('Unexpected error: "%s"', e)
-        finally:
-            await session.close()
-            await asyncio.sleep(0)
+    async def close(self) -> None:
+        await self.sink.stop()
+
+    def _parse(self, msg: str) -> CsvResult | None:
+        # failed rows are kept as well, they count towards the shard progress
+        try:
+            message: CsvQueueReturn = CsvQueueReturn.model_validate_json(msg)
+            logger.info('Received message:  "%s"', message.status_message)
+        except ValidationError as e:
+            logger.error('Validation error: "%s"', e)
+            return None
+
+        if message.shard_failed:
+            return CsvResult(message, None)
+        if message.status == "error" or message.subject == "no_subject":
+            logger.error('Message has error: "%s"', message.status_message)
+            return CsvResult(message, None)
+        try:
+            return CsvResult(message, EmailCreate(**message.__dict__))
+        except ValidationError as e:
+            logger.error('Validation error: "%s"', e)
+            return CsvResult(message, None)
@@ -1,16 +1,13 @@
-from functools import lru_cache
 from fastapi import Depends
 from aiokafka import AIOKafkaProducer
 
 from src.config import settings
 
-from .broker import BrokerProducer
+from .broker import BrokerProducer, get_producer
 
 
-# @lru_cache
 async def get_broker() -> AIOKafkaProducer:
-    return AIOKafkaProducer(bootstrap_servers=settings.broker.kafka_bootstrap_servers)
-    # return AIOKafkaProducer(bootstrap_servers="localhost:9092")
+    return get_producer()
 
 
 async def get_send_mail_producer(
@@ -0,0 +1,245 @@
+from abc import ABC, abstractmethod
+import asyncio
+from contextlib import contextmanager
+import logging
+from typing import Awaitable, Callable, Generic, Iterator, Literal, NamedTuple, TypeVar
+
+from aiokafka import TopicPartition
+
+from src.core.repository.campaign_shard import CampaignShardRepository
+from src.core.repository.emails import EmailRepository
+from src.core.schemas.emails import CsvQueueReturn, EmailCreate, EmailUpdate
+from src.core.services.campaign_shard import CampaignShardsService
+from src.core.services.emails import EmailsService
+from src.database import async_session_factory
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CommitOffsets = Callable[[dict[TopicPartition, int]], Awaitable[None]]
+
+
+##################
+### Batch Sink ###
+##################
+
+
+class BatchSink(ABC, Generic[T]):
+    """
+    Micro-batching sink.
+
+    Items are collected until `batch_size` is reached or `flush_interval_ms`
+    has passed, then written in one go by `write`. Kafka offsets of the
+    written items are committed only after `write` succeeds. On failure the
+    items stay buffered and are retried on the next flush, a batch that
+    still fails after `max_retries` retries is handed to `dead_letter` and
+    dropped, so one poison batch cannot stall the partition.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval_ms: int,
+        commit: CommitOffsets | None = None,
+        max_retries: int = 3,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.commit = commit
+        self.max_retries = max_retries
+        self._items: list[T] = []
+        self._offsets: dict[TopicPartition, int] = {}
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        # consecutive failed writes, kept across clear() so that a batch
+        # redelivered by the consumer still counts its earlier attempts
+        self._failures = 0
+        self._held = 0
+
+    @abstractmethod
+    async def write(self, items: list[T]) -> None:
+        pass
+
+    async def dead_letter(self, items: list[T], error: Exception) -> None:
+        """Called with a batch that is given up on. Logs it by default."""
+        logger.error(
+            "%s dropped %s items after %s failed writes: %s, items: %s",
+            type(self).__name__,
+            len(items),
+            self._failures,
+            error,
+            items,
+        )
+
+    async def add(
+        self,
+        item: T | None,
+        tp: TopicPartition | None = None,
+        offset: int | None = None,
+    ) -> None:
+        """
+        Buffer an item. `item=None` only marks the offset as processed
+        (e.g. for a message that failed validation).
+        """
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+        async with self._lock:
+            if item is not None:
+                self._items.append(item)
+            if tp is not None and offset is not None:
+                self._offsets[tp] = max(self._offsets.get(tp, -1), offset)
+            if len(self._items) >= self.batch_size and not self._held:
+                await self._flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._flush()
+
+    async def clear(self) -> None:
+        async with self._lock:
+            self._items, self._offsets = [], {}
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """
+        Suspend the size and timer triggered flushes, e.g. while a consumer
+        batch is processed, so that no part of it is written before the
+        whole batch is. Explicit `flush()` calls still write.
+        """
+        self._held += 1
+        try:
+            yield
+        finally:
+            self._held -= 1
+
+    async def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await self.flush()
+
+    async def _flush(self) -> None:
+        if not self._items and not self._offsets:
+            return
+        items, offsets = self._items, self._offsets
+        if items:
+            try:
+                await self.write(items)
+            except Exception as e:
+                self._failures += 1
+                if self._failures <= self.max_retries:
+                    raise
+                await self.dead_letter(items, e)
+            self._failures = 0
+        self._items, self._offsets = [], {}
+        if self.commit is not None and offsets:
+            try:
+                await self.commit({tp: offset + 1 for tp, offset in offsets.items()})
+            except Exception as e:
+                # The items are written, a redelivery writes them once more
+                logger.error("Failed to commit offsets: %s", e)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._held:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush %s: %s", type(self).__name__, e)
+
+
+###################
+### Status Sink ###
+###################
+
+
+class StatusUpdateSink(BatchSink[EmailUpdate]):
+    """Applies email status replies with one executemany UPDATE per batch."""
+
+    async def write(self, items: list[EmailUpdate]) -> None:
+        # Keep only the latest status per email
+        latest = list({item.id: item for item in items}.values())
+        async with async_session_factory() as session:
+            service = EmailsService(EmailRepository(session))
+            await service.bulk_update(latest)
+        logger.info("Updated %s email statuses", len(latest))
+
+
+#######################
+### CSV Result Sink ###
+#######################
+
+
+class CsvResult(NamedTuple):
+    reply: CsvQueueReturn
+    # validated row to insert, None for a row that failed
+    email: EmailCreate | None
+
+    @property
+    def row(self) -> tuple[int, int, int] | None:
+        """(file_id, shard, row_index) of the reply, None if it has no row."""
+        reply = self.reply
+        if reply.file_id is None or reply.shard is None or reply.row_index is None:
+            return None
+        return reply.file_id, reply.shard, reply.row_index
+
+
+class EmailInsertSink(BatchSink[CsvResult]):
+    """
+    Inserts CSV campaign results in bulk, with executemany or COPY,
+    and adds the sent / failed rows to the progress of their shards
+    in the same transaction, so a retried batch is never inserted twice.
+    Every row is recorded in campaign_rows first: a reply that the mail
+    service publishes again after a redelivery is neither inserted nor
+    counted a second time.
+    """
+
+    def __init__(self, *args, mode: Literal["insert", "copy"] = "insert", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.mode = mode
+
+    async def write(self, items: list[CsvResult]) -> None:
+        async with async_session_factory() as session:
+            shards = CampaignShardsService(CampaignShardRepository(session))
+            new_rows = await shards.claim_rows(
+                list({item.row for item in items if item.row is not None}),
+                commit=False,
+            )
+            emails: list[EmailCreate] = []
+            # (file_id, shard) -> [sent, errors, shard failed]
+            progress: dict[tuple[int, int], list] = {}
+            for item in items:
+                reply, email = item
+                if item.row is not None:
+                    if item.row not in new_rows:
+                        continue
+                    # a reply repeated inside the batch is stored once as well
+                    new_rows.discard(item.row)
+                counters = None
+                if reply.file_id is not None and reply.shard is not None:
+                    key = (reply.file_id, reply.shard)
+                    counters = progress.setdefault(key, [0, 0, False])
+                if reply.shard_failed:
+                    if counters is not None:
+                        counters[2] = True
+                    continue
+                if email is not None:
+                    emails.append(email)
+                if counters is not None:
+                    counters[0 if email is not None else 1] += 1
+
+            if emails:
+                service = EmailsService(EmailRepository(session))
+                if self.mode == "copy":
+                    await service.bulk_copy(emails, commit=False)
+                else:
+                    await service.bulk_create(emails, commit=False)
+            await shards.add_progress(
+                {key: tuple(value) for key, value in progress.items()}, commit=False
+            )
+            await session.commit()
+        logger.info("Inserted %s emails", len(emails))
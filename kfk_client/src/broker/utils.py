@@ -3,24 +3,64 @@ from typing import List
 import logging
 
 from src.broker import MessageConsumer
+from src.broker.consumer_base import ConsumeBase
 from src.config import settings
 from src.broker.consumers import ConsumeEmail, ConsumeCSV
 
-event_loop = asyncio.get_event_loop()
-
 logger = logging.getLogger(__name__)
 
 
+running_consumers: List[MessageConsumer] = []
+
+
+def _sink_commit(consumer: MessageConsumer):
+    # In batch/partitioned mode the consumer commits after flushing, not the sink
+    if settings.consumer.mode != "stream":
+        return None
+    return consumer.commit
+
+
+async def _consume(consumer: MessageConsumer, message_service: ConsumeBase) -> None:
+    running_consumers.append(consumer)
+    try:
+        if settings.consumer.mode == "batch":
+            await consumer.consume_batches(
+                message_service=message_service,
+                max_records=settings.consumer.batch_max_records,
+                timeout_ms=settings.consumer.batch_timeout_ms,
+            )
+        elif settings.consumer.mode == "partitioned":
+            await consumer.consume_partitions(
+                message_service=message_service,
+                queue_size=settings.consumer.partition_queue_size,
+                commit_interval_ms=settings.consumer.commit_interval_ms,
+                max_records=settings.consumer.batch_max_records,
+            )
+        else:
+            await consumer.consume_message(message_service=message_service)
+    finally:
+        running_consumers.remove(consumer)
+
+
+def get_consumers_lag() -> dict[str, dict]:
+    """Per-partition lag of consumers running in partitioned mode."""
+    return {
+        consumer.topic: consumer.runner.lag()
+        for consumer in running_consumers
+        if consumer.runner is not None
+    }
+
+
 async def start_email_consuming(group_id: str = "EmailGroupRecieveID") -> None:
     consumer = MessageConsumer(
         topic=settings.broker.receive_topic,
         group_id=group_id,
         bootstrap_servers=settings.broker.kafka_bootstrap_servers,
-        loop=event_loop,
-    )
-    await consumer.consume_message(
-        message_service=ConsumeEmail(),
+        loop=asyncio.get_running_loop(),
+        # offsets are committed only after the DB commit
+        enable_auto_commit=False,
     )
+    await _consume(consumer, ConsumeEmail(commit=_sink_commit(consumer)))
 
     logger.info("Email consumer started")
 
@@ -30,11 +70,11 @@ async def start_csv_consuming() -> None:
         topic=settings.broker.receive_csv_topic,
         group_id="CSVGroupReceiveID",
         bootstrap_servers=settings.broker.kafka_bootstrap_servers,
-        loop=event_loop,
-    )
-    await consumer.consume_message(
-        message_service=ConsumeCSV(),
+        loop=asyncio.get_running_loop(),
+        # offsets are committed only after the DB commit
+        enable_auto_commit=False,
     )
+    await _consume(consumer, ConsumeCSV(commit=_sink_commit(consumer)))
     logger.info("Csv consumer started")
 
 
@@ -1,5 +1,5 @@
 from typing import Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
@@ -21,6 +21,12 @@ class GunicornConfig(BaseModel):
     timeout: int = 600  # 10 minutes
 
 
+class RunConfig(BaseModel):
+    # "api": HTTP only, "consumer": Kafka consumers only,
+    # "all": HTTP and consumers inside every gunicorn worker
+    mode: Literal["api", "consumer", "all"] = "all"
+
+
 class AuthJWT(BaseModel):
     private_key_path: Path = BASE_DIR / "src" / "certs" / "jwt-private.pem"
     public_key_path: Path = BASE_DIR / "src" / "certs" / "jwt-public.pem"
@@ -42,8 +48,13 @@ class DatabaseConfig(BaseModel):
 
     echo: bool = False
     echo_pool: bool = False
-    pool_size: int = 50
+    # per process: every gunicorn worker and consumer process opens up to
+    # pool_size + max_overflow connections, the sum over all processes must
+    # stay below the max_connections of Postgres (100 by default)
+    pool_size: int = 5
     max_overflow: int = 10
+    # rows fetched per server-side cursor round trip by the export endpoints
+    stream_chunk_size: int = 1000
     naming_convention: dict[str, str] = {
         "ix": "ix_%(column_0_label)s",
         "uq": "uq_%(table_name)s_%(column_0_N_name)s",
@@ -75,13 +86,49 @@ class AccessToken(BaseModel):
 
 
 class StorageConfig(BaseModel):
-    storage_type: Literal["local", "google_drive"] = "local"
+    storage_type: Literal["local", "google_drive", "s3"] = "local"
     local_storage_csv_path: str = "src/static/csv"
     local_storage_template_path: str = "src/static/templates"
+    # S3-compatible object store (MinIO in docker-compose)
+    s3_endpoint_url: str = "http://localhost:9010"
+    s3_region: str = "us-east-1"
+    s3_bucket: str = "campaigns"
+    # required with storage_type "s3", there are no default credentials
+    s3_access_key: str | None = None
+    s3_secret_key: str | None = None
+    s3_part_size: int = 8 * 1024 * 1024  # 8MB, S3 minimum is 5MB
+    s3_max_connections: int = 20
     google_drive_csv_folder_id: str
     google_drive_templ_folder_id: str
     google_drive_credentials_path: str
+    google_drive_max_workers: int = 4
+    # resumable upload / download chunk, must be a multiple of 256KB
+    google_drive_chunk_size: int = 8 * 1024 * 1024
+    # override the API root, e.g. to point at a local stand-in
+    google_drive_api_endpoint: str | None = None
     template_file_path: str | Path = BASE_DIR / "src" / "static"
+    max_upload_size: int = 500 * 1024 * 1024  # 500MB
+    upload_chunk_size: int = 1024 * 1024  # 1MB
+    upload_part_max_size: int = 64 * 1024 * 1024  # 64MB
+    # what to do when a user uploads a file with the same content again:
+    # "allow" - create a new campaign, "reject" - 409, "skip" - return the existing one
+    duplicate_policy: Literal["allow", "reject", "skip"] = "skip"
+    # upload-time row validation
+    validation_workers: int = 2
+    validation_process_min_size: int = 16 * 1024 * 1024  # 16MB, smaller files use a thread
+    validation_tmp_dir: str | None = None
+    invalid_rows_report_limit: int = 1000
+    # a campaign is published as shards of this many rows, one Kafka message each
+    csv_shard_rows: int = 10000
+
+    @model_validator(mode="after")
+    def check_s3_credentials(self) -> "StorageConfig":
+        if self.storage_type == "s3" and not (self.s3_access_key and self.s3_secret_key):
+            raise ValueError(
+                "storage.s3_access_key and storage.s3_secret_key are required "
+                'with storage_type "s3"'
+            )
+        return self
 
 
 class BrokerConfig(BaseModel):
@@ -92,6 +139,25 @@ class BrokerConfig(BaseModel):
     receive_csv_topic: str = "receive_csv"
 
 
+class ConsumerConfig(BaseModel):
+    # "stream": one message at a time, "batch": getmany() + explicit commit,
+    # "partitioned": one concurrent worker per assigned partition
+    mode: Literal["stream", "batch", "partitioned"] = "stream"
+    batch_max_records: int = 500
+    batch_timeout_ms: int = 1000
+    partition_queue_size: int = 1000
+    commit_interval_ms: int = 1000
+    # EmailQueueReturn status updates
+    status_batch_size: int = 500
+    status_flush_interval_ms: int = 200
+    # CsvQueueReturn rows ingestion
+    csv_batch_size: int = 1000
+    csv_flush_interval_ms: int = 500
+    csv_ingest_mode: Literal["insert", "copy"] = "insert"
+    # failed sink writes retried before the batch is dropped and its offsets committed
+    sink_max_retries: int = 3
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=("../.env.template", "../.env"),
@@ -105,12 +171,14 @@ class Settings(BaseSettings):
     authjwt: AuthJWT = AuthJWT()
     api: ApiPrefix = ApiPrefix()
     gunicorn: GunicornConfig
+    run: RunConfig = RunConfig()
     modeconf: ModeConfig
     access_token: AccessToken
     db: DatabaseConfig
     storage: StorageConfig
     email: EmailConfig
     broker: BrokerConfig
+    consumer: ConsumerConfig = ConsumerConfig()
 
     @property
     def DATABASE_URL_asyncpg(self):
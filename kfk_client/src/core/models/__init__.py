@@ -3,8 +3,12 @@ __all__ = [
     "User",
     "UploadedFiles",
     "Emails",
+    "CampaignShards",
+    "CampaignRows",
 ]
 from .access_token import AccessToken
 from .users import User
 from .uploaded_file import UploadedFiles
 from .emails import Emails
+from .campaign_shard import CampaignShards
+from .campaign_row import CampaignRows
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.database import Base
+
+
+class CampaignRows(Base):
+    """
+    One entry per CSV row whose result was stored. A reply redelivered by
+    the mail service finds its row here and is not stored or counted again.
+    """
+
+    __tablename__ = "campaign_rows"
+
+    file_id: Mapped[int] = mapped_column(
+        ForeignKey("uploaded_files.id", ondelete="cascade"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # index of the row inside its shard
+    row_index: Mapped[int] = mapped_column(Integer, primary_key=True)
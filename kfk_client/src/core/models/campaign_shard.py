@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.models.mixins.int_id_pk import IntIdPkMixin
+from src.database import Base
+
+
+class CampaignShards(IntIdPkMixin, Base):
+    """A range of rows of an uploaded CSV, sent to the mail workers as one message."""
+
+    __tablename__ = "campaign_shards"
+    __table_args__ = (UniqueConstraint("file_id", "shard"),)
+
+    file_id: Mapped[int] = mapped_column(
+        ForeignKey("uploaded_files.id", ondelete="cascade"), index=True
+    )
+    shard: Mapped[int] = mapped_column(Integer)
+    row_start: Mapped[int] = mapped_column(Integer)
+    row_count: Mapped[int] = mapped_column(Integer)
+    byte_start: Mapped[int] = mapped_column(BigInteger)
+    byte_end: Mapped[int] = mapped_column(BigInteger)
+    sent_count: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    error_count: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    # queued -> publishing -> published (or failed, re-published later) -> running -> done
+    status: Mapped[str] = mapped_column(String, server_default=text("'queued'"))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("TIMEZONE('utc', now())")
+    )
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Enum, ForeignKey, String, Text, text
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.models.mixins.int_id_pk import IntIdPkMixin
@@ -12,6 +12,8 @@ from src.database import Base
 
 class Emails(IntIdPkMixin, Base):
     __tablename__ = "emails"
+    # keyset pagination by creation time
+    __table_args__ = (Index("ix_emails_created_at_id", "created_at", "id"),)
 
     subject: Mapped[str] = mapped_column(String)
     from_email: Mapped[str] = mapped_column(String)
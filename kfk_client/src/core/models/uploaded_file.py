@@ -4,7 +4,7 @@ from datetime import datetime
 import enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Enum, ForeignKey, String, text
+from sqlalchemy import JSON, BigInteger, DateTime, Enum, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.models.mixins.int_id_pk import IntIdPkMixin
@@ -16,9 +16,20 @@ if TYPE_CHECKING:
 
 class UploadedFiles(IntIdPkMixin, Base):
     __tablename__ = "uploaded_files"
+    # keyset pagination by creation time
+    __table_args__ = (Index("ix_uploaded_files_created_at_id", "created_at", "id"),)
 
     file_name: Mapped[str] = mapped_column(String)
     file_path: Mapped[str] = mapped_column(String)
+    # sha256 of the content, files with the same hash share one stored object
+    content_hash: Mapped[str | None] = mapped_column(String(64), index=True)
+    file_size: Mapped[int | None] = mapped_column(BigInteger)
+    # filled by the upload-time validation, invalid rows are not stored
+    row_count: Mapped[int | None] = mapped_column(Integer)
+    invalid_row_count: Mapped[int | None] = mapped_column(Integer)
+    invalid_rows: Mapped[list[dict] | None] = mapped_column(JSON, deferred=True)
+    # CSV header, sent with every shard since the shards do not include it
+    fieldnames: Mapped[list[str] | None] = mapped_column(JSON, deferred=True)
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -1,5 +1,6 @@
 from typing import (
     Any,
+    AsyncIterator,
     Callable,
     Generic,
     Iterable,
@@ -11,25 +12,36 @@ from typing import (
     TypeVar,
 )
 
+from datetime import date, datetime
+
 from fastapi import HTTPException
 from sqlalchemy import (
+    Column,
     Delete,
     Insert,
     Select,
+    Table,
     func,
     insert,
+    literal,
     select,
+    text,
+    tuple_,
     update,
     UnaryExpression,
 )
+from sqlalchemy.engine import RowMapping
 
 from src.core.schemas.base import (
     BaseModel,
     CreateBaseModel,
+    CursorPaginationResultSchema,
+    CursorPaginationSchema,
     PaginationBaseSchema,
     PaginationResultSchema,
     UpdateBaseModel,
 )
+from src.utils.string import decode_cursor, encode_cursor
 
 if TYPE_CHECKING:
     from src.database import Base
@@ -48,16 +60,26 @@ class BaseRepositoryProtocol(Protocol):
 
     async def paginate(self: Self, params: PaginationBaseSchema) -> Any: ...
 
+    async def paginate_keyset(self: Self, params: CursorPaginationSchema) -> Any: ...
+
+    async def estimated_count(self: Self) -> Any: ...
+
+    def stream_chunks(self: Self, chunk_size: int) -> Any: ...
+
     async def add_data(self: Self, **kwargs) -> Any: ...
 
     async def create(self: Self, create_object: CreateBaseModel) -> Any: ...
 
     async def bulk_create(
-        self: Self, create_objects: Sequence[CreateBaseModel]
+        self: Self, create_objects: Sequence[CreateBaseModel], commit: bool = True
     ) -> Any: ...
 
     async def update(self: Self, update_object: UpdateBaseModel) -> Any: ...
 
+    async def bulk_copy(
+        self: Self, create_objects: Sequence[CreateBaseModel], commit: bool = True
+    ) -> Any: ...
+
     async def bulk_update(
         self: Self,
         update_objects: Sequence[UpdateBaseModel],
@@ -68,6 +90,9 @@ class BaseRepositoryProtocol(Protocol):
     async def upsert(self: Self, create_object: CreateBaseModel) -> Any: ...
 
 
+# python types of the columns a keyset cursor can hold (JSON, dates as strings)
+CURSOR_TYPES = (int, float, str, bool, datetime, date)
+
 ReadSchemaT = TypeVar("ReadSchemaT", bound=BaseModel)
 CreateSchemaT = TypeVar("CreateSchemaT", bound=CreateBaseModel)
 UpdateSchemaT = TypeVar("UpdateSchemaT", bound=UpdateBaseModel)
@@ -78,6 +103,10 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
     read_schema: type[ReadSchemaT]
     create_schema: type[CreateSchemaT]
     update_schema: type[UpdateSchemaT]
+    # Set by repositories whose rows are only written through their validated
+    # create/update schemas: listings then build the read schema with
+    # model_construct instead of validating every row again
+    trusted_reads: bool = False
 
     def __init__(self, session: "AsyncSession") -> None:
         """
@@ -91,22 +120,26 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
         * `create_schema`: A Pydantic model (schema) class
         """
         self.session = session
+        # `model.__table__` is typed as any FromClause, narrowed here once
+        table = getattr(self.model, "__table__", None)
+        if not isinstance(table, Table):
+            raise TypeError(f"{type(self).__name__}.model is not a mapped table")
+        self.table: Table = table
 
     async def get_all(self) -> list[ReadSchemaT] | None:
         if self.model:
             # await self.session.connection(execution_options={"isolation_level": "SERIALIZABLE"})
-            stmt = select(self.model.__table__.columns)
+            stmt = select(*self.read_columns())
             result = await self.session.execute(stmt)
-            return [
-                self.read_schema.model_validate(m, from_attributes=True)
-                for m in result.mappings().all()
-            ]
+            return [self.to_read_schema(m) for m in result.mappings().all()]
 
     async def get_by_id(self: Self, id: int) -> ReadSchemaT | None:
         if self.model:
             stmt = select(self.model).where(self.model.id == id)
             result = await self.session.execute(stmt)
             result = result.scalar_one_or_none()
+            if result is None:
+                return None
             return self.read_schema.model_validate(result, from_attributes=True)
 
     async def get_one_or_none(self: Self, **kwargs: Callable) -> ReadSchemaT | None:
@@ -118,12 +151,9 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
 
     async def get_by_ids(self: Self, ids: Sequence[int]) -> list[ReadSchemaT] | None:
         if self.model:
-            stmt = select(self.model).filter(self.model.id.in_(ids))
+            stmt = select(*self.read_columns()).filter(self.model.id.in_(ids))
             result = await self.session.execute(stmt)
-            return [
-                self.read_schema.model_validate(m, from_attributes=True)
-                for m in result.mappings().all()
-            ]
+            return [self.to_read_schema(m) for m in result.mappings().all()]
 
     async def paginate(
         self: Self,
@@ -135,19 +165,115 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
                 sort_by=params.sort_by, order_by=params.sort_order
             )
             stmt = (
-                select(self.model)
+                select(*self.read_columns())
                 .offset(offset)
                 .limit(params.page_size)
                 .order_by(order_by_expr)
             )
-            result = (await self.session.execute(stmt)).scalars().all()
-            objects = [
-                self.read_schema.model_validate(m, from_attributes=True) for m in result
-            ]
+            result = (await self.session.execute(stmt)).mappings().all()
+            objects = [self.to_read_schema(m) for m in result]
             count_stmt = select(self.model).with_only_columns(func.count(self.model.id))
             count = (await self.session.execute(count_stmt)).scalar_one()
             return PaginationResultSchema(objects=objects, count=count)
 
+    async def paginate_keyset(
+        self: Self,
+        params: CursorPaginationSchema,
+    ) -> CursorPaginationResultSchema[ReadSchemaT] | None:
+        """
+        Keyset pagination over `(sort_by, id)`: a page starts right after the
+        last row of the previous one instead of skipping OFFSET rows, so deep
+        pages cost the same as the first. Only non-null columns can be sorted
+        by (`get_sort_column`), on big tables they should be indexed together
+        with `id`.
+        """
+        if self.model:
+            sort_column = self.get_sort_column(params.sort_by)
+            id_column = self.table.c.id
+            stmt = select(*self.read_columns(sort_column))
+            if params.cursor:
+                value, last_id = self._decode_cursor(params, sort_column)
+                key = tuple_(sort_column, id_column)
+                last_key = tuple_(literal(value, sort_column.type), literal(last_id))
+                stmt = stmt.where(
+                    key > last_key if params.sort_order == "asc" else key < last_key
+                )
+            if params.sort_order == "asc":
+                stmt = stmt.order_by(sort_column.asc(), id_column.asc())
+            else:
+                stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+            # one extra row tells whether there is a next page
+            stmt = stmt.limit(params.page_size + 1)
+            rows = (await self.session.execute(stmt)).mappings().all()
+
+            next_cursor = None
+            if len(rows) > params.page_size:
+                rows = rows[: params.page_size]
+                last = rows[-1]
+                next_cursor = encode_cursor(
+                    [params.sort_by, params.sort_order, last[sort_column.key], last["id"]]
+                )
+            objects = [self.to_read_schema(m) for m in rows]
+            count = await self.estimated_count() if params.with_count else None
+            return CursorPaginationResultSchema(
+                objects=objects, next_cursor=next_cursor, estimated_count=count
+            )
+
+    async def estimated_count(self: Self) -> int | None:
+        """
+        Planner row estimate from `pg_class.reltuples`, kept up to date by
+        autovacuum/ANALYZE, instead of a full `count(*)` scan.
+        None while the table has never been analyzed.
+        """
+        if self.model:
+            stmt = text(
+                "SELECT CAST(reltuples AS bigint) FROM pg_class "
+                "WHERE oid = CAST(:table_name AS regclass)"
+            )
+            count = (
+                await self.session.execute(
+                    stmt, {"table_name": self.model.__tablename__}
+                )
+            ).scalar_one_or_none()
+            if count is None or count < 0:
+                return None
+            return count
+
+    async def stream_chunks(
+        self: Self, chunk_size: int
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        """
+        All rows, read schema columns only, in `chunk_size` partitions from a
+        server-side cursor, so memory does not grow with the table. The
+        session must stay open until the iterator is exhausted.
+        """
+        if self.model:
+            stmt = (
+                select(*self.read_columns())
+                .order_by(self.table.c.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            result = await self.session.stream(stmt)
+            async for partition in result.mappings().partitions():
+                yield partition
+
+    def to_read_schema(self: Self, row: RowMapping) -> ReadSchemaT:
+        """
+        Read schema of a row selected with `read_columns`. Trusted rows skip
+        validation, model_construct ignores the extra sort columns.
+        """
+        if self.trusted_reads:
+            return self.read_schema.model_construct(**row)
+        return self.read_schema.model_validate(row, from_attributes=True)
+
+    def read_columns(self: Self, *extra: Column) -> list[Column]:
+        """Table columns of the read schema, deferred columns it lacks are skipped."""
+        return [
+            c
+            for c in self.table.columns
+            if c.key in self.read_schema.model_fields or any(c is e for e in extra)
+        ]
+
     async def add_data(self: Self, **kwargs: Callable) -> None:
         if self.model:
             stmt: Insert = insert(self.model).values(**kwargs)
@@ -163,19 +289,41 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
             return self.read_schema.model_validate(model, from_attributes=True)
 
     async def bulk_create(
-        self: Self, create_objects: Sequence[CreateSchemaT]
+        self: Self, create_objects: Sequence[CreateSchemaT], commit: bool = True
     ) -> list[CreateSchemaT] | None:
         if self.model:
-            stmt: Insert = insert(self.model).values(
-                [m.__dict__ for m in create_objects]
+            # executemany, batched by SQLAlchemy "insertmanyvalues"
+            await self.session.execute(
+                insert(self.model),
+                [self._insert_values(m) for m in create_objects],
             )
-            await self.session.execute(stmt)
-            await self.session.commit()
+            if commit:
+                await self.session.commit()
             return [
                 self.create_schema.model_validate(m, from_attributes=True)
                 for m in create_objects
             ]
 
+    async def bulk_copy(
+        self: Self, create_objects: Sequence[CreateSchemaT], commit: bool = True
+    ) -> None:
+        """
+        Bulk insert through the asyncpg COPY protocol, inside the session
+        transaction. Columns not present in the objects get their server defaults.
+        """
+        if self.model and create_objects:
+            rows = [self._insert_values(m) for m in create_objects]
+            columns = list(rows[0].keys())
+            connection = await self.session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(  # type: ignore
+                self.model.__tablename__,
+                records=[tuple(row[c] for c in columns) for row in rows],
+                columns=columns,
+            )
+            if commit:
+                await self.session.commit()
+
     async def update(self: Self, update_object: UpdateSchemaT) -> None:
         if self.model:
             stmt = (
@@ -188,14 +336,12 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
             await self.session.commit()
 
     async def bulk_update(self: Self, update_objects: Sequence[UpdateSchemaT]) -> None:
-        if self.model:
-            stmt = (
-                update(self.model)
-                .where(self.model.id.in_([m.id for m in update_objects]))
-                .values(**update_objects[0].__dict__)
+        if self.model and update_objects:
+            # ORM bulk UPDATE by primary key, sent as a single executemany
+            await self.session.execute(
+                update(self.model),
+                [m.__dict__ for m in update_objects],
             )
-
-            await self.session.execute(stmt)
             await self.session.commit()
 
     async def delete(self: Self, id: int) -> None:
@@ -216,6 +362,72 @@ class BaseRepository(Generic[ReadSchemaT, CreateSchemaT, UpdateSchemaT]):
 
             return self.create_schema.model_validate(new_instance, from_attributes=True)
 
+    @staticmethod
+    def _insert_values(create_object: CreateSchemaT) -> dict[str, Any]:
+        values = dict(create_object.__dict__)
+        if values.get("id") is None:
+            values.pop("id", None)
+        return values
+
+    def get_sort_column(self: Self, sort_by: str) -> Column:
+        """
+        Keyset sort column. Nullable columns are refused: the row comparison
+        `(column, id) > (value, id)` is NULL for rows without a value, they
+        would silently drop out of the listing.
+        """
+        column = self.table.columns.get(sort_by)
+        if column is None:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown sort column: {sort_by}"
+            )
+        if column.nullable or self._python_type(column) not in CURSOR_TYPES:
+            raise HTTPException(
+                status_code=400, detail=f"Cannot sort by column: {sort_by}"
+            )
+        return column
+
+    @staticmethod
+    def _python_type(column: Column) -> type | None:
+        try:
+            return column.type.python_type
+        except NotImplementedError:
+            return None
+
+    @classmethod
+    def _decode_cursor(
+        cls, params: CursorPaginationSchema, sort_column: Column
+    ) -> tuple[Any, int]:
+        """A cursor is client input, its values are checked against the column types."""
+        if params.cursor is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        try:
+            sort_by, sort_order, value, last_id = decode_cursor(params.cursor)
+            if type(last_id) is not int:
+                raise ValueError("Malformed cursor")
+            value = cls._cursor_value(value, cls._python_type(sort_column))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if (sort_by, sort_order) != (params.sort_by, params.sort_order):
+            raise HTTPException(
+                status_code=400, detail="Cursor does not match the sort order"
+            )
+        return value, last_id
+
+    @staticmethod
+    def _cursor_value(value: Any, python_type: type | None) -> Any:
+        """Sort column value of a cursor, ValueError if it does not fit the column."""
+        if python_type in (datetime, date):
+            # JSON keeps dates as strings
+            if isinstance(value, str):
+                return python_type.fromisoformat(value)  # type: ignore
+        elif python_type is float:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+        elif python_type in (int, str, bool):
+            if type(value) is python_type:
+                return value
+        raise ValueError("Cursor value does not match the sort column")
+
     def get_order_by_expr(
         self: Self, sort_by: str, order_by: str = "asc"
     ) -> UnaryExpression:
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from typing import TYPE_CHECKING, Self, Sequence
+
+from sqlalchemy import Boolean, and_, bindparam, case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.models.campaign_row import CampaignRows
+from src.core.models.campaign_shard import CampaignShards
+from src.core.repository.base import BaseRepository
+from src.core.schemas.campaign_shard import (
+    CampaignShardCreate,
+    CampaignShardRead,
+    CampaignShardUpdate,
+)
+
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CampaignShardRepository(
+    BaseRepository[
+        CampaignShardRead,
+        CampaignShardCreate,
+        CampaignShardUpdate,
+    ]
+):
+    model = CampaignShards
+    read_schema = CampaignShardRead
+    update_schema = CampaignShardUpdate
+    create_schema = CampaignShardCreate
+
+    def __init__(self, session: "AsyncSession") -> None:
+        super().__init__(session)
+
+    async def get_by_file(self: Self, file_id: int) -> list[CampaignShardRead]:
+        stmt = (
+            select(self.model)
+            .where(self.model.file_id == file_id)
+            .order_by(self.model.shard)
+        )
+        result = await self.session.execute(stmt)
+        return [
+            self.read_schema.model_validate(m, from_attributes=True)
+            for m in result.scalars().all()
+        ]
+
+    async def claim_unpublished(
+        self: Self, file_id: int, stale_after: int = 300
+    ) -> list[CampaignShardRead]:
+        """
+        Mark the shards of a file that are not published yet, failed to
+        publish, or were left "publishing" for `stale_after` seconds by a
+        request that died, as "publishing" and return them. Concurrent
+        callers never get the same shard.
+        """
+        table = self.table
+        now = func.timezone("utc", func.now())
+        stmt = (
+            update(table)
+            .where(table.c.file_id == file_id)
+            .where(
+                or_(
+                    table.c.status.in_(("queued", "failed")),
+                    and_(
+                        table.c.status == "publishing",
+                        table.c.updated_at < now - timedelta(seconds=stale_after),
+                    ),
+                )
+            )
+            .values(status="publishing", updated_at=now)
+            .returning(*self.read_columns())
+        )
+        rows = (await self.session.execute(stmt)).mappings().all()
+        await self.session.commit()
+        return sorted((self.to_read_schema(row) for row in rows), key=lambda s: s.shard)
+
+    async def finish_publishing(
+        self: Self, file_id: int, published: Sequence[int], failed: Sequence[int]
+    ) -> None:
+        """Move claimed shards to "published" or "failed", unless replies already arrived."""
+        table = self.table
+        for shards, status in ((published, "published"), (failed, "failed")):
+            if not shards:
+                continue
+            await self.session.execute(
+                update(table)
+                .where(table.c.file_id == file_id)
+                .where(table.c.shard.in_(shards))
+                .where(table.c.status == "publishing")
+                .values(status=status, updated_at=func.timezone("utc", func.now()))
+            )
+        await self.session.commit()
+
+    async def claim_rows(
+        self: Self, rows: Sequence[tuple[int, int, int]], commit: bool = True
+    ) -> set[tuple[int, int, int]]:
+        """
+        Record the (file_id, shard, row_index) of stored results, returns
+        the rows that were not recorded before.
+        """
+        if not rows:
+            return set()
+        stmt = (
+            insert(CampaignRows)
+            .on_conflict_do_nothing()
+            .returning(CampaignRows.file_id, CampaignRows.shard, CampaignRows.row_index)
+        )
+        result = await self.session.execute(
+            stmt,
+            [{"file_id": f, "shard": s, "row_index": r} for f, s, r in rows],
+        )
+        claimed = {(f, s, r) for f, s, r in result.tuples()}
+        if commit:
+            await self.session.commit()
+        return claimed
+
+    async def add_progress(
+        self: Self,
+        progress: dict[tuple[int, int], tuple[int, int, bool]],
+        commit: bool = True,
+    ) -> None:
+        """
+        Increment the counters of many shards in one executemany.
+        `progress` maps (file_id, shard) to (sent, errors, failed), a
+        `failed` shard could not be dispatched past some row, all of its
+        rows that are not counted yet become errors.
+        """
+        if not progress:
+            return
+        table = self.table
+        sent = table.c.sent_count + bindparam("sent")
+        errors = case(
+            (
+                bindparam("failed", type_=Boolean),
+                func.greatest(
+                    table.c.row_count - sent, table.c.error_count + bindparam("errors")
+                ),
+            ),
+            else_=table.c.error_count + bindparam("errors"),
+        )
+        stmt = (
+            update(table)
+            .where(table.c.file_id == bindparam("b_file_id"))
+            .where(table.c.shard == bindparam("b_shard"))
+            .values(
+                sent_count=sent,
+                error_count=errors,
+                status=case(
+                    (sent + errors >= table.c.row_count, "done"),
+                    else_="running",
+                ),
+                updated_at=func.timezone("utc", func.now()),
+            )
+        )
+        await self.session.execute(
+            stmt,
+            [
+                {
+                    "b_file_id": file_id,
+                    "b_shard": shard,
+                    "sent": s,
+                    "errors": e,
+                    "failed": failed,
+                }
+                for (file_id, shard), (s, e, failed) in progress.items()
+            ],
+        )
+        if commit:
+            await self.session.commit()
+
@@ -13,6 +13,8 @@ class EmailRepository(BaseRepository[EmailRead, EmailCreate, EmailUpdate]):
     read_schema = EmailRead
     update_schema = EmailUpdate
     create_schema = EmailCreate
+    # rows are written through the validated create/update schemas only
+    trusted_reads = True
 
     def __init__(self, session: "AsyncSession") -> None:
         super().__init__(session)
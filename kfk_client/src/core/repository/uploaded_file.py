@@ -1,10 +1,15 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Awaitable, Callable, Self
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import undefer
+
 from src.core.models.uploaded_file import UploadedFiles
 from src.core.repository.base import BaseRepository
 from src.core.schemas.uploaded_file import (
     UploadedFileCreate,
     UploadedFileRead,
     UploadedFileUpdate,
+    UploadedFileValidationRead,
 )
 
 
@@ -23,6 +28,71 @@ class UploadedFileRepository(
     read_schema = UploadedFileRead
     update_schema = UploadedFileUpdate
     create_schema = UploadedFileCreate
+    # rows are written through the validated create/update schemas only
+    trusted_reads = True
 
     def __init__(self, session: "AsyncSession") -> None:
         super().__init__(session)
+
+    async def get_by_content_hash(
+        self: Self, user_id: int, content_hash: str
+    ) -> UploadedFileRead | None:
+        stmt = (
+            select(self.model)
+            .filter_by(user_id=user_id, content_hash=content_hash)
+            .order_by(self.model.id)
+            .limit(1)
+        )
+        result = (await self.session.execute(stmt)).scalar_one_or_none()
+        if result is None:
+            return None
+        return self.read_schema.model_validate(result, from_attributes=True)
+
+    async def count_references(self: Self, content_hash: str) -> int:
+        """Number of campaigns that point to the stored object."""
+        stmt = select(func.count()).where(self.model.content_hash == content_hash)
+        return (await self.session.execute(stmt)).scalar_one()
+
+    async def lock_content(self: Self, content_hash: str) -> None:
+        """
+        Serialize the uploads and deletes of one stored object. The lock is
+        held until the transaction ends, i.e. the next commit or rollback.
+        """
+        await self.session.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(content_hash)))
+        )
+
+    async def delete_with_content(
+        self: Self,
+        id: int,
+        content_hash: str,
+        delete_object: Callable[[], Awaitable[None]],
+    ) -> None:
+        """
+        Delete the campaign and, if no other campaign references it, its
+        stored object, both under the content lock. An upload of the same
+        content either registers before, and keeps the object, or after,
+        and sees that the object is gone.
+        """
+        await self.lock_content(content_hash)
+        await self.session.execute(delete(self.model).where(self.model.id == id))
+        if not await self.count_references(content_hash):
+            await delete_object()
+        await self.session.commit()
+
+    async def get_validation_report(
+        self: Self, id: int
+    ) -> UploadedFileValidationRead | None:
+        stmt = (
+            select(self.model)
+            .where(self.model.id == id)
+            .options(undefer(self.model.invalid_rows))
+        )
+        result = (await self.session.execute(stmt)).scalar_one_or_none()
+        if result is None:
+            return None
+        return UploadedFileValidationRead.model_validate(result, from_attributes=True)
+
+    async def get_fieldnames(self: Self, id: int) -> list[str] | None:
+        stmt = select(self.model.fieldnames).where(self.model.id == id)
+        return (await self.session.execute(stmt)).scalar_one_or_none()
@@ -5,6 +5,7 @@ Api Base Message Module
 import uuid
 from typing import Generic, Literal, TypeVar
 
+from fastapi import Response
 from pydantic import AliasGenerator, BaseModel, ConfigDict, Field
 from pydantic.alias_generators import to_camel
 
@@ -21,3 +22,13 @@ class BaseOutputMessage(OutputApiSchema, Generic[T]):
 
     data: T
     message: str
+
+    def to_response(self) -> Response:
+        """
+        JSON encoded by pydantic-core in one pass. A returned Response also
+        skips the per-row validation FastAPI runs against `response_model`.
+        """
+        return Response(
+            content=self.model_dump_json(by_alias=True),
+            media_type="application/json",
+        )
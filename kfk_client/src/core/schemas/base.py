@@ -69,6 +69,29 @@ class PaginationResultSchema(BaseModel, Generic[T]):
     count: int
 
 
+class CursorPaginationSchema(BaseModel):
+    """
+    Schema for keyset pagination, `cursor` is the `next_cursor`
+    of the previous page
+    """
+
+    cursor: str | None = Field(None, description="Opaque cursor of the next page")
+    page_size: int = Field(10, ge=1, le=100, description="Items per page")
+    sort_by: str = "id"
+    sort_order: Literal["asc", "desc"] = "asc"
+    with_count: bool = Field(False, description="Add the estimated total row count")
+
+
+class CursorPaginationResultSchema(BaseModel, Generic[T]):
+    """
+    Schema for keyset pagination result
+    """
+
+    objects: list[T]
+    next_cursor: str | None = None
+    estimated_count: int | None = None
+
+
 class InputApiSchema(BaseModel):
     """
     Input API schema
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from src.core.schemas.base import CreateBaseModel, UpdateBaseModel
+from src.core.schemas.uploaded_file import UploadedFileRead
+
+
+class CampaignShardCreate(CreateBaseModel):
+    file_id: int
+    shard: int
+    row_start: int
+    row_count: int
+    byte_start: int
+    byte_end: int
+
+
+class CampaignShardRead(BaseModel):
+    id: int
+    file_id: int
+    shard: int
+    row_start: int
+    row_count: int
+    byte_start: int
+    byte_end: int
+    sent_count: int
+    error_count: int
+    status: str
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CampaignShardUpdate(UpdateBaseModel):
+    sent_count: int
+    error_count: int
+    status: str
+
+
+class CampaignShardMessage(UploadedFileRead):
+    """
+    Work item for the mail workers: rows `byte_start..byte_end` of the file.
+    The range does not include the header, so the column names are sent along.
+    """
+
+    shard: int
+    shard_count: int
+    row_start: int
+    # rows of the shard, not of the file
+    row_count: int | None = None
+    byte_start: int
+    byte_end: int
+    fieldnames: list[str]
+
+
+class CampaignProgressRead(BaseModel):
+    file_id: int
+    row_count: int
+    sent_count: int
+    error_count: int
+    done: bool
+    shards: list[CampaignShardRead]
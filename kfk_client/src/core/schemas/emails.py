@@ -55,4 +55,11 @@ class EmailQueueReturn(BaseModel):
 class CsvQueueReturn(EmailQueueReturn):
     from_email: EmailStr | None
     to_email: EmailStr | None
+    # campaign shard the row belongs to, used for progress tracking
+    file_id: int | None = None
+    shard: int | None = None
+    # index of the row inside its shard, identifies a redelivered reply
+    row_index: int | None = None
+    # the whole shard could not be dispatched, its remaining rows count as errors
+    shard_failed: bool = False
     model_config = ConfigDict(from_attributes=True)
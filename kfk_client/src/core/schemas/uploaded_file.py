@@ -11,6 +11,12 @@ class UploadedFileCreate(CreateBaseModel):
     file_name: str
     file_path: str
     user_id: int
+    content_hash: str | None = None
+    file_size: int | None = None
+    row_count: int | None = None
+    invalid_row_count: int | None = None
+    invalid_rows: list[dict] | None = None
+    fieldnames: list[str] | None = None
 
 
 class UploadedFileRead(BaseModel):
@@ -18,11 +24,36 @@ class UploadedFileRead(BaseModel):
     file_name: str
     file_path: str
     user_id: int
+    content_hash: str | None = None
+    file_size: int | None = None
+    row_count: int | None = None
+    invalid_row_count: int | None = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class UploadedFileValidationRead(BaseModel):
+    id: int
+    row_count: int | None = None
+    invalid_row_count: int | None = None
+    invalid_rows: list[dict] | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UploadedFileUpdate(UpdateBaseModel):
     file_name: str
     file_path: str
+
+
+class UploadSessionCreate(BaseModel):
+    file_name: str
+
+
+class UploadSessionRead(BaseModel):
+    upload_id: str
+    file_name: str
+    user_id: int
+    parts: list[int] = []
+    received_bytes: int = 0
@@ -1,12 +1,12 @@
-from typing import Callable, Self, TypeVar, Generic, TYPE_CHECKING
-
-from sqlalchemy import Sequence
+from typing import Callable, Self, Sequence, TypeVar, Generic, TYPE_CHECKING
 
 from src.core.repository.base import BaseRepository, BaseRepositoryProtocol
 
 from src.core.schemas.base import (
     BaseModel,
     CreateBaseModel,
+    CursorPaginationResultSchema,
+    CursorPaginationSchema,
     PaginationBaseSchema,
     PaginationResultSchema,
     UpdateBaseModel,
@@ -46,14 +46,29 @@ class BaseService(
     ) -> PaginationResultSchema[ReadSchemaType] | None:
         return await self.repository.paginate(params)
 
+    async def paginate_keyset(
+        self: Self, params: CursorPaginationSchema
+    ) -> CursorPaginationResultSchema[ReadSchemaType] | None:
+        return await self.repository.paginate_keyset(params)
+
+    async def estimated_count(self: Self) -> int | None:
+        return await self.repository.estimated_count()
+
     async def add_data(self: Self, **kwargs):
         return await self.repository.add_data(**kwargs)
 
     async def create(self: Self, create_object: CreateBaseModel):
         return await self.repository.create(create_object)
 
-    async def bulk_create(self: Self, create_objects: Sequence[CreateBaseModel]):
-        return await self.repository.bulk_create(create_objects)  # type: ignore
+    async def bulk_create(
+        self: Self, create_objects: Sequence[CreateBaseModel], commit: bool = True
+    ):
+        return await self.repository.bulk_create(create_objects, commit)  # type: ignore
+
+    async def bulk_copy(
+        self: Self, create_objects: Sequence[CreateBaseModel], commit: bool = True
+    ):
+        return await self.repository.bulk_copy(create_objects, commit)  # type: ignore
 
     async def update(self: Self, update_object: UpdateBaseModel):
         return await self.repository.update(update_object)
@@ -0,0 +1,89 @@
+from typing import TYPE_CHECKING, Annotated, Self, Sequence
+
+from fastapi import Depends
+
+from src.database import get_db_request
+from src.core.services.base import BaseService
+from src.core.models.campaign_shard import CampaignShards
+from src.core.schemas.campaign_shard import (
+    CampaignProgressRead,
+    CampaignShardCreate,
+    CampaignShardRead,
+    CampaignShardUpdate,
+)
+from src.core.repository.campaign_shard import CampaignShardRepository
+
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CampaignShardsService(
+    BaseService[
+        CampaignShardRepository,
+        CampaignShards,
+        CampaignShardRead,
+        CampaignShardCreate,
+        CampaignShardUpdate,
+    ]
+):
+    async def get_progress(self: Self, file_id: int) -> CampaignProgressRead:
+        shards = await self.repository.get_by_file(file_id)
+        return CampaignProgressRead(
+            file_id=file_id,
+            row_count=sum(s.row_count for s in shards),
+            sent_count=sum(s.sent_count for s in shards),
+            error_count=sum(s.error_count for s in shards),
+            done=all(s.status == "done" for s in shards),
+            shards=shards,
+        )
+
+    async def claim_unpublished(self: Self, file_id: int) -> list[CampaignShardRead]:
+        return await self.repository.claim_unpublished(file_id)
+
+    async def finish_publishing(
+        self: Self, file_id: int, published: Sequence[int], failed: Sequence[int]
+    ) -> None:
+        await self.repository.finish_publishing(file_id, published, failed)
+
+    async def claim_rows(
+        self: Self, rows: Sequence[tuple[int, int, int]], commit: bool = True
+    ) -> set[tuple[int, int, int]]:
+        return await self.repository.claim_rows(rows, commit)
+
+    async def add_progress(
+        self: Self,
+        progress: dict[tuple[int, int], tuple[int, int, bool]],
+        commit: bool = True,
+    ) -> None:
+        await self.repository.add_progress(progress, commit)
+
+
+##################
+## REPOSITORIES ##
+##################
+
+
+async def get_campaign_shard_repository(
+    session: "AsyncSession" = Depends(get_db_request),
+) -> CampaignShardRepository:
+    return CampaignShardRepository(session)
+
+
+CampaignShardRepositoryDep = Annotated[
+    "CampaignShardRepository",
+    Depends(get_campaign_shard_repository),
+]
+
+##############
+## SERVICES ##
+##############
+
+
+async def get_campaign_shards_service(
+    rep: CampaignShardRepositoryDep,
+) -> CampaignShardsService:
+    return CampaignShardsService(rep)
+
+
+CampaignShardsServiceDep = Depends(get_campaign_shards_service)
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Annotated
+from typing import TYPE_CHECKING, Annotated, Awaitable, Callable, Self
 
 from fastapi import Depends
 
@@ -9,6 +9,7 @@ from src.core.schemas.uploaded_file import (
     UploadedFileCreate,
     UploadedFileRead,
     UploadedFileUpdate,
+    UploadedFileValidationRead,
 )
 from src.core.repository.uploaded_file import UploadedFileRepository
 
@@ -25,7 +26,33 @@ class UploadedFilesService(
         UploadedFileCreate,
         UploadedFileUpdate,
     ]
-): ...
+):
+    async def get_by_content_hash(
+        self: Self, user_id: int, content_hash: str
+    ) -> UploadedFileRead | None:
+        return await self.repository.get_by_content_hash(user_id, content_hash)
+
+    async def count_references(self: Self, content_hash: str) -> int:
+        return await self.repository.count_references(content_hash)
+
+    async def lock_content(self: Self, content_hash: str) -> None:
+        await self.repository.lock_content(content_hash)
+
+    async def delete_with_content(
+        self: Self,
+        id: int,
+        content_hash: str,
+        delete_object: Callable[[], Awaitable[None]],
+    ) -> None:
+        await self.repository.delete_with_content(id, content_hash, delete_object)
+
+    async def get_validation_report(
+        self: Self, id: int
+    ) -> UploadedFileValidationRead | None:
+        return await self.repository.get_validation_report(id)
+
+    async def get_fieldnames(self: Self, id: int) -> list[str] | None:
+        return await self.repository.get_fieldnames(id)
 
 
 ##################
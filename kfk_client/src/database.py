@@ -11,7 +11,12 @@ from sqlalchemy.orm import DeclarativeBase, Session
 
 from src.config import settings
 
-DATABASE_PARAMS: dict[Any, Any] = {}
+# Each process (HTTP worker or consumer) owns its own pool, see
+# DatabaseConfig.pool_size for the total connection budget
+DATABASE_PARAMS: dict[Any, Any] = {
+    "pool_size": settings.db.pool_size,
+    "max_overflow": settings.db.max_overflow,
+}
 
 async_engine: AsyncEngine = create_async_engine(
     url=settings.DATABASE_URL_asyncpg,
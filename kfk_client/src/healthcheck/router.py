@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 
+from src.broker.utils import get_consumers_lag
+
 from .schemas import HealthcheckResponseSchema
 
 __all__ = ("router",)
@@ -14,3 +16,11 @@ router = APIRouter(prefix="/healthcheck", tags=["Healthcheck"])
 )
 async def get_healthcheck_status() -> HealthcheckResponseSchema:
     return HealthcheckResponseSchema()
+
+
+@router.get(
+    "/consumers",
+    description="Per-partition lag of the Kafka consumers (partitioned mode)",
+)
+async def get_consumers_lag_status() -> dict[str, dict]:
+    return get_consumers_lag()
@@ -1,4 +1,6 @@
+import asyncio
 from contextlib import asynccontextmanager
+import signal
 
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
@@ -9,9 +11,12 @@ from src.actions.create_superuser import create_superuser
 from src.config import settings
 from src.api import api_router as main_api_router
 from src.database import dispose
+from src.gunicorn import Application, get_app_options
 from src.healthcheck import router as healthcheck_router
+from src.storage.dependencies import close_storage
+from src.storage.validation import shutdown_process_pool
 from src.logging_conf import configure_logging
-from src.broker import start_consumers, stop_consumers
+from src.broker import start_consumers, stop_consumers, start_producer, stop_producer
 
 
 configure_logging(level="INFO")
@@ -23,12 +28,18 @@ async def lifespan(app: FastAPI):
     await create_superuser()
     # await broker.connect()
     # await stream_app.start()
-    await start_consumers()
+    await start_producer()
+    if settings.run.mode == "all":
+        await start_consumers()
     yield
     # shutdown
     # await stream_app.stop()
     # await broker.close()
-    await stop_consumers()
+    if settings.run.mode == "all":
+        await stop_consumers()
+    await stop_producer()
+    await close_storage()
+    shutdown_process_pool()
     await dispose()
 
 
@@ -44,3 +55,39 @@ app.include_router(healthcheck_router)
 
 register_errors_handlers(app)
 register_middlewares(app)
+
+
+async def run_consumers() -> None:
+    """Consumer-only process: Kafka receivers without the HTTP server."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await start_consumers()
+    try:
+        await stop.wait()
+    finally:
+        await stop_consumers()
+        await dispose()
+
+
+def main() -> None:
+    if settings.run.mode == "consumer":
+        asyncio.run(run_consumers())
+        return
+
+    Application(
+        app=app,
+        options=get_app_options(
+            host=settings.gunicorn.host,
+            port=settings.gunicorn.port,
+            timeout=settings.gunicorn.timeout,
+            workers=settings.gunicorn.workers,
+            log_level=settings.logging.log_level.lower(),
+        ),
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Add content hash to uploaded files
+
+Revision ID: 3b9d7e1c5a42
+Revises: f0187df84600
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9d7e1c5a42"
+down_revision: Union[str, None] = "f0187df84600"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "uploaded_files",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+    op.add_column(
+        "uploaded_files", sa.Column("file_size", sa.BigInteger(), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_uploaded_files_content_hash"),
+        "uploaded_files",
+        ["content_hash"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_uploaded_files_content_hash"), table_name="uploaded_files")
+    op.drop_column("uploaded_files", "file_size")
+    op.drop_column("uploaded_files", "content_hash")
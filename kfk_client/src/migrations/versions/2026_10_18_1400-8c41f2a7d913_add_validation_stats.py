@@ -0,0 +1,35 @@
+"""Add validation stats to uploaded files
+
+Revision ID: 8c41f2a7d913
+Revises: 3b9d7e1c5a42
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c41f2a7d913"
+down_revision: Union[str, None] = "3b9d7e1c5a42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("uploaded_files", sa.Column("row_count", sa.Integer(), nullable=True))
+    op.add_column(
+        "uploaded_files", sa.Column("invalid_row_count", sa.Integer(), nullable=True)
+    )
+    op.add_column("uploaded_files", sa.Column("invalid_rows", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("uploaded_files", "invalid_rows")
+    op.drop_column("uploaded_files", "invalid_row_count")
+    op.drop_column("uploaded_files", "row_count")
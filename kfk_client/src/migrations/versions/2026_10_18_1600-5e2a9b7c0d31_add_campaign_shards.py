@@ -0,0 +1,61 @@
+"""Add campaign shards
+
+Revision ID: 5e2a9b7c0d31
+Revises: 8c41f2a7d913
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e2a9b7c0d31"
+down_revision: Union[str, None] = "8c41f2a7d913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "campaign_shards",
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("row_start", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("byte_start", sa.BigInteger(), nullable=False),
+        sa.Column("byte_end", sa.BigInteger(), nullable=False),
+        sa.Column("sent_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("error_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("status", sa.String(), server_default=sa.text("'queued'"), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("TIMEZONE('utc', now())"),
+            nullable=False,
+        ),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["file_id"],
+            ["uploaded_files.id"],
+            name=op.f("fk_campaign_shards_file_id_uploaded_files"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_campaign_shards")),
+        sa.UniqueConstraint(
+            "file_id", "shard", name=op.f("uq_campaign_shards_file_id_shard")
+        ),
+    )
+    op.create_index(
+        op.f("ix_campaign_shards_file_id"), "campaign_shards", ["file_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_campaign_shards_file_id"), table_name="campaign_shards")
+    op.drop_table("campaign_shards")
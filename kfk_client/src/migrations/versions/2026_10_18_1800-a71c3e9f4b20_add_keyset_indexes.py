@@ -0,0 +1,37 @@
+"""Add keyset pagination indexes
+
+Revision ID: a71c3e9f4b20
+Revises: 5e2a9b7c0d31
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a71c3e9f4b20"
+down_revision: Union[str, None] = "5e2a9b7c0d31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        op.f("ix_emails_created_at_id"), "emails", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_uploaded_files_created_at_id"),
+        "uploaded_files",
+        ["created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_uploaded_files_created_at_id"), table_name="uploaded_files")
+    op.drop_index(op.f("ix_emails_created_at_id"), table_name="emails")
@@ -0,0 +1,29 @@
+"""Keep the CSV header of uploaded files
+
+Revision ID: c4e8a1d2f6b7
+Revises: a71c3e9f4b20
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e8a1d2f6b7"
+down_revision: Union[str, None] = "a71c3e9f4b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("uploaded_files", sa.Column("fieldnames", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("uploaded_files", "fieldnames")
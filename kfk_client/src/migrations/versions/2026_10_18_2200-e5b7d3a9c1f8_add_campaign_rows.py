@@ -0,0 +1,43 @@
+"""Add campaign rows
+
+Revision ID: e5b7d3a9c1f8
+Revises: c4e8a1d2f6b7
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b7d3a9c1f8"
+down_revision: Union[str, None] = "c4e8a1d2f6b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "campaign_rows",
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("row_index", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["file_id"],
+            ["uploaded_files.id"],
+            name=op.f("fk_campaign_rows_file_id_uploaded_files"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint(
+            "file_id", "shard", "row_index", name=op.f("pk_campaign_rows")
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("campaign_rows")
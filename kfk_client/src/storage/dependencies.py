@@ -1,21 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 import io
 from typing import Literal
 from fastapi import FastAPI, UploadFile, Depends, HTTPException, status
 from pathlib import Path
 import csv
 from google.oauth2.credentials import Credentials
-from starlette.formparsers import MultiPartParser
+from kfk_common.s3 import S3Client
 from src.config import settings
 from src.storage.storage import (
     GoogleDriveStorageService,
     LocalStorageService,
+    S3StorageService,
     StorageService,
 )
 
-### Change default max file size
-### Set max RAM upload filesize via MultiPartParser from starlette
-MAX_FILE_SIZE: int = 1 * 1024 * 1024  # 1MB
-MultiPartParser.max_part_size = MAX_FILE_SIZE
+MAX_FILE_SIZE: int = settings.storage.max_upload_size
+# Only the first chunk is read to validate the headers
+HEADER_SAMPLE_SIZE: int = 10240  # 10kb
 
 
 #######################
@@ -24,14 +25,13 @@ MultiPartParser.max_part_size = MAX_FILE_SIZE
 
 
 async def validate_csv(file: UploadFile) -> None:
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
+    # The upload is spooled to disk by starlette, check its size without reading it.
+    # The limit is enforced again while the file is streamed to storage.
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail="File size exceeds the maximum allowed 4MB",
+            detail=f"File size exceeds the maximum allowed {MAX_FILE_SIZE} bytes",
         )
-    await file.seek(0)
 
     if file is not None and file.filename is not None:
         if not file.filename.lower().endswith(".csv"):
@@ -45,13 +45,18 @@ async def validate_csv(file: UploadFile) -> None:
             detail="No file uploaded or no filename provided",
         )
 
+    # read the first 10240 bytes (10kb)
+    content = await file.read(HEADER_SAMPLE_SIZE)
+    # Возвращаем указатель в начало файла
+    await file.seek(0)
+    validate_csv_header(content)
+
+
+def validate_csv_header(content: bytes) -> None:
     try:
-        # read the first 10240 bytes (10kb)
-        content = await file.read(10240)
         # Проверяем, что это валидный CSV
         text = content.decode("utf-8-sig")
         dialect = csv.Sniffer().sniff(text)
-        await file.seek(0)
         # Проверяем заголовки столбцов
         reader = csv.DictReader(io.StringIO(text), dialect=dialect)
         required_columns = {
@@ -72,9 +77,6 @@ async def validate_csv(file: UploadFile) -> None:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"CSV file is missing required columns: {', '.join(missing_columns)}",
             )
-
-        # Возвращаем указатель в начало файла
-        await file.seek(0)
     except (UnicodeDecodeError, csv.Error) as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -94,7 +96,69 @@ async def validate_csv(file: UploadFile) -> None:
 ##########################
 
 
+# One client per process so requests share its connection pool
+_s3_client: S3Client | None = None
+
+
+def get_s3_client() -> S3Client:
+    global _s3_client
+    if _s3_client is None:
+        access_key = settings.storage.s3_access_key
+        secret_key = settings.storage.s3_secret_key
+        if not (access_key and secret_key):
+            raise RuntimeError(
+                "storage.s3_access_key and storage.s3_secret_key are not set"
+            )
+        _s3_client = S3Client(
+            endpoint_url=settings.storage.s3_endpoint_url,
+            bucket=settings.storage.s3_bucket,
+            access_key=access_key,
+            secret_key=secret_key,
+            region=settings.storage.s3_region,
+            max_connections=settings.storage.s3_max_connections,
+        )
+    return _s3_client
+
+
+# Drive calls are blocking, they run on their own bounded pool
+_drive_executor: ThreadPoolExecutor | None = None
+_drive_storage: GoogleDriveStorageService | None = None
+
+
+def get_drive_storage() -> GoogleDriveStorageService:
+    global _drive_executor, _drive_storage
+    if _drive_storage is None:
+        _drive_executor = ThreadPoolExecutor(
+            max_workers=settings.storage.google_drive_max_workers,
+            thread_name_prefix="google-drive",
+        )
+        _drive_storage = GoogleDriveStorageService(
+            credentials=Credentials.from_authorized_user_file(
+                settings.storage.google_drive_credentials_path
+            ),
+            folder_id=settings.storage.google_drive_csv_folder_id,
+            filetype="csv",
+            executor=_drive_executor,
+        )
+    return _drive_storage
+
+
+async def close_storage() -> None:
+    global _s3_client, _drive_executor, _drive_storage
+    if _s3_client is not None:
+        await _s3_client.close()
+        _s3_client = None
+    if _drive_executor is not None:
+        _drive_executor.shutdown(wait=False, cancel_futures=True)
+        _drive_executor = None
+        _drive_storage = None
+
+
 def get_storage_service(filetype: Literal["csv"]) -> StorageService:
+    if settings.storage.storage_type == "s3":
+        return S3StorageService(client=get_s3_client(), filetype=filetype)
+    if settings.storage.storage_type == "google_drive":
+        return get_drive_storage()
     local_path = settings.storage.local_storage_csv_path
     return LocalStorageService(
         filetype=filetype,
@@ -107,3 +171,14 @@ async def get_csv_storage_service() -> StorageService:
 
 
 CsvStorageDep = Depends(get_csv_storage_service)
+
+
+async def get_upload_storage_service() -> LocalStorageService:
+    # chunked upload sessions are always staged on the local disk
+    return LocalStorageService(
+        filetype="csv",
+        base_path=settings.storage.local_storage_csv_path,
+    )
+
+
+UploadStorageDep = Depends(get_upload_storage_service)
@@ -1,29 +1,79 @@
 from abc import ABC, abstractmethod
-from typing import BinaryIO, Literal, IO
-import aiofiles
+from dataclasses import dataclass
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+import threading
+from typing import AsyncIterator, BinaryIO, Callable, Literal, IO, TypeVar
+import uuid
 import asyncio
-import typing
-from fastapi import FastAPI, UploadFile, Depends, HTTPException, status
+from fastapi import UploadFile, HTTPException, status
 from pathlib import Path
 import shutil
 import aiofiles
 from aiofiles.threadpool.binary import AsyncBufferedReader
 import io
 from googleapiclient.errors import HttpError
-from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload, build_http
+from google_auth_httplib2 import AuthorizedHttp
+
+from kfk_common.s3 import S3Client, S3Error
+from src.config import settings
+from src.core.schemas.uploaded_file import UploadSessionRead
+from src.utils.run_in_threadpool import run_in_executor
+
+logger = getLogger(__name__)
+
+R = TypeVar("R")
+
+
+@dataclass
+class StoredFile:
+    path: str
+    size: int
+    sha256: str | None = None
+    # the same content was already stored, no new object was written
+    deduplicated: bool = False
+
+
+async def iter_upload(
+    file: UploadFile,
+    chunk_size: int = settings.storage.upload_chunk_size,
+) -> AsyncIterator[bytes]:
+    while chunk := await file.read(chunk_size):
+        yield chunk
+
+
+def content_key(sha256: str, filetype: str) -> str:
+    return f"objects/{sha256[:2]}/{sha256}.{filetype}"
 
 
 class StorageService(ABC):
     @abstractmethod
-    async def save_file(self, filename: str, file: UploadFile) -> str:
+    async def save_file(self, filename: str, file: UploadFile) -> StoredFile:
+        pass
+
+    @abstractmethod
+    async def save_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> StoredFile:
         pass
 
     @abstractmethod
     async def get_file(self, file_path_or_id: str) -> BinaryIO:
         pass
 
+    @abstractmethod
+    async def delete_file(self, file_path_or_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def exists(self, file_path_or_id: str) -> bool:
+        pass
+
 
 ###########################
 ## LOCAL STORAGE SERVICE ##
@@ -35,33 +85,174 @@ class LocalStorageService(StorageService):
         self,
         filetype: Literal["csv"],
         base_path: str,
+        max_size: int = settings.storage.max_upload_size,
     ):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
         self.filetype = filetype
+        self.max_size = max_size
+        self.uploads_path = self.base_path / ".uploads"
+
+    async def save_file(self, filename: str, file: UploadFile) -> StoredFile:
+        return await self.save_stream(filename, iter_upload(file))
 
-    async def save_file(self, filename: str, file: UploadFile) -> str:
+    async def save_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> StoredFile:
+        """
+        Write chunks to a temporary file while hashing them and enforcing
+        `max_size`, then atomically rename it to its content address
+        `objects/<sha256[:2]>/<sha256>.<filetype>`. If an object with the
+        same hash already exists the temporary file is dropped instead.
+        """
+        tmp_path = self.base_path / f".{filename}.{uuid.uuid4().hex}.part"
+        digest = hashlib.sha256()
+        size = 0
         try:
-            file_path = self.base_path / f"{filename}.{self.filetype}"
-            async with aiofiles.open(file_path, "wb") as file_obj:
-                contents = await file.read()
-                await file_obj.write(contents)
-            return str(file_path)
+            async with aiofiles.open(tmp_path, "wb") as file_obj:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File size exceeds the maximum allowed {self.max_size} bytes",
+                        )
+                    digest.update(chunk)
+                    await file_obj.write(chunk)
+            sha256 = digest.hexdigest()
+            file_path = self.object_path(sha256)
+            if file_path.exists():
+                return StoredFile(
+                    path=str(file_path), size=size, sha256=sha256, deduplicated=True
+                )
+            await asyncio.to_thread(file_path.parent.mkdir, parents=True, exist_ok=True)
+            await asyncio.to_thread(os.replace, tmp_path, file_path)
+            return StoredFile(path=str(file_path), size=size, sha256=sha256)
         except IOError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to save file locally: {str(e)}",
             )
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.base_path / content_key(sha256, self.filetype)
+
+    async def delete_file(self, file_path_or_id: str) -> None:
+        path = Path(file_path_or_id)
+        if path.is_relative_to(self.base_path):
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+
+    async def exists(self, file_path_or_id: str) -> bool:
+        return await asyncio.to_thread(Path(file_path_or_id).exists)
+
+    ######################
+    ## CHUNKED UPLOADS  ##
+    ######################
+
+    # Every upload session is a directory with `meta.json` and numbered parts.
+    # A part is written to a temporary file and renamed only when complete,
+    # so a dropped connection leaves no partial part behind.
+
+    async def create_upload(self, filename: str, user_id: int) -> UploadSessionRead:
+        upload = UploadSessionRead(
+            upload_id=uuid.uuid4().hex,
+            file_name=filename,
+            user_id=user_id,
+        )
+        upload_path = self.uploads_path / upload.upload_id
+        await asyncio.to_thread(upload_path.mkdir, parents=True)
+        async with aiofiles.open(upload_path / "meta.json", "w") as meta:
+            await meta.write(upload.model_dump_json(include={"upload_id", "file_name", "user_id"}))
+        return upload
+
+    async def get_upload(self, upload_id: str) -> UploadSessionRead:
+        return await asyncio.to_thread(self._read_upload, upload_id)
+
+    async def write_part(
+        self,
+        upload_id: str,
+        part_number: int,
+        chunks: AsyncIterator[bytes],
+    ) -> UploadSessionRead:
+        upload = await self.get_upload(upload_id)
+        upload_path = self.uploads_path / upload_id
+        part_path = upload_path / f"{part_number:05d}.part"
+        tmp_path = upload_path / f"{part_number:05d}.{uuid.uuid4().hex}.tmp"
+        # the part being replaced does not count towards the total
+        previous_size = part_path.stat().st_size if part_path.exists() else 0
+        received = upload.received_bytes - previous_size
+        size = 0
         try:
-            file_path = self.base_path / f"{filename}.{self.filetype}"
-            with open(file_path, "wb") as file_obj:
-                shutil.copyfileobj(file, file_obj)
-            return str(file_path)
-        except IOError as e:
+            async with aiofiles.open(tmp_path, "wb") as file_obj:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > settings.storage.upload_part_max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="Part size exceeds the maximum allowed "
+                            f"{settings.storage.upload_part_max_size} bytes",
+                        )
+                    if received + size > self.max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File size exceeds the maximum allowed {self.max_size} bytes",
+                        )
+                    await file_obj.write(chunk)
+            await asyncio.to_thread(os.replace, tmp_path, part_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return await self.get_upload(upload_id)
+
+    async def assemble_upload(self, upload_id: str) -> AsyncIterator[bytes]:
+        """
+        Stream of the parts in order. The session is kept until
+        `abort_upload`, so a failed completion can be retried.
+        """
+        upload = await self.get_upload(upload_id)
+        if not upload.parts or upload.parts != list(range(1, len(upload.parts) + 1)):
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to save file locally: {str(e)}",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload parts must be numbered from 1 without gaps, got {upload.parts}",
             )
+        return self._iter_parts(upload)
+
+    async def abort_upload(self, upload_id: str) -> None:
+        await asyncio.to_thread(
+            shutil.rmtree, self.uploads_path / upload_id, ignore_errors=True
+        )
+
+    async def read_upload_head(self, upload_id: str, size: int) -> bytes:
+        """First bytes of the assembled upload, used to validate headers."""
+        async with aiofiles.open(
+            self.uploads_path / upload_id / f"{1:05d}.part", "rb"
+        ) as file_obj:
+            return await file_obj.read(size)
+
+    async def _iter_parts(self, upload: UploadSessionRead) -> AsyncIterator[bytes]:
+        upload_path = self.uploads_path / upload.upload_id
+        for part_number in upload.parts:
+            async with aiofiles.open(
+                upload_path / f"{part_number:05d}.part", "rb"
+            ) as file_obj:
+                while chunk := await file_obj.read(settings.storage.upload_chunk_size):
+                    yield chunk
+
+    def _read_upload(self, upload_id: str) -> UploadSessionRead:
+        upload_path = self.uploads_path / upload_id
+        meta_path = upload_path / "meta.json"
+        if not upload_id.isalnum() or not meta_path.exists():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+            )
+        upload = UploadSessionRead.model_validate_json(meta_path.read_text())
+        parts = sorted(upload_path.glob("*.part"))
+        upload.parts = [int(part.stem) for part in parts]
+        upload.received_bytes = sum(part.stat().st_size for part in parts)
+        return upload
 
     async def get_file(self, file_path_or_id: str) -> AsyncBufferedReader:
         try:
@@ -77,35 +268,233 @@ class LocalStorageService(StorageService):
             )
 
 
+########################
+## S3 STORAGE SERVICE ##
+########################
+
+
+class S3StorageService(StorageService):
+    """
+    Stores files in an S3-compatible bucket so the API and the mail
+    workers do not have to share a filesystem. The stored path is the object key.
+    """
+
+    def __init__(
+        self,
+        client: S3Client,
+        filetype: Literal["csv"],
+        max_size: int = settings.storage.max_upload_size,
+        part_size: int = settings.storage.s3_part_size,
+    ):
+        self.client = client
+        self.filetype = filetype
+        self.max_size = max_size
+        self.part_size = part_size
+
+    async def save_file(self, filename: str, file: UploadFile) -> StoredFile:
+        return await self.save_stream(filename, iter_upload(file))
+
+    async def save_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> StoredFile:
+        """
+        Upload to a temporary key while hashing, then copy the object to
+        its content address unless an object with the same hash exists.
+        """
+        digest = hashlib.sha256()
+        size = 0
+
+        async def hashed_chunks() -> AsyncIterator[bytes]:
+            nonlocal size
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self.max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File size exceeds the maximum allowed {self.max_size} bytes",
+                    )
+                digest.update(chunk)
+                yield chunk
+
+        tmp_key = f"tmp/{uuid.uuid4().hex}.{self.filetype}"
+        try:
+            await self.client.upload_stream(tmp_key, hashed_chunks(), self.part_size)
+            sha256 = digest.hexdigest()
+            key = content_key(sha256, self.filetype)
+            if await self.client.head_object(key) is not None:
+                return StoredFile(path=key, size=size, sha256=sha256, deduplicated=True)
+            await self.client.copy_object(tmp_key, key)
+            return StoredFile(path=key, size=size, sha256=sha256)
+        except S3Error as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Object storage error: {str(e)}",
+            )
+        finally:
+            await self.client.delete_object(tmp_key)
+
+    async def get_file(self, file_path_or_id: str) -> AsyncIterator[bytes]:
+        if await self.client.head_object(file_path_or_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
+            )
+        return self.client.iter_object(
+            file_path_or_id, settings.storage.upload_chunk_size
+        )
+
+    async def delete_file(self, file_path_or_id: str) -> None:
+        await self.client.delete_object(file_path_or_id)
+
+    async def exists(self, file_path_or_id: str) -> bool:
+        return await self.client.head_object(file_path_or_id) is not None
+
+
 ############################
 ## GOOGLE STORAGE SERVICE ##
 ############################
 
 
 class GoogleDriveStorageService(StorageService):
+    """
+    googleapiclient is synchronous, every call runs on `executor`.
+    The discovery client is built once and shared, while each executor
+    thread gets its own authorized http object (httplib2 is not thread-safe).
+    """
+
     def __init__(
         self,
         credentials,
         folder_id: str,
         filetype: Literal["csv"],
+        executor: ThreadPoolExecutor,
+        chunk_size: int = settings.storage.google_drive_chunk_size,
+        api_endpoint: str | None = settings.storage.google_drive_api_endpoint,
+        max_size: int = settings.storage.max_upload_size,
     ):
-        self.service = build("drive", "v3", credentials=credentials)
+        self.credentials = credentials
         self.folder_id = folder_id
         self.filetype = filetype
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.api_endpoint = api_endpoint
+        self.max_size = max_size
+        self._service = None
+        self._service_lock = asyncio.Lock()
+        self._local = threading.local()
+
+    async def save_file(self, filename: str, file: UploadFile) -> StoredFile:
+        # starlette has already spooled the upload, hash it in place
+        sha256, size = await self._run(self._hash_file, file.file)
+        return await self._save(file.file, size, sha256)
+
+    async def save_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> StoredFile:
+        # resumable uploads need a seekable file, spool the stream first
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(
+            max_size=settings.storage.upload_chunk_size
+        ) as spool:
+            async for chunk in chunks:
+                digest.update(chunk)
+                await self._run(spool.write, chunk)
+                if spool.tell() > self.max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File size exceeds the maximum allowed {self.max_size} bytes",
+                    )
+            size = spool.tell()
+            spool.seek(0)
+            return await self._save(spool, size, digest.hexdigest())
+
+    async def get_file(self, file_path_or_id: str) -> AsyncIterator[bytes]:
+        service = await self._get_service()
+        request = service.files().get_media(fileId=file_path_or_id)
+        # the download owns its http object, its chunks may run on any thread
+        request.http = self._new_http()
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(buffer, request, chunksize=self.chunk_size)
+        try:
+            _, done = await self._run(downloader.next_chunk)
+        except HttpError as e:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"File not found in Google Drive: {str(e)}",
+            )
+        return self._iter_download(downloader, buffer, done)
+
+    async def delete_file(self, file_path_or_id: str) -> None:
+        service = await self._get_service()
+        try:
+            await self._execute(service.files().delete(fileId=file_path_or_id))
+        except HttpError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Google Drive error: {str(e)}",
+            )
+
+    async def exists(self, file_path_or_id: str) -> bool:
+        service = await self._get_service()
+        try:
+            file = await self._execute(
+                service.files().get(fileId=file_path_or_id, fields="id,trashed")
+            )
+        except HttpError as e:
+            if e.resp.status == 404:
+                return False
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Google Drive error: {str(e)}",
+            )
+        return not file.get("trashed", False)
 
-    async def save_file(self, filename: str, file: BinaryIO) -> str:
+    async def _save(self, file: IO[bytes], size: int, sha256: str) -> StoredFile:
+        service = await self._get_service()
         try:
+            # content addressed: a file with the same hash is reused
+            query = (
+                f"'{self.folder_id}' in parents and trashed = false and "
+                f"appProperties has {{ key='sha256' and value='{sha256}' }}"
+            )
+            existing = await self._execute(
+                service.files().list(q=query, fields="files(id)", pageSize=1)
+            )
+            if existing.get("files"):
+                return StoredFile(
+                    path=existing["files"][0]["id"],
+                    size=size,
+                    sha256=sha256,
+                    deduplicated=True,
+                )
+
             file_metadata = {
-                "name": f"{filename}.{self.filetype}",
+                "name": f"{sha256}.{self.filetype}",
                 "parents": [self.folder_id],
+                "appProperties": {"sha256": sha256},
             }
-            media = MediaIoBaseUpload(file, mimetype=f"text/{self.filetype}")
-            file_obj = (
-                self.service.files()
-                .create(body=file_metadata, media_body=media, fields="id")
-                .execute()
+            media = MediaIoBaseUpload(
+                file,
+                mimetype=f"text/{self.filetype}",
+                chunksize=self.chunk_size,
+                resumable=True,
             )
-            return file_obj.get("id")
+            request = service.files().create(
+                body=file_metadata, media_body=media, fields="id"
+            )
+            # every chunk is a separate call, the loop is free between them
+            upload_http = self._new_http()
+            response = None
+            while response is None:
+                upload_status, response = await self._run(
+                    request.next_chunk, http=upload_http
+                )
+                if upload_status:
+                    logger.debug(
+                        "Google Drive upload %s: %d%%",
+                        sha256,
+                        int(upload_status.progress() * 100),
+                    )
+            return StoredFile(path=response.get("id"), size=size, sha256=sha256)
         except HttpError as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -117,12 +506,58 @@ class GoogleDriveStorageService(StorageService):
                 detail=f"Failed to upload to Google Drive: {str(e)}",
             )
 
-    async def get_file(self, file_path_or_id: str) -> BinaryIO:
-        try:
-            request = self.service.files().get_media(fileId=file_path_or_id)
-            return request.execute()
-        except HttpError as e:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"File not found in Google Drive: {str(e)}",
-            )
+    async def _iter_download(
+        self, downloader: MediaIoBaseDownload, buffer: io.BytesIO, done: bool
+    ) -> AsyncIterator[bytes]:
+        while True:
+            yield buffer.getvalue()
+            if done:
+                return
+            buffer.seek(0)
+            buffer.truncate()
+            _, done = await self._run(downloader.next_chunk)
+
+    async def _get_service(self):
+        if self._service is None:
+            async with self._service_lock:
+                if self._service is None:
+                    self._service = await self._run(self._build_service)
+        return self._service
+
+    def _build_service(self):
+        client_options = {"api_endpoint": self.api_endpoint} if self.api_endpoint else None
+        return build(
+            "drive",
+            "v3",
+            credentials=self.credentials,
+            client_options=client_options,
+            cache_discovery=False,
+        )
+
+    def _http(self) -> AuthorizedHttp:
+        # called on executor threads: one http object per thread
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = self._new_http()
+        return http
+
+    def _new_http(self) -> AuthorizedHttp:
+        # build_http keeps 308 "Resume Incomplete" of resumable uploads from
+        # being followed as a redirect, and sets a socket timeout
+        return AuthorizedHttp(self.credentials, http=build_http())
+
+    async def _execute(self, request):
+        return await self._run(lambda: request.execute(http=self._http()))
+
+    async def _run(self, fn: Callable[..., R], *args, **kwargs) -> R:
+        return await run_in_executor(self.executor, fn, *args, **kwargs)
+
+    @staticmethod
+    def _hash_file(file: IO[bytes]) -> tuple[str, int]:
+        digest = hashlib.sha256()
+        file.seek(0)
+        while chunk := file.read(settings.storage.upload_chunk_size):
+            digest.update(chunk)
+        size = file.tell()
+        file.seek(0)
+        return digest.hexdigest(), size
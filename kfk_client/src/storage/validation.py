@@ -0,0 +1,266 @@
+"""
+Upload-time CSV validation
+
+The whole file is streamed once, rows the mail worker would reject
+(CsvRow) are dropped and reported, and only the cleaned file is stored,
+so bad rows never reach the broker. The same pass records the byte
+offsets the campaign is split into shards at. Big files are validated in a
+process pool to keep the CSV parsing off the event loop and the GIL.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, suppress
+import csv
+from dataclasses import dataclass, field
+import io
+import itertools
+import os
+import tempfile
+from typing import IO, Annotated, AsyncIterator
+
+import aiofiles
+from annotated_types import MaxLen, MinLen
+from fastapi import HTTPException, status
+from pydantic import BaseModel, EmailStr, ValidationError
+
+from src.config import settings
+
+
+Address = Annotated[EmailStr, MinLen(5), MaxLen(100)]
+
+
+class CsvRow(BaseModel):
+    """
+    The fields of a CSV row with the constraints of EmailBaseModel in the
+    mail worker: a row valid here is a row the worker can send.
+    """
+
+    subject: str
+    from_email: Address
+    to_email: Address
+    message_body: str | None = None
+
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+@dataclass
+class CsvValidationResult:
+    row_count: int = 0
+    invalid_row_count: int = 0
+    # capped at `report_limit` entries: {"line": 12, "errors": ["to_email: ..."]}
+    invalid_rows: list[dict] = field(default_factory=list)
+    fieldnames: list[str] = field(default_factory=list)
+    # (valid row index, byte offset in the cleaned file) of every shard start
+    shard_offsets: list[tuple[int, int]] = field(default_factory=list)
+    size: int = 0
+
+    @property
+    def valid_row_count(self) -> int:
+        return self.row_count - self.invalid_row_count
+
+    def shard_ranges(self) -> list[tuple[int, int, int, int]]:
+        """(row_start, row_count, byte_start, byte_end) of every shard."""
+        bounds = [*self.shard_offsets, (self.valid_row_count, self.size)]
+        return [
+            (row_start, next_row - row_start, byte_start, byte_end)
+            for (row_start, byte_start), (next_row, byte_end) in zip(bounds, bounds[1:])
+        ]
+
+
+class _ByteCountingWriter:
+    """Text sink for csv.writer that encodes rows and tracks the byte offset."""
+
+    def __init__(self, file: IO[bytes]):
+        self.file = file
+        self.offset = 0
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.offset += len(data)
+        self.file.write(data)
+
+
+@dataclass
+class CleanedCsv:
+    path: str
+    result: CsvValidationResult
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path, "rb") as file_obj:
+            while chunk := await file_obj.read(settings.storage.upload_chunk_size):
+                yield chunk
+
+
+def validate_row(row: dict) -> list[str]:
+    try:
+        CsvRow.model_validate(row)
+    except ValidationError as e:
+        return [
+            f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+            for error in e.errors(include_url=False)
+        ]
+    return []
+
+
+def _open_text(src: str | IO[bytes]) -> IO[str]:
+    if isinstance(src, str):
+        return open(src, newline="", encoding="utf-8-sig")
+    return io.TextIOWrapper(src, newline="", encoding="utf-8-sig")
+
+
+def clean_csv_file(
+    src: str | IO[bytes], dst: str, report_limit: int, shard_rows: int
+) -> CsvValidationResult:
+    """
+    Copy the valid rows of `src` to `dst` as a comma separated UTF-8 CSV,
+    noting the byte offset of every `shard_rows`-th valid row.
+    `src` is read once front to back, it may be a pipe.
+    Runs in a worker process for big files, so it must stay picklable.
+    """
+    result = CsvValidationResult()
+    with _open_text(src) as src_file, open(dst, "wb") as dst_file:
+        # complete the last line of the sample, the reader continues after it
+        sample = src_file.read(10240) + src_file.readline()
+        dialect = csv.Sniffer().sniff(sample)
+        lines = itertools.chain(io.StringIO(sample), src_file)
+        reader = csv.DictReader(lines, dialect=dialect)
+        result.fieldnames = list(reader.fieldnames or [])
+        output = _ByteCountingWriter(dst_file)
+        writer = csv.DictWriter(
+            output, fieldnames=result.fieldnames, extrasaction="ignore"
+        )
+        writer.writeheader()
+        for row in reader:
+            result.row_count += 1
+            errors = validate_row(row)
+            if not errors:
+                # index of this row among the valid ones
+                index = result.valid_row_count - 1
+                if index % shard_rows == 0:
+                    result.shard_offsets.append((index, output.offset))
+                writer.writerow(row)
+                continue
+            result.invalid_row_count += 1
+            if len(result.invalid_rows) < report_limit:
+                result.invalid_rows.append({"line": reader.line_num, "errors": errors})
+        result.size = output.offset
+    return result
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.storage.validation_workers
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def _pipe_to_process(
+    head: bytes, chunks: AsyncIterator[bytes], fifo: str, args: tuple
+) -> CsvValidationResult:
+    """
+    Validate in the process pool, writing the upload into the named pipe
+    `fifo` the worker reads from.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_process_pool(), clean_csv_file, fifo, *args)
+    opening = asyncio.ensure_future(asyncio.to_thread(open, fifo, "wb"))
+    try:
+        await asyncio.wait({opening, future}, return_when=asyncio.FIRST_COMPLETED)
+        if not opening.done():
+            # the worker failed without opening the pipe, unblock our open()
+            fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+            try:
+                (await opening).close()
+            finally:
+                os.close(fd)
+            return await future
+        try:
+            with await opening as pipe:
+                await asyncio.to_thread(pipe.write, head)
+                async for chunk in chunks:
+                    await asyncio.to_thread(pipe.write, chunk)
+        except BrokenPipeError:
+            pass  # the worker stopped reading, its error is raised below
+        return await future
+    finally:
+        if not opening.done():
+            opening.cancel()
+        if not future.done():
+            # the pipe is closed, the worker finishes at end of file
+            with suppress(Exception):
+                await asyncio.shield(future)
+
+
+async def _limit_size(
+    chunks: AsyncIterator[bytes], max_size: int
+) -> AsyncIterator[bytes]:
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size exceeds the maximum allowed {max_size} bytes",
+            )
+        yield chunk
+
+
+@asynccontextmanager
+async def cleaned_csv(
+    chunks: AsyncIterator[bytes],
+    max_size: int = settings.storage.max_upload_size,
+) -> AsyncIterator[CleanedCsv]:
+    """
+    Validate the upload while it streams in and yield the cleaned copy,
+    the only temporary file, removed on exit. Uploads under
+    `validation_process_min_size` are validated from memory in a thread,
+    bigger ones are piped to the process pool, so the raw upload is
+    never written to disk. More than `max_size` bytes is a 413.
+    """
+    tmp_dir = settings.storage.validation_tmp_dir
+    dst_fd, dst = tempfile.mkstemp(suffix=".csv", dir=tmp_dir)
+    os.close(dst_fd)
+    chunks = _limit_size(chunks, max_size)
+    args = (
+        dst,
+        settings.storage.invalid_rows_report_limit,
+        settings.storage.csv_shard_rows,
+    )
+    try:
+        head = bytearray()
+        big = False
+        async for chunk in chunks:
+            head += chunk
+            if len(head) >= settings.storage.validation_process_min_size:
+                big = True
+                break
+        try:
+            if big:
+                with tempfile.TemporaryDirectory(dir=tmp_dir) as fifo_dir:
+                    fifo = os.path.join(fifo_dir, "upload.csv")
+                    os.mkfifo(fifo)
+                    result = await _pipe_to_process(bytes(head), chunks, fifo, args)
+            else:
+                result = await asyncio.to_thread(
+                    clean_csv_file, io.BytesIO(head), *args
+                )
+        except (UnicodeDecodeError, csv.Error):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid CSV format",
+            )
+        yield CleanedCsv(path=dst, result=result)
+    finally:
+        if os.path.exists(dst):
+            os.unlink(dst)
@@ -0,0 +1,81 @@
+"""
+Streaming table export module
+"""
+
+import csv
+import io
+from typing import TYPE_CHECKING, AsyncIterator, Literal, Sequence
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import RowMapping
+
+from src.config import settings
+from src.database import async_session_factory
+
+if TYPE_CHECKING:
+    from src.core.repository.base import BaseRepository
+
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def encode_ndjson(
+    partitions: AsyncIterator[Sequence[RowMapping]],
+) -> AsyncIterator[bytes]:
+    async for rows in partitions:
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+
+
+async def encode_csv(
+    columns: list[str],
+    partitions: AsyncIterator[Sequence[RowMapping]],
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in partitions:
+        writer.writerows([row[c] for c in columns] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # header of an empty table
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def export_rows(
+    repository_type: type["BaseRepository"],
+    export_format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    # The request session is closed by db_session_middleware as soon as the
+    # endpoint returns, before the body is sent, so the cursor needs its own.
+    async with async_session_factory() as session:
+        repository = repository_type(session)
+        partitions = repository.stream_chunks(settings.db.stream_chunk_size)
+        if export_format == "csv":
+            columns = [c.key for c in repository.read_columns()]
+            chunks = encode_csv(columns, partitions)
+        else:
+            chunks = encode_ndjson(partitions)
+        async for chunk in chunks:
+            yield chunk
+
+
+def export_response(
+    repository_type: type["BaseRepository"],
+    export_format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        export_rows(repository_type, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
@@ -3,6 +3,7 @@ Model of asyncio.run_in_threadpool  ThreadPool.
 """
 
 import asyncio
+from concurrent.futures import Executor
 from functools import partial
 from typing import Callable, TypeVar
 
@@ -13,6 +14,16 @@ P = ParamSpec("P")
 
 
 async def run_in_threadpool(fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+    return await run_in_executor(None, fn, *args, **kwargs)
+
+
+async def run_in_executor(
+    executor: Executor | None, fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs
+) -> R:
+    """
+    Same as `run_in_threadpool` but on the given executor, so blocking
+    clients can be limited to their own bounded pool of threads.
+    """
     kwargs_fn = partial(fn, *args, **kwargs)
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, kwargs_fn)
+    return await loop.run_in_executor(executor, kwargs_fn)
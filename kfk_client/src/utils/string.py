@@ -4,6 +4,7 @@ String utils module
 
 import re
 import base64
+import json
 import string
 from random import choice
 from typing import Callable, Literal
@@ -27,6 +28,25 @@ def decrypt_base64(path: str) -> str:
     return base64.b64decode(path).decode()
 
 
+def encode_cursor(values: list) -> str:
+    """
+    Opaque pagination cursor, URL-safe base64 of the JSON encoded values.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Pagination cursor decode, raises ValueError on a malformed cursor
+    """
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    values = json.loads(raw)
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return values
+
+
 def not_implemented_msg() -> dict[str, str]:
     not_implemented = {"detail": "Not implemented"}
     return not_implemented
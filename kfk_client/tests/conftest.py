@@ -0,0 +1,26 @@
+import os
+
+# Settings() is built at import time, give the required fields test values
+# so that the unit tests run without a .env file
+for name, value in {
+    "APP_CONFIG__PROJECT_NAME": "client-service-test",
+    "APP_CONFIG__LOGGING__LOG_LEVEL": "WARNING",
+    "APP_CONFIG__GUNICORN__WORKERS": "1",
+    "APP_CONFIG__MODECONF__MODE": "TEST",
+    "APP_CONFIG__ACCESS_TOKEN__RESET_PASSWORD_TOKEN_SECRET": "test",
+    "APP_CONFIG__ACCESS_TOKEN__VERIFICATION_TOKEN_SECRET": "test",
+    "APP_CONFIG__DB__DB_HOST": "localhost",
+    "APP_CONFIG__DB__DB_PORT": "5432",
+    "APP_CONFIG__DB__DB_USER": "test",
+    "APP_CONFIG__DB__DB_PASS": "test",
+    "APP_CONFIG__DB__DB_NAME": "test",
+    "APP_CONFIG__STORAGE__GOOGLE_DRIVE_CSV_FOLDER_ID": "csv",
+    "APP_CONFIG__STORAGE__GOOGLE_DRIVE_TEMPL_FOLDER_ID": "templates",
+    "APP_CONFIG__STORAGE__GOOGLE_DRIVE_CREDENTIALS_PATH": "credentials.json",
+    "APP_CONFIG__EMAIL__FROM_USER": "sender@example.com",
+    "APP_CONFIG__BROKER__KAFKA_BOOTSTRAP_SERVERS": "localhost:9092",
+    "APP_CONFIG__FIRST_SUPERUSER_EMAIL": "admin@example.com",
+    "APP_CONFIG__FIRST_SUPERUSER_NAME": "admin",
+    "APP_CONFIG__FIRST_SUPERUSER_PASSWORD": "admin",
+}.items():
+    os.environ.setdefault(name, value)
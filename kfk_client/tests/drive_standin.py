@@ -0,0 +1,153 @@
+"""
+In-memory stand-in for the parts of the Google Drive v3 API used by
+GoogleDriveStorageService: files.list by sha256 appProperty, resumable
+uploads, ranged media downloads, files.get and files.delete.
+
+googleapiclient keeps the https scheme of media upload URLs whatever the
+api_endpoint, so the stand-in serves TLS with a self-signed certificate
+for 127.0.0.1: point `google_drive_api_endpoint` at `api_endpoint` and
+trust `cert_path` in the client.
+"""
+
+from datetime import datetime, timedelta, timezone
+import ipaddress
+import json
+from pathlib import Path
+import re
+import ssl
+import uuid
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+
+def self_signed_certificate(directory: Path) -> tuple[Path, Path]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=1))
+        .not_valid_after(now + timedelta(hours=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+            ),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = directory / "drive.pem", directory / "drive.key"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return cert_path, key_path
+
+
+class DriveStandIn:
+    def __init__(self, directory: Path) -> None:
+        self.files: dict[str, dict] = {}
+        self.uploads: dict[str, dict] = {}
+        self.requests: list[str] = []
+        app = web.Application()
+        app.router.add_get("/drive/v3/files", self.list_files)
+        app.router.add_post("/upload/drive/v3/files", self.start_upload)
+        app.router.add_put("/upload/drive/v3/files", self.upload_chunk)
+        app.router.add_get("/drive/v3/files/{file_id}", self.get_file)
+        app.router.add_delete("/drive/v3/files/{file_id}", self.delete_file)
+        self.cert_path, key_path = self_signed_certificate(directory)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(self.cert_path, key_path)
+        self.server = TestServer(app, host="127.0.0.1", scheme="https")
+        self._ssl = context
+
+    @property
+    def api_endpoint(self) -> str:
+        return str(self.server.make_url("/drive/v3/"))
+
+    async def __aenter__(self) -> "DriveStandIn":
+        await self.server.start_server(ssl=self._ssl)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.server.close()
+
+    async def list_files(self, request: web.Request) -> web.Response:
+        self.requests.append("list")
+        match = re.search(r"value='([0-9a-f]+)'", request.query.get("q", ""))
+        sha256 = match.group(1) if match else None
+        files = [
+            {"id": f["id"]}
+            for f in self.files.values()
+            if f["appProperties"].get("sha256") == sha256
+        ]
+        return web.json_response({"files": files})
+
+    async def start_upload(self, request: web.Request) -> web.Response:
+        self.requests.append("create")
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {"metadata": await request.json(), "data": b""}
+        location = self.server.make_url(
+            f"/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+        )
+        return web.Response(headers={"Location": str(location)})
+
+    async def upload_chunk(self, request: web.Request) -> web.Response:
+        self.requests.append("chunk")
+        upload = self.uploads[request.query["upload_id"]]
+        upload["data"] += await request.read()
+        total = request.headers["Content-Range"].rsplit("/", 1)[1]
+        if total == "*" or len(upload["data"]) < int(total):
+            return web.Response(
+                status=308, headers={"Range": f"bytes=0-{len(upload['data']) - 1}"}
+            )
+        file_id = uuid.uuid4().hex
+        self.files[file_id] = {
+            "id": file_id,
+            "name": upload["metadata"]["name"],
+            "appProperties": upload["metadata"].get("appProperties", {}),
+            "content": upload["data"],
+        }
+        return web.json_response({"id": file_id})
+
+    async def get_file(self, request: web.Request) -> web.Response:
+        file = self.files.get(request.match_info["file_id"])
+        if file is None:
+            return web.json_response(
+                {"error": {"code": 404, "message": "File not found"}}, status=404
+            )
+        if request.query.get("alt") != "media":
+            return web.json_response({"id": file["id"], "trashed": False})
+        self.requests.append("download")
+        content = file["content"]
+        start, end = 0, len(content) - 1
+        if match := re.match(r"bytes=(\d+)-(\d+)", request.headers.get("Range", "")):
+            start, end = int(match.group(1)), min(int(match.group(2)), end)
+        return web.Response(
+            status=206,
+            body=content[start : end + 1],
+            headers={"Content-Range": f"bytes {start}-{end}/{len(content)}"},
+        )
+
+    async def delete_file(self, request: web.Request) -> web.Response:
+        if self.files.pop(request.match_info["file_id"], None) is None:
+            return web.Response(
+                status=404,
+                text=json.dumps({"error": {"code": 404, "message": "File not found"}}),
+                content_type="application/json",
+            )
+        return web.Response(status=204)
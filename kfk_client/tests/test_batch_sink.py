@@ -0,0 +1,124 @@
+import asyncio
+
+from aiokafka import TopicPartition
+import pytest
+
+from src.broker.sinks import BatchSink
+
+TP = TopicPartition("topic", 0)
+
+
+class RecordingSink(BatchSink[int]):
+    def __init__(self, *args, fail: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail = fail
+        self.written: list[list[int]] = []
+        self.dropped: list[list[int]] = []
+
+    async def write(self, items: list[int]) -> None:
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("database is down")
+        self.written.append(list(items))
+
+    async def dead_letter(self, items: list[int], error: Exception) -> None:
+        self.dropped.append(list(items))
+
+
+class Commits:
+    def __init__(self):
+        self.offsets: list[dict[TopicPartition, int]] = []
+
+    async def __call__(self, offsets: dict[TopicPartition, int]) -> None:
+        self.offsets.append(offsets)
+
+
+async def test_flushes_when_batch_is_full():
+    commits = Commits()
+    sink = RecordingSink(batch_size=3, flush_interval_ms=60_000, commit=commits)
+    for offset in range(4):
+        await sink.add(offset, TP, offset)
+    assert sink.written == [[0, 1, 2]]
+    assert commits.offsets == [{TP: 3}]
+    await sink.stop()
+    assert sink.written == [[0, 1, 2], [3]]
+    assert commits.offsets[-1] == {TP: 4}
+
+
+async def test_marker_only_commits_offset():
+    commits = Commits()
+    sink = RecordingSink(batch_size=10, flush_interval_ms=60_000, commit=commits)
+    await sink.add(None, TP, 7)
+    await sink.flush()
+    assert sink.written == []
+    assert commits.offsets == [{TP: 8}]
+    await sink.stop()
+
+
+async def test_failed_write_is_retried_and_not_committed():
+    commits = Commits()
+    sink = RecordingSink(
+        batch_size=10, flush_interval_ms=60_000, commit=commits, fail=1
+    )
+    await sink.add(1, TP, 0)
+    with pytest.raises(RuntimeError):
+        await sink.flush()
+    assert commits.offsets == []
+    await sink.flush()
+    assert sink.written == [[1]]
+    assert commits.offsets == [{TP: 1}]
+    await sink.stop()
+
+
+async def test_poison_batch_is_dropped_after_max_retries():
+    commits = Commits()
+    sink = RecordingSink(
+        batch_size=10,
+        flush_interval_ms=60_000,
+        commit=commits,
+        max_retries=2,
+        fail=100,
+    )
+    await sink.add(1, TP, 0)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await sink.flush()
+    await sink.flush()
+    assert sink.dropped == [[1]]
+    assert commits.offsets == [{TP: 1}]
+    # the next batch starts with a fresh retry budget
+    sink.fail = 1
+    await sink.add(2, TP, 1)
+    with pytest.raises(RuntimeError):
+        await sink.flush()
+    await sink.flush()
+    assert sink.written == [[2]]
+    await sink.stop()
+
+
+async def test_retries_survive_clear():
+    # a batch consumer clears the sink and redelivers the failed batch
+    sink = RecordingSink(batch_size=10, flush_interval_ms=60_000, max_retries=1, fail=100)
+    for _ in range(2):
+        await sink.add(1)
+        try:
+            await sink.flush()
+        except RuntimeError:
+            await sink.clear()
+    assert sink.dropped == [[1]]
+    await sink.stop()
+
+
+async def test_hold_suspends_size_and_timer_flushes():
+    sink = RecordingSink(batch_size=2, flush_interval_ms=10)
+    with sink.hold():
+        for item in range(5):
+            await sink.add(item)
+        await asyncio.sleep(0.05)
+        assert sink.written == []
+        await sink.flush()
+    assert sink.written == [[0, 1, 2, 3, 4]]
+    await sink.add(5)
+    await asyncio.sleep(0.05)
+    assert sink.written[-1] == [5]
+    await sink.stop()
@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from src.broker import sinks
+from src.broker.consumers import ConsumeCSV
+from src.broker.sinks import CsvResult, EmailInsertSink
+
+
+def reply(**fields) -> str:
+    return json.dumps(
+        {
+            "id": None,
+            "subject": "Hello",
+            "from_email": "sender@example.com",
+            "to_email": "user@example.com",
+            "message_body": "Body",
+            "status": "sent",
+            "status_message": "ok",
+            "file_id": 1,
+            "shard": 0,
+        }
+        | fields
+    )
+
+
+def test_parse_validates_rows_before_buffering():
+    consumer = ConsumeCSV()
+    sent = consumer._parse(reply())
+    assert sent is not None and sent.email is not None
+    assert sent.email.to_email == "user@example.com"
+
+    failed = consumer._parse(reply(status="error"))
+    assert failed is not None and failed.email is None
+
+    # a reply the mail worker accepted but EmailCreate does not is an error row
+    too_long = consumer._parse(reply(to_email=f"{'a' * 95}@example.com"))
+    assert too_long is not None and too_long.email is None
+    assert too_long.reply.shard == 0
+
+    assert consumer._parse("not json") is None
+
+
+class Session:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def commit(self):
+        self.calls.append("commit")
+
+
+class Service:
+    def __init__(self, calls: list):
+        self.calls = calls
+        # rows recorded in campaign_rows
+        self.rows: set[tuple[int, int, int]] = set()
+
+    def __call__(self, repository):
+        return self
+
+    async def claim_rows(self, rows, commit=True):
+        self.calls.append(("claim_rows", len(rows), commit))
+        new = set(rows) - self.rows
+        self.rows |= new
+        return new
+
+    async def bulk_create(self, emails, commit=True):
+        self.calls.append(("bulk_create", len(emails), commit))
+
+    async def add_progress(self, progress, commit=True):
+        self.calls.append(("add_progress", progress, commit))
+
+
+@pytest.fixture
+def service() -> Service:
+    return Service([])
+
+
+@pytest.fixture
+def calls(monkeypatch, service):
+    calls = service.calls
+    monkeypatch.setattr(sinks, "async_session_factory", lambda: Session(calls))
+    monkeypatch.setattr(sinks, "EmailsService", service)
+    monkeypatch.setattr(sinks, "CampaignShardsService", service)
+    monkeypatch.setattr(sinks, "EmailRepository", lambda session: None)
+    monkeypatch.setattr(sinks, "CampaignShardRepository", lambda session: None)
+    return calls
+
+
+async def test_insert_and_progress_commit_once(calls):
+    consumer = ConsumeCSV()
+    items = [
+        consumer._parse(reply(row_index=0)),
+        consumer._parse(reply(row_index=1, status="error")),
+        consumer._parse(reply(row_index=0, shard=1)),
+        consumer._parse(reply(shard=2, shard_failed=True)),
+    ]
+    sink = EmailInsertSink(batch_size=10, flush_interval_ms=60_000)
+    await sink.write([item for item in items if isinstance(item, CsvResult)])
+
+    assert calls == [
+        ("claim_rows", 3, False),
+        ("bulk_create", 2, False),
+        (
+            "add_progress",
+            {(1, 0): (1, 1, False), (1, 1): (1, 0, False), (1, 2): (0, 0, True)},
+            False,
+        ),
+        "commit",
+    ]
+
+
+async def test_redelivered_replies_are_stored_once(calls, service):
+    consumer = ConsumeCSV()
+    sink = EmailInsertSink(batch_size=10, flush_interval_ms=60_000)
+    first = [consumer._parse(reply(row_index=i)) for i in range(3)]
+    await sink.write([item for item in first if isinstance(item, CsvResult)])
+    calls.clear()
+
+    # the mail service replies again to rows 1 and 2 after a redelivery,
+    # row 3 is new and its reply is repeated inside the batch
+    again = [
+        consumer._parse(reply(row_index=1)),
+        consumer._parse(reply(row_index=2, status="error")),
+        consumer._parse(reply(row_index=3)),
+        consumer._parse(reply(row_index=3)),
+    ]
+    await sink.write([item for item in again if isinstance(item, CsvResult)])
+
+    assert calls == [
+        ("claim_rows", 3, False),
+        ("bulk_create", 1, False),
+        ("add_progress", {(1, 0): (1, 0, False)}, False),
+        "commit",
+    ]
+    assert service.rows == {(1, 0, i) for i in range(4)}
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+
+from google.auth.credentials import AnonymousCredentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import build_http
+import pytest
+
+from src.storage.storage import GoogleDriveStorageService
+from tests.drive_standin import DriveStandIn
+
+CHUNK_SIZE = 256 * 1024
+
+
+class StandInDriveStorage(GoogleDriveStorageService):
+    """Trusts the self-signed certificate of the stand-in."""
+
+    def __init__(self, cert_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cert_path = cert_path
+
+    def _new_http(self) -> AuthorizedHttp:
+        http = build_http()
+        http.ca_certs = self.cert_path
+        return AuthorizedHttp(self.credentials, http=http)
+
+
+@pytest.fixture
+async def drive(tmp_path):
+    async with DriveStandIn(tmp_path) as standin:
+        yield standin
+
+
+@pytest.fixture
+def storage(drive: DriveStandIn):
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield StandInDriveStorage(
+        cert_path=str(drive.cert_path),
+        credentials=AnonymousCredentials(),
+        folder_id="folder",
+        filetype="csv",
+        executor=executor,
+        chunk_size=CHUNK_SIZE,
+        api_endpoint=drive.api_endpoint,
+    )
+    executor.shutdown(wait=True)
+
+
+async def chunks(data: bytes, size: int = 100_000):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def read_all(storage: GoogleDriveStorageService, file_id: str) -> bytes:
+    return b"".join([chunk async for chunk in await storage.get_file(file_id)])
+
+
+async def test_resumable_upload_and_ranged_download(drive, storage):
+    data = os.urandom(CHUNK_SIZE * 2 + 1000)
+    stored = await storage.save_stream("campaign.csv", chunks(data))
+
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.size == len(data)
+    assert not stored.deduplicated
+    # three upload chunks and three download chunks
+    assert drive.requests.count("chunk") == 3
+    assert await read_all(storage, stored.path) == data
+    assert drive.requests.count("download") == 3
+
+
+async def test_same_content_is_deduplicated(drive, storage):
+    data = b"subject,from_email,to_email\n" * 1000
+    first = await storage.save_stream("a.csv", chunks(data))
+    second = await storage.save_stream("b.csv", chunks(data))
+
+    assert second.deduplicated
+    assert second.path == first.path
+    assert len(drive.files) == 1
+
+
+async def test_exists_and_delete(drive, storage):
+    stored = await storage.save_stream("campaign.csv", chunks(b"a,b\n1,2\n"))
+    assert await storage.exists(stored.path)
+
+    await storage.delete_file(stored.path)
+    assert not await storage.exists(stored.path)
+    assert drive.files == {}
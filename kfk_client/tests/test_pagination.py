@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+import pytest
+
+from src.core.repository.emails import EmailRepository
+from src.core.repository.uploaded_file import UploadedFileRepository
+from src.core.schemas.base import CursorPaginationSchema
+from src.utils.string import decode_cursor, encode_cursor
+
+CREATED_AT = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def repository() -> EmailRepository:
+    return EmailRepository(session=None)  # type: ignore
+
+
+def params(cursor: str, sort_by: str = "created_at", sort_order: str = "asc"):
+    return CursorPaginationSchema(cursor=cursor, sort_by=sort_by, sort_order=sort_order)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["created_at", "desc", CREATED_AT, 42])
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ["created_at", "desc", str(CREATED_AT), 42]
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90IGpzb24", encode_cursor({"a": 1})])
+def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_sort_columns_are_non_null(repository):
+    for sort_by in ("id", "subject", "created_at"):
+        assert repository.get_sort_column(sort_by).key == sort_by
+    for sort_by in ("status", "message_body", "nope"):
+        with pytest.raises(HTTPException) as exc_info:
+            repository.get_sort_column(sort_by)
+        assert exc_info.value.status_code == 400
+    # nullable, or JSON that a cursor cannot hold
+    files = UploadedFileRepository(session=None)  # type: ignore
+    for sort_by in ("file_size", "invalid_rows"):
+        with pytest.raises(HTTPException):
+            files.get_sort_column(sort_by)
+
+
+def test_decode_cursor_converts_column_values(repository):
+    column = repository.get_sort_column("created_at")
+    cursor = encode_cursor(["created_at", "asc", CREATED_AT, 42])
+    assert repository._decode_cursor(params(cursor), column) == (CREATED_AT, 42)
+
+    column = repository.get_sort_column("id")
+    cursor = encode_cursor(["id", "desc", 42, 42])
+    assert repository._decode_cursor(params(cursor, "id", "desc"), column) == (42, 42)
+
+
+@pytest.mark.parametrize(
+    "sort_by, values",
+    [
+        ("created_at", ["created_at", "asc", "yesterday", 42]),
+        ("created_at", ["created_at", "asc", 1760790600, 42]),
+        ("id", ["id", "asc", "42", 42]),
+        ("id", ["id", "asc", True, 42]),
+        ("subject", ["subject", "asc", 1, 42]),
+        ("subject", ["subject", "asc", "a", "42"]),
+        ("subject", ["subject", "asc", "a"]),
+    ],
+)
+def test_tampered_cursor_is_a_bad_request(repository, sort_by, values):
+    column = repository.get_sort_column(sort_by)
+    with pytest.raises(HTTPException) as exc_info:
+        repository._decode_cursor(params(encode_cursor(values), sort_by), column)
+    assert (exc_info.value.status_code, exc_info.value.detail) == (400, "Invalid cursor")
+
+
+def test_cursor_of_another_sort_order(repository):
+    column = repository.get_sort_column("id")
+    cursor = encode_cursor(["id", "asc", 42, 42])
+    with pytest.raises(HTTPException) as exc_info:
+        repository._decode_cursor(params(cursor, "id", "desc"), column)
+    assert exc_info.value.detail == "Cursor does not match the sort order"
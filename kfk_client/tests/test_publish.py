@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+from src.api.api_v1.files import publish_campaign
+from src.core.schemas.campaign_shard import CampaignShardMessage, CampaignShardRead
+from src.core.schemas.uploaded_file import UploadedFileRead
+
+NOW = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+FILE = UploadedFileRead(
+    id=7,
+    file_name="campaign.csv",
+    file_path="campaigns/campaign.csv",
+    user_id=1,
+    row_count=250,
+    created_at=NOW,
+)
+
+
+def shard(number: int, row_count: int) -> CampaignShardRead:
+    return CampaignShardRead(
+        id=number + 1,
+        file_id=FILE.id,
+        shard=number,
+        row_start=number * 100,
+        row_count=row_count,
+        byte_start=number * 1000,
+        byte_end=(number + 1) * 1000,
+        sent_count=0,
+        error_count=0,
+        status="publishing",
+        updated_at=NOW,
+    )
+
+
+class ShardsService:
+    def __init__(self) -> None:
+        self.finished: tuple[list[int], list[int]] | None = None
+
+    async def claim_unpublished(self, file_id: int) -> list[CampaignShardRead]:
+        return [shard(0, 100), shard(1, 100), shard(2, 50)]
+
+    async def finish_publishing(
+        self, file_id: int, published: list[int], failed: list[int]
+    ) -> None:
+        self.finished = (published, failed)
+
+
+class Broker:
+    def __init__(self, fail_shard: int) -> None:
+        self.sent: dict[str, CampaignShardMessage] = {}
+        self.fail_shard = fail_shard
+
+    async def send_message(self, value: CampaignShardMessage, key: str) -> None:
+        if value.shard == self.fail_shard:
+            raise Exception("Broker is unavailable")
+        self.sent[key] = value
+
+
+async def test_shards_carry_their_own_row_count():
+    shards, broker = ShardsService(), Broker(fail_shard=1)
+
+    failed = await publish_campaign(
+        FILE,
+        fieldnames=["subject", "to_email"],
+        shard_count=3,
+        shards_service=shards,  # type: ignore[arg-type]
+        broker=broker,  # type: ignore[arg-type]
+    )
+
+    assert failed == 1
+    assert shards.finished == ([0, 2], [1])
+    assert {key: m.row_count for key, m in broker.sent.items()} == {"7:0": 100, "7:2": 50}
+    message = broker.sent["7:2"]
+    assert (message.id, message.file_path, message.shard_count) == (7, FILE.file_path, 3)
+    assert (message.row_start, message.byte_start, message.byte_end) == (200, 2000, 3000)
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+import pytest
+
+from src.core.repository.base import BaseRepository
+from src.core.repository.campaign_shard import CampaignShardRepository
+from src.core.repository.emails import EmailRepository
+from src.core.repository.uploaded_file import UploadedFileRepository
+from src.core.schemas.emails import EmailRead
+
+CREATED_AT = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+
+
+def row(**fields) -> dict:
+    return {
+        "id": 42,
+        "subject": "Hello",
+        "from_email": "sender@example.com",
+        "to_email": "user@example.com",
+        "message_body": None,
+        "status": "sent",
+        "created_at": CREATED_AT,
+        "updated_at": CREATED_AT,
+    } | fields
+
+
+@pytest.fixture
+def repository() -> EmailRepository:
+    return EmailRepository(session=None)  # type: ignore
+
+
+def test_only_repositories_of_validated_tables_trust_their_rows():
+    assert not BaseRepository.trusted_reads
+    assert not CampaignShardRepository.trusted_reads
+    assert EmailRepository.trusted_reads and UploadedFileRepository.trusted_reads
+
+
+def test_read_columns_follow_the_read_schema(repository):
+    assert {c.key for c in repository.read_columns()} == set(EmailRead.model_fields)
+    # a sort column outside the read schema is selected only when asked for
+    extra = repository.model.__table__.c.status
+    assert repository.read_columns(extra).count(extra) == 1
+
+
+def test_trusted_rows_are_constructed(repository):
+    read = repository.to_read_schema(row(subject_sort="Hello"))  # type: ignore[arg-type]
+    assert read == EmailRead.model_validate(row())
+    assert read.model_dump() == row()
+    # extra sort columns are dropped, not validated
+    assert "subject_sort" not in read.model_fields_set
+    assert not hasattr(read, "subject_sort")
+
+    # no per-row validation, the database is trusted to hold valid emails
+    read = repository.to_read_schema(row(to_email="not-an-email"))  # type: ignore[arg-type]
+    assert read.to_email == "not-an-email"
+
+
+def test_untrusted_rows_are_validated(repository, monkeypatch):
+    monkeypatch.setattr(repository, "trusted_reads", False)
+    read = repository.to_read_schema(row(subject_sort="Hello"))  # type: ignore[arg-type]
+    assert read == EmailRead.model_validate(row())
+
+    with pytest.raises(ValidationError):
+        repository.to_read_schema(row(to_email="not-an-email"))  # type: ignore[arg-type]
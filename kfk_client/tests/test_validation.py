@@ -0,0 +1,123 @@
+import csv
+import os
+
+from fastapi import HTTPException
+import pytest
+
+from src.config import settings
+from src.storage.validation import (
+    CsvValidationResult,
+    cleaned_csv,
+    shutdown_process_pool,
+    validate_row,
+)
+
+HEADER = "subject,from_email,to_email,message_body\n"
+
+
+def row(**fields) -> dict:
+    return {
+        "subject": "Hello",
+        "from_email": "sender@example.com",
+        "to_email": "user@example.com",
+        "message_body": "Body",
+    } | fields
+
+
+def make_csv(rows: int, bad_every: int = 0) -> bytes:
+    lines = [HEADER]
+    for i in range(rows):
+        bad = bad_every and i % bad_every == 0
+        to_email = "not-an-email" if bad else f"user{i}@example.com"
+        lines.append(f"Subject {i},sender@example.com,{to_email},Body {i}\n")
+    return "".join(lines).encode()
+
+
+async def chunks(data: bytes, size: int = 4096):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.fixture(autouse=True)
+def tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.storage, "validation_tmp_dir", str(tmp_path))
+    monkeypatch.setattr(settings.storage, "csv_shard_rows", 100)
+    yield tmp_path
+    shutdown_process_pool()
+
+
+def test_validate_row_accepts_what_the_worker_sends():
+    assert validate_row(row()) == []
+    assert validate_row(row(message_body="")) == []
+    assert validate_row(row(message_body=None)) == []
+    assert validate_row(row(subject="")) == []
+
+
+def test_validate_row_rejects_what_the_worker_rejects():
+    assert validate_row(row(subject=None)) == ["subject: Input should be a valid string"]
+    [error] = validate_row(row(to_email="user@@example.com"))
+    assert error.startswith("to_email: value is not a valid email address")
+    [error] = validate_row(row(from_email=f"{'a' * 95}@example.com"))
+    assert error.startswith("from_email: Value should have at most 100 items")
+    assert len(validate_row(row(from_email="", to_email="x"))) == 2
+
+
+def test_shard_ranges():
+    result = CsvValidationResult(
+        row_count=250, shard_offsets=[(0, 40), (100, 4000), (200, 8000)], size=10000
+    )
+    assert result.shard_ranges() == [
+        (0, 100, 40, 4000),
+        (100, 100, 4000, 8000),
+        (200, 50, 8000, 10000),
+    ]
+
+
+@pytest.mark.parametrize("in_process", [False, True])
+async def test_cleaned_csv(monkeypatch, in_process):
+    if in_process:
+        monkeypatch.setattr(settings.storage, "validation_process_min_size", 8192)
+    data = make_csv(250, bad_every=10)
+
+    async with cleaned_csv(chunks(data)) as cleaned:
+        result = cleaned.result
+        content = b"".join([chunk async for chunk in cleaned.chunks()])
+        path = cleaned.path
+    assert not os.path.exists(path)
+
+    assert (result.row_count, result.invalid_row_count) == (250, 25)
+    assert [entry["line"] for entry in result.invalid_rows[:2]] == [2, 12]
+    assert result.fieldnames == ["subject", "from_email", "to_email", "message_body"]
+    assert result.size == len(content)
+    rows = list(csv.DictReader(content.decode().splitlines()))
+    assert len(rows) == 225
+    assert all(validate_row(r) == [] for r in rows)
+    # every shard starts at the first byte of a row
+    for row_start, row_count, byte_start, byte_end in result.shard_ranges():
+        shard = list(csv.reader(content[byte_start:byte_end].decode().splitlines()))
+        assert len(shard) == row_count
+        assert shard[0] == list(rows[row_start].values())
+
+
+@pytest.mark.parametrize("in_process", [False, True])
+async def test_cleaned_csv_enforces_max_size(monkeypatch, tmp_dir, in_process):
+    if in_process:
+        monkeypatch.setattr(settings.storage, "validation_process_min_size", 8192)
+    data = make_csv(1000)
+
+    with pytest.raises(HTTPException) as exc_info:
+        async with cleaned_csv(chunks(data), max_size=len(data) - 1):
+            pass
+    assert exc_info.value.status_code == 413
+    assert os.listdir(tmp_dir) == []
+
+
+@pytest.mark.parametrize("in_process", [False, True])
+async def test_cleaned_csv_rejects_malformed_csv(monkeypatch, in_process):
+    if in_process:
+        monkeypatch.setattr(settings.storage, "validation_process_min_size", 8192)
+
+    with pytest.raises(HTTPException) as exc_info:
+        async with cleaned_csv(chunks(b"\xff\xfe" * 10000)):
+            pass
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from typing import Any, Protocol, Self
+
+from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition
+from aiokafka.abc import ConsumerRebalanceListener
+from aiokafka.errors import IllegalStateError
+
+logger = logging.getLogger(__name__)
+
+# Pause before a partition is fetched again from a failed record
+RETRY_DELAY = 1
+
+
+class RecordProcessor(Protocol):
+    """The part of a service's ConsumeBase the runner calls."""
+
+    async def process_record(self, record: ConsumerRecord) -> None: ...
+
+    async def flush(self) -> None: ...
+
+
+#########################
+### Partition Workers ###
+#########################
+
+
+class PartitionWorker:
+    """Processes the records of one partition strictly in offset order."""
+
+    def __init__(
+        self,
+        tp: TopicPartition,
+        runner: "PartitionRunner",
+    ) -> None:
+        self.tp = tp
+        self.runner = runner
+        self.queue: asyncio.Queue[ConsumerRecord] = asyncio.Queue()
+        self.processed_offset: int | None = None
+        self.committed_offset: int | None = None
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            record = await self.queue.get()
+            try:
+                await self.runner.message_service.process_record(record)
+            except Exception as e:
+                logger.error(
+                    "Error while processing message %s of %s, retrying: %s",
+                    record.offset,
+                    self.tp,
+                    e,
+                )
+                self.rewind(record.offset)
+                await asyncio.sleep(RETRY_DELAY)
+                self.runner.maybe_resume(self)
+                continue
+            self.processed_offset = record.offset
+            self.queue.task_done()
+            self.runner.maybe_resume(self)
+
+    def rewind(self, offset: int) -> None:
+        """
+        Fetch the partition again from the failed record. The records queued
+        behind it are dropped, they come back with the refetch. Nothing here
+        awaits, so no record fetched before the seek reaches the queue after it.
+        """
+        # the failed record and the dropped ones
+        self.queue.task_done()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+        try:
+            self.runner.consumer.pause(self.tp)
+            self.runner.consumer.seek(self.tp, offset)
+        except IllegalStateError:
+            # revoked meanwhile, the new owner starts at the committed offset
+            pass
+
+    async def drain(self) -> None:
+        await self.queue.join()
+
+    async def stop(self) -> None:
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+class PartitionRunner(ConsumerRebalanceListener):
+    """
+    Fans records out to one worker per assigned partition.
+
+    Partitions are processed concurrently, records of a partition in order.
+    Processed offsets are committed every `commit_interval_ms` after
+    `message_service.flush()`. A record that fails is fetched and processed
+    again after `RETRY_DELAY`, the offsets of its partition stay before it
+    until it succeeds. A partition whose queue reaches `queue_size` is paused
+    until its worker catches up. On rebalance the revoked partitions are
+    drained and committed before they are handed over.
+    """
+
+    def __init__(
+        self: Self,
+        consumer: AIOKafkaConsumer,
+        message_service: RecordProcessor,
+        queue_size: int,
+        commit_interval_ms: int,
+        max_records: int,
+    ) -> None:
+        self.consumer = consumer
+        self.message_service = message_service
+        self.queue_size = queue_size
+        self.commit_interval = commit_interval_ms / 1000
+        self.max_records = max_records
+        self.workers: dict[TopicPartition, PartitionWorker] = {}
+        self._commit_lock = asyncio.Lock()
+
+    async def run(self: Self) -> None:
+        committer = asyncio.create_task(self._commit_periodically())
+        try:
+            while True:
+                batches = await self.consumer.getmany(
+                    timeout_ms=int(self.commit_interval * 1000),
+                    max_records=self.max_records,
+                )
+                for tp, records in batches.items():
+                    worker = self.workers.get(tp)
+                    if worker is None:
+                        worker = self.workers[tp] = PartitionWorker(tp, self)
+                    for record in records:
+                        worker.queue.put_nowait(record)
+                    if worker.queue.qsize() >= self.queue_size:
+                        self.consumer.pause(tp)
+        finally:
+            committer.cancel()
+            await asyncio.gather(committer, return_exceptions=True)
+            for worker in self.workers.values():
+                await worker.stop()
+            await self.commit()
+            self.workers.clear()
+
+    def maybe_resume(self: Self, worker: PartitionWorker) -> None:
+        if (
+            worker.tp in self.consumer.paused()
+            and worker.queue.qsize() <= self.queue_size // 2
+        ):
+            self.consumer.resume(worker.tp)
+
+    async def commit(self: Self, partitions: list[TopicPartition] | None = None) -> None:
+        async with self._commit_lock:
+            workers = [
+                worker
+                for tp, worker in self.workers.items()
+                if partitions is None or tp in partitions
+            ]
+            # Snapshot before flushing, everything in it is flushed below
+            offsets = {
+                worker: worker.processed_offset
+                for worker in workers
+                if worker.processed_offset is not None
+                and worker.processed_offset != worker.committed_offset
+            }
+            if not offsets:
+                return
+            try:
+                await self.message_service.flush()
+                await self.consumer.commit(
+                    {worker.tp: offset + 1 for worker, offset in offsets.items()}
+                )
+            except Exception as e:
+                logger.error("Failed to commit partition offsets: %s", e)
+                return
+            for worker, offset in offsets.items():
+                worker.committed_offset = offset
+
+    # aiokafka awaits the coroutine a listener returns, its base class
+    # declares the callbacks without a return type
+    def on_partitions_revoked(self: Self, revoked: list[TopicPartition]) -> Any:
+        return self._release(revoked)
+
+    def on_partitions_assigned(self: Self, assigned: list[TopicPartition]) -> None:
+        logger.info("Partitions assigned: %s", assigned)
+
+    async def _release(self: Self, revoked: list[TopicPartition]) -> None:
+        revoked = [tp for tp in revoked if tp in self.workers]
+        if not revoked:
+            return
+        logger.info("Draining revoked partitions: %s", revoked)
+        await asyncio.gather(*(self.workers[tp].drain() for tp in revoked))
+        await self.commit(revoked)
+        for tp in revoked:
+            await self.workers.pop(tp).stop()
+
+    def lag(self: Self) -> dict[str, dict[str, int | None]]:
+        result = {}
+        for tp in self.consumer.assignment():
+            worker = self.workers.get(tp)
+            highwater = self.consumer.highwater(tp)
+            processed = worker.processed_offset if worker else None
+            lag = None
+            if highwater is not None and processed is not None:
+                lag = highwater - processed - 1
+            result[f"{tp.topic}-{tp.partition}"] = {
+                "highwater": highwater,
+                "processed_offset": processed,
+                "queued": worker.queue.qsize() if worker else 0,
+                "lag": lag,
+            }
+        return result
+
+    async def _commit_periodically(self: Self) -> None:
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            await self.commit()
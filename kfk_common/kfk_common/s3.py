@@ -0,0 +1,274 @@
+"""
+Minimal S3-compatible object store client (AWS S3, MinIO, ...)
+
+Requests are signed with AWS Signature V4 and sent with a shared
+httpx connection pool. Only the calls used by the storage backends
+are implemented: single and multipart PUT, ranged GET, HEAD, copy and delete.
+"""
+
+from datetime import datetime, timezone
+import hashlib
+import hmac
+from logging import getLogger
+from typing import AsyncIterator
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+import httpx
+
+
+logger = getLogger(__name__)
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+# S3 rejects multipart parts smaller than 5MB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3Error(Exception):
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        super().__init__(f"S3 error {status_code}: {message}")
+
+
+class S3Client:
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        timeout: float = 30,
+        max_connections: int = 20,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    ############
+    ## OBJECT ##
+    ############
+
+    async def put_object(self, key: str, data: bytes) -> None:
+        await self._request("PUT", key, content=data)
+
+    async def head_object(self, key: str) -> int | None:
+        """Object size in bytes or None if it does not exist."""
+        response = await self._request("HEAD", key, allow_missing=True)
+        if response.status_code == 404:
+            return None
+        return int(response.headers["content-length"])
+
+    async def get_range(self, key: str, start: int, end: int) -> bytes:
+        """Bytes `start..end` of the object, both inclusive."""
+        response = await self._request(
+            "GET", key, headers={"range": f"bytes={start}-{end}"}
+        )
+        return response.content
+
+    async def iter_object(
+        self,
+        key: str,
+        chunk_size: int,
+        start: int = 0,
+        end: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the object with ranged GETs of `chunk_size` bytes,
+        `end` is exclusive.
+        """
+        if end is None:
+            size = await self.head_object(key)
+            if size is None:
+                raise FileNotFoundError(f'Object "{key}" not found')
+            end = size
+        position = start
+        while position < end:
+            chunk = await self.get_range(
+                key, position, min(position + chunk_size, end) - 1
+            )
+            if not chunk:
+                return
+            position += len(chunk)
+            yield chunk
+
+    async def copy_object(self, source_key: str, key: str) -> None:
+        await self._request(
+            "PUT",
+            key,
+            headers={"x-amz-copy-source": self._path(source_key)},
+        )
+
+    async def delete_object(self, key: str) -> None:
+        await self._request("DELETE", key, allow_missing=True)
+
+    ###############
+    ## MULTIPART ##
+    ###############
+
+    async def create_multipart_upload(self, key: str) -> str:
+        response = await self._request("POST", key, params={"uploads": ""})
+        return self._xml_value(response.content, "UploadId")
+
+    async def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        response = await self._request(
+            "PUT",
+            key,
+            params={"partNumber": str(part_number), "uploadId": upload_id},
+            content=data,
+        )
+        return response.headers["etag"]
+
+    async def complete_multipart_upload(
+        self, key: str, upload_id: str, etags: list[str]
+    ) -> None:
+        parts = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+            for number, etag in enumerate(etags, start=1)
+        )
+        body = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>"
+        await self._request(
+            "POST", key, params={"uploadId": upload_id}, content=body.encode()
+        )
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._request(
+            "DELETE", key, params={"uploadId": upload_id}, allow_missing=True
+        )
+
+    async def upload_stream(
+        self, key: str, chunks: AsyncIterator[bytes], part_size: int
+    ) -> None:
+        """
+        Upload a stream of unknown length. Small streams are sent with a single
+        PUT, larger ones as a multipart upload that is aborted on failure.
+        """
+        part_size = max(part_size, MIN_PART_SIZE)
+        buffer = bytearray()
+        upload_id: str | None = None
+        etags: list[str] = []
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) < part_size:
+                    continue
+                if upload_id is None:
+                    upload_id = await self.create_multipart_upload(key)
+                etags.append(
+                    await self.upload_part(
+                        key, upload_id, len(etags) + 1, bytes(buffer)
+                    )
+                )
+                buffer.clear()
+
+            if upload_id is None:
+                await self.put_object(key, bytes(buffer))
+                return
+            if buffer:
+                etags.append(
+                    await self.upload_part(
+                        key, upload_id, len(etags) + 1, bytes(buffer)
+                    )
+                )
+            await self.complete_multipart_upload(key, upload_id, etags)
+        except BaseException:
+            if upload_id is not None:
+                await self.abort_multipart_upload(key, upload_id)
+            raise
+
+    #############
+    ## SIGNING ##
+    #############
+
+    def _path(self, key: str) -> str:
+        # path-style addressing works for both AWS and MinIO
+        return quote(f"/{self.bucket}/{key}", safe="/-_.~")
+
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        params: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content: bytes = b"",
+        allow_missing: bool = False,
+    ) -> httpx.Response:
+        path = self._path(key)
+        query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted((params or {}).items())
+        )
+        headers = self._sign(method, path, query, dict(headers or {}), content)
+        url = f"{self.endpoint_url}{path}" + (f"?{query}" if query else "")
+        response = await self._client.request(
+            method, url, headers=headers, content=content
+        )
+        if response.status_code == 404 and allow_missing:
+            return response
+        if response.status_code >= 300:
+            raise S3Error(response.status_code, response.text)
+        return response
+
+    def _sign(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        headers: dict[str, str],
+        content: bytes,
+        now: datetime | None = None,
+    ) -> dict[str, str]:
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        payload_hash = hashlib.sha256(content).hexdigest() if content else EMPTY_SHA256
+
+        headers["host"] = httpx.URL(self.endpoint_url).netloc.decode()
+        headers["x-amz-date"] = amz_date
+        headers["x-amz-content-sha256"] = payload_hash
+        signed = sorted(name.lower() for name in headers)
+        canonical_headers = "".join(
+            f"{name}:{str(headers[name]).strip()}\n" for name in signed
+        )
+        signed_headers = ";".join(signed)
+        canonical_request = "\n".join(
+            (method, path, query, canonical_headers, signed_headers, payload_hash)
+        )
+
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            (
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            )
+        )
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+
+    @staticmethod
+    def _xml_value(body: bytes, tag: str) -> str:
+        for element in ElementTree.fromstring(body).iter():
+            if element.tag.rsplit("}", 1)[-1] == tag and element.text:
+                return element.text
+        raise S3Error(200, f"{tag} is missing in the response")
@@ -0,0 +1,126 @@
+"""
+In-memory stand-in for the parts of the S3 API used by S3Client: object
+PUT, ranged GET, HEAD, DELETE and multipart uploads, path-style addressed.
+
+Every request must carry a SigV4 authorization header and an
+x-amz-content-sha256 that matches its body, as S3 checks both.
+"""
+
+import hashlib
+import re
+import uuid
+from xml.etree import ElementTree
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+class S3StandIn:
+    def __init__(self, bucket: str) -> None:
+        self.bucket = bucket
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        # the parts of the last completed upload
+        self.completed: list[bytes] = []
+        self.requests: list[str] = []
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route("*", "/{bucket}/{key:.+}", self.handle)
+        self.server = TestServer(app, host="127.0.0.1")
+
+    @property
+    def endpoint_url(self) -> str:
+        return str(self.server.make_url("/"))
+
+    async def __aenter__(self) -> "S3StandIn":
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.server.close()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if request.match_info["bucket"] != self.bucket:
+            return error(404, "NoSuchBucket")
+        body = await request.read()
+        sha256 = hashlib.sha256(body).hexdigest() if body else EMPTY_SHA256
+        if not request.headers.get("authorization", "").startswith("AWS4-HMAC-SHA256 "):
+            return error(403, "AccessDenied")
+        if request.headers.get("x-amz-content-sha256") != sha256:
+            return error(400, "XAmzContentSHA256Mismatch")
+
+        key, query = request.match_info["key"], request.query
+        if request.method == "POST" and "uploads" in query:
+            return self.create_upload()
+        if request.method == "PUT" and "uploadId" in query:
+            return self.upload_part(query["uploadId"], int(query["partNumber"]), body)
+        if request.method == "POST" and "uploadId" in query:
+            return self.complete_upload(key, query["uploadId"], body)
+        if request.method == "DELETE" and "uploadId" in query:
+            self.requests.append("abort")
+            self.uploads.pop(query["uploadId"], None)
+            return web.Response(status=204)
+        if request.method == "PUT":
+            self.requests.append("put")
+            self.objects[key] = body
+            return web.Response()
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return web.Response(status=204)
+
+        data = self.objects.get(key)
+        if data is None:
+            return error(404, "NoSuchKey")
+        if request.method == "HEAD":
+            return web.Response(headers={"Content-Length": str(len(data))})
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", request.headers.get("range", ""))
+        if match is None:
+            return web.Response(body=data)
+        start, end = int(match.group(1)), int(match.group(2))
+        return web.Response(status=206, body=data[start : end + 1])
+
+    def create_upload(self) -> web.Response:
+        self.requests.append("create")
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {}
+        return xml(
+            f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId>"
+            "</InitiateMultipartUploadResult>"
+        )
+
+    def upload_part(self, upload_id: str, number: int, body: bytes) -> web.Response:
+        self.requests.append("part")
+        parts = self.uploads.get(upload_id)
+        if parts is None:
+            return error(404, "NoSuchUpload")
+        parts[number] = body
+        return web.Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    def complete_upload(self, key: str, upload_id: str, body: bytes) -> web.Response:
+        self.requests.append("complete")
+        parts = self.uploads.pop(upload_id, None)
+        if parts is None:
+            return error(404, "NoSuchUpload")
+        listed = [
+            (int(part.findtext("PartNumber", "")), part.findtext("ETag"))
+            for part in ElementTree.fromstring(body).iter("Part")
+        ]
+        for number, etag in listed:
+            if etag != f'"{hashlib.md5(parts[number]).hexdigest()}"':
+                return error(400, "InvalidPart")
+        self.completed = [parts[number] for number, _ in listed]
+        self.objects[key] = b"".join(self.completed)
+        return xml("<CompleteMultipartUploadResult/>")
+
+
+def xml(body: str) -> web.Response:
+    return web.Response(body=body.encode(), content_type="application/xml")
+
+
+def error(status: int, code: str) -> web.Response:
+    return web.Response(
+        status=status,
+        body=f"<Error><Code>{code}</Code></Error>".encode(),
+        content_type="application/xml",
+    )
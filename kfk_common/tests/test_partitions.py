@@ -0,0 +1,136 @@
+import asyncio
+
+from aiokafka import ConsumerRecord, TopicPartition
+import pytest
+
+from kfk_common import partitions
+from kfk_common.partitions import PartitionRunner
+
+TP0, TP1 = TopicPartition("emails", 0), TopicPartition("emails", 1)
+RECORDS = 5
+
+
+def record(tp: TopicPartition, offset: int) -> ConsumerRecord:
+    return ConsumerRecord(
+        topic=tp.topic,
+        partition=tp.partition,
+        offset=offset,
+        timestamp=0,
+        timestamp_type=0,
+        key=None,
+        value=f"{tp.partition}:{offset}".encode(),
+        checksum=None,
+        serialized_key_size=0,
+        serialized_value_size=0,
+        headers=(),
+    )
+
+
+class Consumer:
+    """The AIOKafkaConsumer calls of the runner over an in-memory log."""
+
+    def __init__(self) -> None:
+        self.log = {tp: [record(tp, i) for i in range(RECORDS)] for tp in (TP0, TP1)}
+        self.positions = {tp: 0 for tp in self.log}
+        self._paused: set[TopicPartition] = set()
+        self.committed: dict[TopicPartition, int] = {}
+        self.seeks: list[tuple[TopicPartition, int]] = []
+
+    async def getmany(self, timeout_ms: int, max_records: int):
+        batches = {}
+        for tp, log in self.log.items():
+            position = self.positions[tp]
+            if tp not in self._paused and position < len(log):
+                batches[tp] = log[position : position + max_records]
+                self.positions[tp] += len(batches[tp])
+        if not batches:
+            await asyncio.sleep(timeout_ms / 1000)
+        return batches
+
+    def pause(self, tp: TopicPartition) -> None:
+        self._paused.add(tp)
+
+    def resume(self, tp: TopicPartition) -> None:
+        self._paused.discard(tp)
+
+    def paused(self) -> set[TopicPartition]:
+        return set(self._paused)
+
+    def seek(self, tp: TopicPartition, offset: int) -> None:
+        self.seeks.append((tp, offset))
+        self.positions[tp] = offset
+
+    async def commit(self, offsets: dict[TopicPartition, int]) -> None:
+        self.committed.update(offsets)
+
+    def assignment(self) -> set[TopicPartition]:
+        return set(self.log)
+
+    def highwater(self, tp: TopicPartition) -> int:
+        return len(self.log[tp])
+
+
+class Service:
+    def __init__(self, failures: int) -> None:
+        # how often the record at offset 2 of partition 0 fails
+        self.failures = failures
+        self.processed: dict[int, list[int]] = {0: [], 1: []}
+
+    async def process_record(self, record: ConsumerRecord) -> None:
+        await asyncio.sleep(0)
+        if (record.partition, record.offset) == (0, 2) and self.failures:
+            self.failures -= 1
+            raise Exception("Database is unavailable")
+        self.processed[record.partition].append(record.offset)
+
+    async def flush(self) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def retry_delay(monkeypatch):
+    monkeypatch.setattr(partitions, "RETRY_DELAY", 0.01)
+
+
+async def run(service: Service, until, timeout: float = 2) -> Consumer:
+    consumer = Consumer()
+    runner = PartitionRunner(
+        consumer=consumer,  # type: ignore[arg-type]
+        message_service=service,
+        queue_size=100,
+        commit_interval_ms=10,
+        max_records=2,
+    )
+    task = asyncio.create_task(runner.run())
+    try:
+        async with asyncio.timeout(timeout):
+            while not until(service):
+                await asyncio.sleep(0.005)
+        # a few more commit intervals
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return consumer
+
+
+async def test_failed_record_is_retried_in_order():
+    service = Service(failures=2)
+    consumer = await run(service, lambda s: len(s.processed[0]) == RECORDS)
+
+    assert service.processed == {0: [0, 1, 2, 3, 4], 1: [0, 1, 2, 3, 4]}
+    assert consumer.seeks == [(TP0, 2), (TP0, 2)]
+    assert consumer.committed == {TP0: RECORDS, TP1: RECORDS}
+    assert consumer.paused() == set()
+
+
+async def test_offset_stays_before_a_failing_record():
+    service = Service(failures=1000)
+    consumer = await run(
+        service, lambda s: len(s.processed[1]) == RECORDS and s.failures < 995
+    )
+
+    # the records behind the failing one are not processed, nor committed
+    assert service.processed == {0: [0, 1], 1: [0, 1, 2, 3, 4]}
+    assert consumer.committed == {TP0: 2, TP1: RECORDS}
+    assert set(consumer.seeks) == {(TP0, 2)}
@@ -0,0 +1,105 @@
+"""
+Rows/sec and peak RSS of reading a campaign CSV from local storage.
+
+"block" parses with read_csv_batches (C csv module in a worker thread,
+one thread hop per batch), "aiocsv" with read_csv_file, one dict per row.
+Every mode runs in its own process so the peak RSS of one does not hide
+the other's.
+
+Run from kfk_mail_service with the service environment configured:
+
+    uv run python -m benchmarks.csv_reader --rows 1000000
+"""
+
+import argparse
+import asyncio
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.storage.storage import LocalStorageService, read_csv_batches, read_csv_file
+
+FILE_NAME = "campaign.csv"
+
+
+def write_csv(path: Path, rows: int) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("subject,from_email,to_email,message_body\r\n")
+        for i in range(rows):
+            f.write(
+                f'Benchmark {i},sender@example.com,user{i}@example.com,"Hello, row {i}"\r\n'
+            )
+
+
+async def read(mode: str, base_path: str, batch_size: int) -> int:
+    storage = LocalStorageService(filetype="csv", base_path=base_path)
+    count = 0
+    if mode == "block":
+        async for batch in read_csv_batches(storage, FILE_NAME, batch_size=batch_size):
+            count += len(batch.rows)
+    else:
+        async for _ in read_csv_file(storage, FILE_NAME):
+            count += 1
+    return count
+
+
+def run_child(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    count = asyncio.run(read(args.mode, args.base_path, args.batch_size))
+    print(count, time.perf_counter() - started)
+
+
+def run_mode(mode: str, base_path: str, batch_size: int) -> tuple[float, float]:
+    """Rows/sec and peak RSS in MiB of one mode in a child process."""
+    child = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.csv_reader",
+            "--mode",
+            mode,
+            "--base-path",
+            base_path,
+            "--batch-size",
+            str(batch_size),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    output = child.stdout.read()  # type: ignore[union-attr]
+    # wait4 reports the child's own rusage, RUSAGE_CHILDREN would keep the
+    # largest peak of all children run so far
+    _, status, usage = os.wait4(child.pid, 0)
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode:
+        raise SystemExit(f"{mode} run failed with exit code {child.returncode}")
+    count, elapsed = output.split()
+    # ru_maxrss is in KiB on Linux
+    return int(count) / float(elapsed), usage.ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--modes", nargs="+", default=["block", "aiocsv"])
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--base-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as base_path:
+        write_csv(Path(base_path) / FILE_NAME, args.rows)
+        for mode in args.modes:
+            rate, peak_rss = run_mode(mode, base_path, args.batch_size)
+            print(f"{mode:>6}: {rate:10.0f} rows/sec, peak RSS {peak_rss:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
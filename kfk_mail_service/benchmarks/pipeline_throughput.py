@@ -0,0 +1,79 @@
+"""
+Emails/sec of the CSV dispatch pipeline as the number of SMTP sender
+workers grows, against the stand-in SMTP server.
+
+Run from kfk_mail_service with the service environment configured:
+
+    uv run python -m benchmarks.pipeline_throughput --rows 2000 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.smtp_standin import StandInSMTPServer
+from src.broker.pipeline import CsvDispatchPipeline
+from src.smtp.service import SMTPServiceMailDev
+from src.smtp.templates import start_template_registry, stop_template_registry
+
+
+class NullProducer:
+    """Replies are not part of the measurement."""
+
+    async def send_message(self, value) -> None:
+        pass
+
+    async def flush(self) -> None:
+        pass
+
+
+async def rows(count: int):
+    for i in range(count):
+        yield {
+            "subject": f"Benchmark {i}",
+            "from_email": "sender@example.com",
+            "to_email": f"user{i}@example.com",
+            "message_body": "Hello from the benchmark",
+        }
+
+
+async def run(server: StandInSMTPServer, count: int, send_workers: int) -> float:
+    service = SMTPServiceMailDev(
+        host=server.host,
+        port=server.port,
+        pool_max_size=send_workers,
+    )
+    pipeline = CsvDispatchPipeline(
+        mail_service=service,
+        producer=NullProducer(),  # type: ignore[arg-type]
+        render_workers=4,
+        send_workers=send_workers,
+        queue_size=100,
+    )
+    started = time.perf_counter()
+    try:
+        await pipeline.run(rows(count))
+    finally:
+        await service.close()
+    return count / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    await start_template_registry()
+    try:
+        async with StandInSMTPServer(latency=args.latency_ms / 1000) as server:
+            for workers in args.workers:
+                rate = await run(server, args.rows, workers)
+                print(f"send_workers={workers:>3}: {rate:8.1f} emails/sec")
+    finally:
+        await stop_template_registry()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Minimal SMTP stand-in server for benchmarks.
+
+Accepts every message and answers each DATA after `latency` seconds,
+which stands for the round trip to a real relay.
+"""
+
+import asyncio
+
+
+class StandInSMTPServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.messages = 0
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> "StandInSMTPServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        async def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 stand-in ESMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    await reply("250-stand-in")
+                    await reply("250 8BITMIME")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.messages += 1
+                    await reply("250 OK queued")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    # MAIL, RCPT, RSET, NOOP
+                    await reply("250 OK")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
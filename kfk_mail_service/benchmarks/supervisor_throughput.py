@@ -0,0 +1,114 @@
+"""
+Emails/sec of the send_mail consumers run by the supervisor with 1, 2, 4
+... worker processes, against the stand-in SMTP server.
+
+Every run uses a fresh topic with one partition per worker of the largest
+run, so partitions are spread over all the children. Needs the broker
+from docker-compose (or any local Kafka); run from kfk_mail_service with
+the service environment configured:
+
+    uv run python -m benchmarks.supervisor_throughput --messages 5000 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from aiokafka import AIOKafkaProducer
+from aiokafka.admin import AIOKafkaAdminClient, NewTopic
+
+from benchmarks.smtp_standin import StandInSMTPServer
+from src.config import settings
+from src.supervisor import Supervisor
+
+
+def payload(i: int) -> bytes:
+    return json.dumps(
+        {
+            "id": i,
+            "status": "pending",
+            "subject": f"Benchmark {i}",
+            "from_email": "sender@example.com",
+            "to_email": f"user{i}@example.com",
+            "message_body": "Hello from the benchmark",
+        }
+    ).encode()
+
+
+async def create_topic(bootstrap: str, partitions: int) -> str:
+    topic = f"bench-send-mail-{uuid.uuid4().hex[:8]}"
+    admin = AIOKafkaAdminClient(bootstrap_servers=bootstrap)
+    await admin.start()
+    try:
+        await admin.create_topics(
+            [NewTopic(topic, num_partitions=partitions, replication_factor=1)]
+        )
+    finally:
+        await admin.close()
+    return topic
+
+
+async def run(
+    server: StandInSMTPServer,
+    workers: int,
+    partitions: int,
+    count: int,
+    settle: float,
+) -> float:
+    bootstrap = settings.broker.kafka_bootstrap_servers
+    topic = await create_topic(bootstrap, partitions)
+    # the children are spawned, they read their settings from the environment
+    os.environ["APP_CONFIG__BROKER__SEND_TOPIC"] = topic
+
+    supervisor = Supervisor(
+        workers=workers,
+        heartbeat_timeout=settings.supervisor.heartbeat_timeout,
+        restart_delay=settings.supervisor.restart_delay,
+        shutdown_timeout=settings.supervisor.shutdown_timeout,
+    )
+    await supervisor.start()
+    producer = AIOKafkaProducer(bootstrap_servers=bootstrap, linger_ms=5)
+    await producer.start()
+    try:
+        # consumers start at the latest offset, wait for the group to settle
+        while supervisor.health()["status"] != "OK":
+            await asyncio.sleep(0.5)
+        await asyncio.sleep(settle)
+
+        received = server.messages
+        started = time.perf_counter()
+        for i in range(count):
+            await producer.send(topic, payload(i), partition=i % partitions)
+        await producer.flush()
+        while server.messages - received < count:
+            await asyncio.sleep(0.05)
+        return count / (time.perf_counter() - started)
+    finally:
+        await producer.stop()
+        await supervisor.stop()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--settle", type=float, default=10.0)
+    args = parser.parse_args()
+
+    async with StandInSMTPServer(latency=args.latency_ms / 1000) as server:
+        os.environ["APP_CONFIG__SMTP__SMTP_TYPE"] = "maildev"
+        os.environ["APP_CONFIG__SMTP__MAILDEV_HOST"] = server.host
+        os.environ["APP_CONFIG__SMTP__MAILDEV_PORT"] = str(server.port)
+        for workers in args.workers:
+            rate = await run(
+                server, workers, max(args.workers), args.messages, args.settle
+            )
+            print(f"workers={workers:>3}: {rate:8.1f} emails/sec")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Email render throughput with the compiled template registry, and the
+number of filesystem calls made while rendering after warm-up.
+
+"registry" renders through get_prepared_email_template, "per-render"
+loads the template from disk for every email as the service did before
+the registry existed.
+
+Run from kfk_mail_service with the service environment configured:
+
+    uv run python -m benchmarks.template_render --renders 10000
+"""
+
+import argparse
+import asyncio
+import builtins
+from contextlib import contextmanager
+import os
+import time
+
+from jinja2 import Environment, FileSystemLoader
+
+from src.config import settings
+from src.schemas import EmailBaseModel
+from src.smtp.message import (
+    _build_email,
+    get_prepared_email_template,
+    start_render_executor,
+    stop_render_executor,
+)
+from src.smtp.templates import start_template_registry, stop_template_registry
+
+MESSAGE = EmailBaseModel(
+    subject="Benchmark",
+    from_email="sender@example.com",
+    to_email="user@example.com",
+    message_body="Hello from the benchmark",
+)
+
+
+@contextmanager
+def count_fs_calls():
+    """Counts open() and os.stat() calls from any thread."""
+    calls = {"open": 0, "stat": 0}
+    real_open, real_stat = builtins.open, os.stat
+
+    def counting_open(*args, **kwargs):
+        calls["open"] += 1
+        return real_open(*args, **kwargs)
+
+    def counting_stat(*args, **kwargs):
+        calls["stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    builtins.open, os.stat = counting_open, counting_stat
+    try:
+        yield calls
+    finally:
+        builtins.open, os.stat = real_open, real_stat
+
+
+async def registry(renders: int) -> float:
+    started = time.perf_counter()
+    for _ in range(renders):
+        await get_prepared_email_template(MESSAGE)
+    return renders / (time.perf_counter() - started)
+
+
+def per_render(renders: int) -> float:
+    started = time.perf_counter()
+    for _ in range(renders):
+        env = Environment(loader=FileSystemLoader(settings.storage.template_dir))
+        _build_email(env.get_template(settings.storage.default_template), MESSAGE)
+    return renders / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--renders", type=int, default=10_000)
+    args = parser.parse_args()
+
+    await start_template_registry()
+    await start_render_executor()
+    try:
+        await registry(100)  # warm-up
+        with count_fs_calls() as calls:
+            rate = await registry(args.renders)
+        print(
+            f"registry:   {rate:8.1f} renders/sec, "
+            f"{calls['open']} open() and {calls['stat']} stat() calls"
+        )
+        with count_fs_calls() as calls:
+            rate = per_render(args.renders)
+        print(
+            f"per-render: {rate:8.1f} renders/sec, "
+            f"{calls['open']} open() and {calls['stat']} stat() calls"
+        )
+    finally:
+        await stop_render_executor()
+        await stop_template_registry()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
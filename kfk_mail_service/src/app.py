@@ -1,11 +1,14 @@
 from functools import partial
 import logging
 
-from litestar import Litestar, get
+from litestar import Litestar, Response, get
 
-from src.broker.utils import start_consumers, stop_consumers
+from src.broker.utils import get_consumers_lag
 from src.config import settings
 from src.logging_conf import configure_logging
+from src.metrics import get_metrics, start_loop_monitor, stop_loop_monitor
+from src.supervisor import get_supervisor, start_supervisor, stop_supervisor
+from src.worker import start_worker, stop_worker
 
 configure_logging(level=settings.logging.log_level)
 
@@ -13,12 +16,53 @@ logger = logging.getLogger(__name__)
 
 
 @get("/")
-async def healthcheck() -> str:
-    return "OK"
+async def healthcheck() -> Response[dict]:
+    supervisor = get_supervisor()
+    if supervisor is None:
+        return Response({"status": "OK"})
+    health = supervisor.health()
+    return Response(health, status_code=200 if health["status"] == "OK" else 503)
+
+
+@get("/metrics")
+async def metrics() -> dict:
+    # the consumers run in the children in supervisor mode
+    supervisor = get_supervisor()
+    if supervisor is not None:
+        return supervisor.metrics()
+    return get_metrics()
+
+
+@get("/consumers")
+async def consumers_lag() -> dict:
+    supervisor = get_supervisor()
+    if supervisor is not None:
+        return supervisor.consumers_lag()
+    return get_consumers_lag()
+
+
+async def start_services() -> None:
+    if settings.supervisor.workers > 1:
+        await start_supervisor()
+    else:
+        await start_worker()
+
+
+async def stop_services() -> None:
+    if get_supervisor() is not None:
+        await stop_supervisor()
+    else:
+        await stop_worker()
 
 
 app = Litestar(
-    on_startup=[partial(start_consumers)],
-    on_shutdown=[partial(stop_consumers)],
-    route_handlers=[healthcheck],
+    on_startup=[
+        partial(start_loop_monitor),
+        partial(start_services),
+    ],
+    on_shutdown=[
+        partial(stop_services),
+        partial(stop_loop_monitor),
+    ],
+    route_handlers=[healthcheck, metrics, consumers_lag],
 )
@@ -4,25 +4,39 @@ import logging
 from typing import Self
 
 from aiokafka import AIOKafkaConsumer
+from kfk_common.partitions import PartitionRunner
 
 from src.broker.consumers import ConsumeBase
 
 logger = logging.getLogger(__name__)
 
+# Pause before a failed batch is redelivered
+BATCH_RETRY_DELAY = 1
+
 
 class MessageConsumer:
     def __init__(
-        self, topic: str, group_id: str, bootstrap_servers: str, loop: AbstractEventLoop
+        self,
+        topic: str,
+        group_id: str,
+        bootstrap_servers: str,
+        loop: AbstractEventLoop,
+        enable_auto_commit: bool = True,
+        max_poll_records: int | None = None,
+        max_poll_interval_ms: int = 300_000,
     ):
         self.consumer = AIOKafkaConsumer(
             topic,
             group_id=group_id,
             bootstrap_servers=bootstrap_servers,
-            # loop=loop,
-            max_poll_records=10,  # Ограничить количество сообщений за опрос
-            max_poll_interval_ms=5000,  # Увеличить интервал опроса
+            enable_auto_commit=enable_auto_commit,
+            max_poll_records=max_poll_records,
+            # the records of one poll must be processed within this interval,
+            # otherwise the consumer leaves the group and its partitions move
+            max_poll_interval_ms=max_poll_interval_ms,
         )
         self.topic: str = topic
+        self.runner: PartitionRunner | None = None
 
     async def consume_message(
         self: Self,
@@ -33,22 +47,75 @@ class MessageConsumer:
         try:
             async for message in self.consumer:
                 if message.value is not None:
-                    decoded_message = message.value.decode("utf-8")
-                await message_service.process_message(decoded_message)
-                await asyncio.sleep(0) #
-
-        except KeyboardInterrupt:
-            logger.warning("KeyboardInterrupt. Buy!")
+                    await message_service.process_message(message.value.decode("utf-8"))
+                await asyncio.sleep(0)
+        finally:
             await self.consumer.stop()
+            logger.info("Consumer stopped, topic: %s", self.topic)
+
+    async def consume_batches(
+        self: Self,
+        message_service: ConsumeBase,
+        max_records: int,
+        timeout_ms: int,
+    ):
+        """
+        At-least-once batch consumption, requires `enable_auto_commit=False`.
+        Offsets are committed only after `process_batch` succeeds, a failed
+        batch is fetched again from its first offset.
+        """
+        await self.consumer.start()
+        logger.info("Consumer started in batch mode, topic: %s", self.topic)
+        try:
+            while True:
+                batches = await self.consumer.getmany(
+                    timeout_ms=timeout_ms,
+                    max_records=max_records,
+                )
+                if not batches:
+                    continue
+                records = [record for part in batches.values() for record in part]
+                try:
+                    await message_service.process_batch(records)
+                except Exception as e:
+                    logger.error("Error while processing batch: %s", e)
+                    for tp, part in batches.items():
+                        self.consumer.seek(tp, part[0].offset)
+                    await asyncio.sleep(BATCH_RETRY_DELAY)
+                    continue
+                try:
+                    await self.consumer.commit(
+                        {tp: part[-1].offset + 1 for tp, part in batches.items()}
+                    )
+                except Exception as e:
+                    logger.error("Failed to commit batch offsets: %s", e)
         finally:
             await self.consumer.stop()
             logger.info("Consumer stopped, topic: %s", self.topic)
 
-    #
-    # async with self.consumer as consumer:
-    #     logger.info("Consumer started")
-    #     async for message in consumer:
-    #         if message.value is not None:
-    #             decoded_message = message.value.decode("utf-8")
-    #             await message_service.process_message(decoded_message)
-    #     logger.info("Consumer stopped")
+    async def consume_partitions(
+        self: Self,
+        message_service: ConsumeBase,
+        queue_size: int,
+        commit_interval_ms: int,
+        max_records: int,
+    ):
+        """
+        Process partitions concurrently, keeping order inside each partition.
+        Requires `enable_auto_commit=False`.
+        """
+        self.runner = PartitionRunner(
+            consumer=self.consumer,
+            message_service=message_service,
+            queue_size=queue_size,
+            commit_interval_ms=commit_interval_ms,
+            max_records=max_records,
+        )
+        self.consumer.subscribe([self.topic], listener=self.runner)
+        await self.consumer.start()
+        logger.info("Consumer started in partitioned mode, topic: %s", self.topic)
+        try:
+            await self.runner.run()
+        finally:
+            await self.consumer.stop()
+            logger.info("Consumer stopped, topic: %s", self.topic)
@@ -0,0 +1,290 @@
+"""
+Durable progress of CSV campaigns
+
+A campaign (one shard message, "<file id>:<shard>") keeps a checkpoint
+with the number of rows done and the byte offset right after the last of
+them, so a redelivered message resumes from there instead of row 0.
+Every sent row also leaves an idempotency key (campaign, row index),
+written as soon as the row is sent, which suppresses a second send of
+rows that completed after the last checkpoint was written.
+
+The checkpoint only moves once the replies of the rows it covers are
+published, it is written every `interval_rows` rows.
+
+The store is a local SQLite database, accessed from a single thread: it
+is shared by the worker processes of one host only. A shard redelivered
+to another host (several mail service hosts on shared S3 storage)
+starts again from its first row.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import json
+import logging
+import sqlite3
+import time
+from typing import Awaitable, Callable
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    campaign TEXT PRIMARY KEY,
+    row_offset INTEGER NOT NULL,
+    byte_offset INTEGER NOT NULL,
+    fieldnames TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sent_rows (
+    campaign TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (campaign, row_index)
+);
+"""
+
+
+class CheckpointStore:
+    def __init__(self, path: str):
+        self.path = path
+        # sqlite connections are not shared between threads, one thread owns it
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoints")
+        self._connection: sqlite3.Connection | None = None
+
+    async def start(self) -> None:
+        await self._run(self._connect)
+        removed = await self.prune(settings.checkpoint.retention_days * 86400)
+        logger.info("Checkpoint store %s opened, %s old campaigns pruned", self.path, removed)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    async def open(
+        self, campaign: str, byte_offset: int, fieldnames: list[str] | None
+    ) -> "CampaignCheckpoint":
+        """Checkpoint of the campaign, a fresh one starting at `byte_offset` if none."""
+        row = await self._run(
+            self._fetch_one,
+            "SELECT row_offset, byte_offset, fieldnames, done FROM checkpoints "
+            "WHERE campaign = ?",
+            (campaign,),
+        )
+        checkpoint = CampaignCheckpoint(
+            store=self,
+            campaign=campaign,
+            row_offset=0,
+            byte_offset=byte_offset,
+            fieldnames=fieldnames,
+        )
+        if row is not None:
+            checkpoint.row_offset, checkpoint.byte_offset = row[0], row[1]
+            checkpoint.fieldnames = json.loads(row[2]) if row[2] else fieldnames
+            checkpoint.done = bool(row[3])
+        # rows sent after the last checkpoint write, loaded once per campaign
+        checkpoint.sent = set(
+            await self._run(
+                self._fetch_column,
+                "SELECT row_index FROM sent_rows WHERE campaign = ? AND row_index >= ?",
+                (campaign, checkpoint.row_offset),
+            )
+        )
+        checkpoint._watermark = checkpoint._saved_at = checkpoint.row_offset
+        return checkpoint
+
+    async def mark_sent(self, campaign: str, row_index: int) -> None:
+        """Write the idempotency key of a sent row."""
+        await self._run(self._mark_sent, campaign, row_index)
+
+    async def save(
+        self, campaign: str, progress: tuple[int, int, list[str] | None, bool]
+    ) -> None:
+        """Write the (row_offset, byte_offset, fieldnames, done) of the campaign."""
+        await self._run(self._save, campaign, progress)
+
+    async def prune(self, older_than: float) -> int:
+        """Forget finished campaigns that were last touched `older_than` seconds ago."""
+        return await self._run(self._prune, time.time() - older_than)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _connect(self) -> None:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives a process crash, only an OS crash may lose the tail
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        self._connection = connection
+
+    def _mark_sent(self, campaign: str, row_index: int) -> None:
+        assert self._connection is not None
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO sent_rows (campaign, row_index, sent_at) "
+                "VALUES (?, ?, ?)",
+                (campaign, row_index, time.time()),
+            )
+
+    def _save(
+        self, campaign: str, progress: tuple[int, int, list[str] | None, bool]
+    ) -> None:
+        assert self._connection is not None
+        row_offset, byte_offset, fieldnames, done = progress
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO checkpoints "
+                "(campaign, row_offset, byte_offset, fieldnames, done, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (campaign) DO UPDATE SET row_offset = excluded.row_offset, "
+                "byte_offset = excluded.byte_offset, fieldnames = excluded.fieldnames, "
+                "done = excluded.done, updated_at = excluded.updated_at",
+                (
+                    campaign,
+                    row_offset,
+                    byte_offset,
+                    json.dumps(fieldnames) if fieldnames else None,
+                    int(done),
+                    time.time(),
+                ),
+            )
+
+    def _fetch_one(self, query: str, params: tuple) -> tuple | None:
+        assert self._connection is not None
+        return self._connection.execute(query, params).fetchone()
+
+    def _fetch_column(self, query: str, params: tuple) -> list:
+        assert self._connection is not None
+        return [row[0] for row in self._connection.execute(query, params)]
+
+    def _prune(self, before: float) -> int:
+        assert self._connection is not None
+        with self._connection:
+            campaigns = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT campaign FROM checkpoints WHERE done = 1 AND updated_at < ?",
+                    (before,),
+                )
+            ]
+            self._connection.executemany(
+                "DELETE FROM sent_rows WHERE campaign = ?", [(c,) for c in campaigns]
+            )
+            self._connection.executemany(
+                "DELETE FROM checkpoints WHERE campaign = ?", [(c,) for c in campaigns]
+            )
+        return len(campaigns)
+
+
+@dataclass
+class CampaignCheckpoint:
+    """
+    Progress of one campaign while it is dispatched.
+
+    Rows finish out of order (several send workers), the checkpoint only
+    moves over the contiguous prefix of finished rows. Row indexes count
+    from the first row of the campaign. A row is finished once its reply
+    is handed to the reply publisher, `save` flushes the publisher before
+    the checkpoint is written.
+    """
+
+    store: CheckpointStore
+    campaign: str
+    row_offset: int
+    byte_offset: int
+    fieldnames: list[str] | None = None
+    done: bool = False
+    sent: set[int] = field(default_factory=set)
+    # row index -> byte offset after the row, for finished rows past the watermark
+    _finished: dict[int, int] = field(default_factory=dict)
+    _watermark: int = 0
+    _saved_at: int = 0
+    # error of a failed flush: some replies are lost, the checkpoint must not
+    # move past them
+    _replies_lost: Exception | None = None
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def is_sent(self, index: int) -> bool:
+        return index in self.sent
+
+    async def mark_sent(self, index: int) -> None:
+        """Write the idempotency key of a row right after it is sent."""
+        self.sent.add(index)
+        # shielded: a cancelled worker must not drop the key of a sent row
+        await asyncio.shield(self.store.mark_sent(self.campaign, index))
+
+    def row_done(self, index: int, end_offset: int) -> bool:
+        """Record a finished row, True when a save is due."""
+        self._finished[index] = end_offset
+        while self._watermark in self._finished:
+            self.byte_offset = self._finished.pop(self._watermark)
+            self._watermark += 1
+        self.row_offset = self._watermark
+        return self.due()
+
+    def due(self) -> bool:
+        return self.row_offset - self._saved_at >= settings.checkpoint.interval_rows
+
+    async def finish(self, flush: Callable[[], Awaitable[None]]) -> None:
+        self.done = True
+        await self.save(flush)
+
+    async def save(
+        self, flush: Callable[[], Awaitable[None]], force: bool = True
+    ) -> None:
+        """
+        Write the progress once `flush` has published every reply handed
+        over so far. If the flush fails nothing is written: the rows stay
+        behind the checkpoint and are replied to again when the campaign is
+        redelivered. Without `force` nothing is written unless a save is
+        still due.
+        """
+        async with self._lock:
+            if not force and not self.due():
+                return
+            progress = (self.row_offset, self.byte_offset, self.fieldnames, self.done)
+            if self._replies_lost is not None:
+                raise RuntimeError(
+                    f"Replies of campaign {self.campaign} were lost: {self._replies_lost}"
+                )
+            try:
+                await flush()
+            except Exception as e:
+                self._replies_lost = e
+                raise
+            await asyncio.shield(self.store.save(self.campaign, progress))
+            self._saved_at = progress[0]
+
+
+#######################
+### Shared Store    ###
+#######################
+
+_store: CheckpointStore | None = None
+
+
+async def start_checkpoint_store() -> None:
+    global _store
+    if _store is None:
+        store = CheckpointStore(settings.checkpoint.path)
+        await store.start()
+        _store = store
+
+
+async def stop_checkpoint_store() -> None:
+    global _store
+    if _store is not None:
+        await _store.stop()
+        _store = None
+
+
+def get_checkpoint_store() -> CheckpointStore | None:
+    return _store
@@ -2,14 +2,14 @@ from abc import ABC, abstractmethod
 import asyncio
 from email.message import EmailMessage
 import logging
-from typing import AsyncGenerator
 import typing
 
-from pydantic import ValidationError
+from aiokafka import ConsumerRecord
 
+from src.broker.checkpoints import CampaignCheckpoint, get_checkpoint_store
+from src.broker.pipeline import CsvDispatchPipeline
 from src.broker.producer import get_send_csv_producer, get_send_mail_producer
 from src.schemas import (
-    EmailBaseModel,
     EmailRecieve,
     EmailReturnFromCsv,
     EmailSendBack,
@@ -19,7 +19,8 @@ from src.smtp.dependencies import get_smtp_service
 from src.smtp.message import get_prepared_email_template
 from src.smtp.service import SMTPService
 from src.config import settings
-from src.storage.storage import read_csv_file
+from src.storage.dependencies import get_storage_service
+from src.storage.storage import read_csv_batches, read_csv_file
 
 if typing.TYPE_CHECKING:
     from src.broker.producer import BrokerProducer
@@ -32,13 +33,37 @@ class ConsumeBase(ABC):
     async def process_message(self, msg: str):
         pass
 
+    async def process_record(self, record: ConsumerRecord) -> None:
+        if record.value is not None:
+            await self.process_message(record.value.decode("utf-8"))
+
+    async def process_batch(self, records: list[ConsumerRecord]) -> None:
+        """
+        Process a whole getmany() batch. Offsets are committed once this
+        returns, so replies are flushed before returning.
+        """
+        for record in records:
+            await self.process_record(record)
+        await self.flush()
+
+    async def flush(self) -> None:
+        pass
+
 
 class ConsumeEmail(ConsumeBase):
     def __init__(self):
         self.mail_service: SMTPService = get_smtp_service()
+        self._replies: BrokerProducer | None = None
+
+    async def replies(self) -> "BrokerProducer":
+        """The reply scope of this consumer, flush() reports only its replies."""
+        producer = await get_send_mail_producer()
+        if self._replies is None:
+            self._replies = producer.scope()
+        return self._replies
 
     async def process_message(self, msg: str):
-        producer: BrokerProducer = await get_send_mail_producer()
+        producer = await self.replies()
 
         try:
             message: EmailRecieve = EmailRecieve.model_validate_json(msg)
@@ -63,62 +88,139 @@ class ConsumeEmail(ConsumeBase):
             email_processed.status = "success"
             await producer.send_message(value=email_processed)
             logger.warning("Message processed: %s", message)
-        finally:
-            del producer
         await asyncio.sleep(0)
 
+    async def process_batch(self, records: list[ConsumerRecord]) -> None:
+        # Emails of one batch are independent, send them concurrently
+        semaphore = asyncio.Semaphore(settings.smtp.send_workers)
+
+        async def process(msg: str) -> None:
+            async with semaphore:
+                try:
+                    await self.process_message(msg)
+                except Exception as e:
+                    logger.error("Error while processing message: %s", e)
+
+        await asyncio.gather(
+            *(
+                process(record.value.decode("utf-8"))
+                for record in records
+                if record.value is not None
+            )
+        )
+        await self.flush()
+
+    async def flush(self) -> None:
+        await (await self.replies()).flush()
+
 
 class ConsumeCSV(ConsumeBase):
     def __init__(self):
         self.mail_service: SMTPService = get_smtp_service()
+        self._replies: BrokerProducer | None = None
+
+    async def replies(self) -> "BrokerProducer":
+        """The reply scope of this consumer, flush() reports only its replies."""
+        producer = await get_send_csv_producer()
+        if self._replies is None:
+            self._replies = producer.scope()
+        return self._replies
 
     async def process_message(self, msg: str):
-        producer: BrokerProducer = await get_send_csv_producer()
+        # the pipeline's checkpoints wait for the replies of this shard only
+        producer = (await self.replies()).scope()
+        message: UploadedFileRead | None = None
         try:
-            message: UploadedFileRead = UploadedFileRead.model_validate_json(msg)
-            csv_path: str = f"{settings.storage.global_path}/{message.file_path}"
-            csv_generator = read_csv_file(csv_path)
-            await self._iterate_csv(csv_generator, self.mail_service, producer)
+            message = UploadedFileRead.model_validate_json(msg)
+            logger.info(
+                "Processing file %s shard %s/%s",
+                message.id,
+                message.shard,
+                message.shard_count,
+            )
+            await self._iterate_csv(self.mail_service, producer, message)
 
         except FileNotFoundError as e:
-            logger.warning("CSV file not found: %s", message.file_path)
-            await _csv_broken_msg_processor(e, producer)
+            logger.warning("CSV file not found: %s", e)
+            await _csv_broken_msg_processor(e, producer, message)
 
         except Exception as e:
             logger.error("Error reading CSV: %s", e)
-            await _csv_broken_msg_processor(e, producer)
+            await _csv_broken_msg_processor(e, producer, message)
 
-        finally:
-            del producer
+    async def flush(self) -> None:
+        await (await self.replies()).flush()
 
     async def _iterate_csv(
         self,
-        csv_generator: AsyncGenerator[dict, None],
         mail_service: SMTPService,
         producer: "BrokerProducer",
+        message: UploadedFileRead,
     ):
-        async for row in csv_generator:
-            try:
-                mail_message = EmailBaseModel(**row)
-                prepared_email = await get_prepared_email_template(mail_message)
-                await mail_service.send_email(prepared_email)
-            except ValidationError as e:
-                logger.error('ValidationError: "%s"', e)
-                await _csv_broken_msg_processor(e, producer)
-            except Exception as e:
-                logger.error('Exception: "%s"', e)
-                await _csv_broken_msg_processor(e, producer)
-            else:
-                email_processed = EmailReturnFromCsv(**row)
-                email_processed.status = "success"
-                await producer.send_message(value=email_processed)
-                logger.warning("Message processed: %s", email_processed)
+        pipeline = CsvDispatchPipeline(
+            mail_service=mail_service,
+            producer=producer,
+            file_id=message.id,
+            shard=message.shard,
+            render_workers=settings.smtp.render_workers,
+            send_workers=settings.smtp.send_workers,
+            queue_size=settings.smtp.pipeline_queue_size,
+        )
+        storage = get_storage_service(filetype="csv")
+        if settings.storage.csv_reader == "block":
+            start, fieldnames = message.byte_start, message.fieldnames
+            checkpoint = await _open_checkpoint(message)
+            if checkpoint is not None:
+                if checkpoint.done:
+                    logger.info("Campaign %s already dispatched", checkpoint.campaign)
+                    return
+                if checkpoint.row_offset:
+                    logger.info(
+                        "Resuming campaign %s from row %s",
+                        checkpoint.campaign,
+                        checkpoint.row_offset,
+                    )
+                start, fieldnames = checkpoint.byte_offset, checkpoint.fieldnames
+                pipeline.checkpoint = checkpoint
+            await pipeline.run_batches(
+                read_csv_batches(
+                    storage,
+                    message.file_path,
+                    start=start,
+                    end=message.byte_end,
+                    fieldnames=fieldnames,
+                )
+            )
+            return
+        await pipeline.run(
+            read_csv_file(
+                storage,
+                message.file_path,
+                start=message.byte_start,
+                end=message.byte_end,
+                fieldnames=message.fieldnames,
+            )
+        )
+
+
+async def _open_checkpoint(message: UploadedFileRead) -> CampaignCheckpoint | None:
+    store = get_checkpoint_store()
+    if store is None:
+        return None
+    return await store.open(
+        f"{message.id}:{message.shard or 0}", message.byte_start, message.fieldnames
+    )
 
 
 async def _csv_broken_msg_processor(
-    exception: Exception, producer: "BrokerProducer"
+    exception: Exception,
+    producer: "BrokerProducer",
+    message: UploadedFileRead | None = None,
 ) -> None:
     broken_message = EmailReturnFromCsv(
         status_message=str(exception),
+        file_id=message.id if message else None,
+        shard=message.shard if message else None,
+        shard_failed=message is not None,
     )
     await producer.send_message(value=broken_message)
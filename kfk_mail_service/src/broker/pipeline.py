@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import typing
+from email.message import EmailMessage
+from typing import AsyncIterator, Awaitable, Callable
+
+from pydantic import ValidationError
+
+from src.schemas import EmailBaseModel, EmailReturnFromCsv
+from src.smtp.message import get_prepared_email_template
+from src.smtp.service import SMTPService
+from src.storage.storage import CsvBatch
+
+if typing.TYPE_CHECKING:
+    from src.broker.checkpoints import CampaignCheckpoint
+    from src.broker.producer import BrokerProducer
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel, tells a worker that its upstream stage is done
+_STOP = None
+
+# a row as a dict or as a (header, values) pair from the block reader
+Row = dict[str, str] | tuple[tuple[str, ...], list[str]]
+# (row, index in the shard, byte offset after the row), no offset for aiocsv rows
+Item = tuple[Row, int, int | None]
+# a rendered item, its row is a dict by then
+Rendered = tuple[tuple[dict[str, str], int, int | None], EmailMessage]
+
+
+class CsvDispatchPipeline:
+    """
+    Bounded-concurrency CSV campaign dispatcher.
+
+    reader -> render_queue -> N render workers -> send_queue -> M send workers
+
+    Every row is reported back through `producer`, whether it succeeded or not.
+    With a `checkpoint` the progress of block-read rows is recorded and rows
+    sent by an earlier attempt of the campaign are not sent again, only
+    their reply is.
+    """
+
+    def __init__(
+        self,
+        mail_service: SMTPService,
+        producer: "BrokerProducer",
+        render_workers: int,
+        send_workers: int,
+        queue_size: int,
+        file_id: int | None = None,
+        shard: int | None = None,
+        checkpoint: "CampaignCheckpoint | None" = None,
+    ) -> None:
+        self.mail_service = mail_service
+        self.producer = producer
+        self.render_workers = render_workers
+        self.send_workers = send_workers
+        self.queue_size = queue_size
+        # echoed in every reply so the client can track the shard progress
+        self.file_id = file_id
+        self.shard = shard
+        self.checkpoint = checkpoint
+
+    async def run(self, rows: AsyncIterator[dict[str, str]]) -> None:
+        async def feed(render_queue: asyncio.Queue) -> None:
+            index = 0
+            async for row in rows:
+                await render_queue.put((row, index, None))
+                index += 1
+
+        await self._run(feed)
+
+    async def run_batches(self, batches: AsyncIterator[CsvBatch]) -> None:
+        """Rows stay (header, values) pairs until a render worker needs them."""
+
+        checkpoint = self.checkpoint
+
+        async def feed(render_queue: asyncio.Queue) -> None:
+            index = checkpoint.row_offset if checkpoint is not None else 0
+            async for batch in batches:
+                if checkpoint is not None and checkpoint.fieldnames is None:
+                    checkpoint.fieldnames = list(batch.header)
+                for values, end_offset in zip(batch.rows, batch.offsets):
+                    if checkpoint is not None and checkpoint.is_sent(index):
+                        logger.debug("Row %s of %s already sent", index, checkpoint.campaign)
+                        # its reply may not have been published before the redelivery
+                        row = dict(zip(batch.header, values))
+                        await self.producer.send_message(value=self._reply(row, index))
+                        await self._row_done(index, end_offset)
+                    else:
+                        await render_queue.put(
+                            ((batch.header, values), index, end_offset)
+                        )
+                    index += 1
+
+        await self._run(feed)
+
+    async def _run(
+        self, feed: Callable[[asyncio.Queue], Awaitable[None]]
+    ) -> None:
+        render_queue: asyncio.Queue[Item | None] = asyncio.Queue(self.queue_size)
+        send_queue: asyncio.Queue[Rendered | None] = asyncio.Queue(self.queue_size)
+        renderers = [
+            asyncio.create_task(self._render_worker(render_queue, send_queue))
+            for _ in range(self.render_workers)
+        ]
+        senders = [
+            asyncio.create_task(self._send_worker(send_queue))
+            for _ in range(self.send_workers)
+        ]
+
+        async def drain() -> None:
+            await feed(render_queue)
+            for _ in renderers:
+                await render_queue.put(_STOP)
+            await asyncio.gather(*renderers)
+            for _ in senders:
+                await send_queue.put(_STOP)
+
+        feeder = asyncio.create_task(drain())
+        try:
+            # a put() on a full queue would wait forever once the workers are gone
+            await self._watch(feeder, [*renderers, *senders])
+            await asyncio.gather(*senders)
+        except BaseException:
+            for task in (feeder, *renderers, *senders):
+                task.cancel()
+            await asyncio.gather(feeder, *renderers, *senders, return_exceptions=True)
+            if self.checkpoint is not None:
+                try:
+                    await self.checkpoint.save(self.producer.flush)
+                except Exception as e:
+                    logger.error(
+                        "Checkpoint of %s not saved: %s", self.checkpoint.campaign, e
+                    )
+            raise
+        if self.checkpoint is not None:
+            await self.checkpoint.finish(self.producer.flush)
+
+    @staticmethod
+    async def _watch(task: asyncio.Task, workers: list[asyncio.Task]) -> None:
+        """Wait for `task`, raise the error of a worker as soon as one dies."""
+        pending = {task, *workers}
+        while task in pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for finished in done:
+                error = finished.exception()
+                if finished is not task and error is not None:
+                    raise error
+        task.result()
+
+    async def _render_worker(
+        self,
+        render_queue: asyncio.Queue[Item | None],
+        send_queue: asyncio.Queue[Rendered | None],
+    ) -> None:
+        while (item := await render_queue.get()) is not _STOP:
+            assert item is not None
+            data, index, end_offset = item
+            row = data if isinstance(data, dict) else dict(zip(*data))
+            try:
+                mail_message = EmailBaseModel(**row)
+                prepared_email = await get_prepared_email_template(mail_message)
+            except ValidationError as e:
+                logger.error('ValidationError: "%s"', e)
+                await self.report_error(e, index)
+                await self._row_done(index, end_offset)
+            except Exception as e:
+                logger.error('Exception: "%s"', e)
+                await self.report_error(e, index)
+                await self._row_done(index, end_offset)
+            else:
+                await send_queue.put(((row, index, end_offset), prepared_email))
+
+    async def _send_worker(
+        self,
+        send_queue: asyncio.Queue[Rendered | None],
+    ) -> None:
+        while (item := await send_queue.get()) is not _STOP:
+            assert item is not None
+            (row, index, end_offset), prepared_email = item
+            try:
+                await self.mail_service.send_email(prepared_email)
+            except Exception as e:
+                logger.error('Exception: "%s"', e)
+                await self.report_error(e, index)
+                await self._row_done(index, end_offset)
+            else:
+                if self.checkpoint is not None:
+                    await self.checkpoint.mark_sent(index)
+                email_processed = self._reply(row, index)
+                await self.producer.send_message(value=email_processed)
+                logger.warning("Message processed: %s", email_processed)
+                await self._row_done(index, end_offset)
+
+    def _reply(self, row: dict[str, str], index: int) -> EmailReturnFromCsv:
+        """Success reply, built field by field: CSV columns cannot clash with ours."""
+        return EmailReturnFromCsv(
+            subject=row.get("subject"),
+            from_email=row.get("from_email"),
+            to_email=row.get("to_email"),
+            message_body=row.get("message_body"),
+            status="success",
+            file_id=self.file_id,
+            shard=self.shard,
+            row_index=index,
+        )
+
+    async def _row_done(self, index: int, end_offset: int | None) -> None:
+        """Called once the reply of the row is handed to the producer."""
+        # only block-read rows carry the offset a checkpoint resumes from
+        if self.checkpoint is not None and end_offset is not None:
+            if self.checkpoint.row_done(index, end_offset):
+                await self.checkpoint.save(self.producer.flush, force=False)
+
+    async def report_error(self, exception: Exception, index: int) -> None:
+        broken_message = EmailReturnFromCsv(
+            status_message=str(exception),
+            file_id=self.file_id,
+            shard=self.shard,
+            row_index=index,
+        )
+        await self.producer.send_message(value=broken_message)
@@ -1,5 +1,6 @@
-import logging
 import asyncio
+from collections import deque
+import logging
 
 from aiokafka import AIOKafkaProducer
 from pydantic import BaseModel
@@ -20,33 +21,272 @@ class BrokerProducer:
         self.producer = producer
         self.topic = topic
 
-    async def open_connection(self) -> None:
-        await self.producer.start()
-
-    async def close_connection(self) -> None:
-        if self.producer is not None:
-            await self.producer.stop()
-
     # Send message and confirm
     async def send_message(self, value: BaseModel) -> None:
-        logger.info("Starting producer")
-        if not self.producer._closed:
-            await self.close_connection()
-        await self.open_connection()
         encoded_value = value.model_dump_json().encode()
         try:
             await self.producer.send_and_wait(topic=self.topic, value=encoded_value)
         except Exception as e:
             logger.error("Failed, error: %s", (str(e)))
             raise Exception(f"Failed to send message: {str(e)}")
+
+    async def flush(self) -> None:
+        """Every message is already confirmed by send_and_wait."""
+        pass
+
+    def scope(self) -> "BrokerProducer":
+        """Every message is confirmed on its own, a scope is the producer itself."""
+        return self
+
+
+##########################
+### Buffered Producer  ###
+##########################
+
+STOPPED = Exception("Reply publisher stopped")
+
+# A queued reply and the future of the scope it was sent through, if any
+Reply = tuple[bytes, "asyncio.Future[None] | None"]
+
+
+class BufferedBrokerProducer(BrokerProducer):
+    """
+    Status reply publisher.
+
+    Messages are put into a bounded queue and published in batches, either
+    when `max_batch_size` messages are collected or `linger_ms` has passed
+    since the first one. `send_message` blocks while the queue is full.
+
+    Messages that still fail after `max_retries` attempts are dropped. The
+    failure is raised by `flush()` of the ReplyScope they were sent through,
+    and only there, so every caller learns about its own lost replies and
+    does not commit the offsets behind them.
+    """
+
+    def __init__(
+        self,
+        producer: AIOKafkaProducer,
+        topic: str,
+        linger_ms: int,
+        max_batch_size: int,
+        queue_size: int,
+        max_retries: int = 3,
+        retry_backoff_ms: int = 200,
+    ) -> None:
+        super().__init__(producer, topic)
+        self.linger = linger_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.queue: asyncio.Queue[Reply] = asyncio.Queue(maxsize=queue_size)
+        self._task: asyncio.Task | None = None
+        self._last_error: Exception | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    def scope(self) -> "ReplyScope":
+        return ReplyScope(self)
+
+    async def send_message(self, value: BaseModel) -> None:
+        """Publish without tracking, a failure is only logged."""
+        await self.queue.put((value.model_dump_json().encode(), None))
+
+    async def enqueue(self, value: BaseModel) -> "asyncio.Future[None]":
+        """Queue a message, the future is done once it is published or dropped."""
+        sent: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        await self.queue.put((value.model_dump_json().encode(), sent))
+        return sent
+
+    async def flush(self) -> None:
+        """Wait until every queued message is handled."""
+        await self.queue.join()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        try:
+            await self.flush()
         finally:
-            await self.close_connection()
-            logger.info("Stopping producer")
-            await asyncio.sleep(0)
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            # sent after the last flush, they will never be published
+            while not self.queue.empty():
+                self._report([self.queue.get_nowait()], STOPPED)
+                self.queue.task_done()
+            logger.info("Reply publisher stopped, topic: %s", self.topic)
+
+    async def _collect_batch(self) -> list[Reply]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.linger
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _publish(self, batch: list[Reply]) -> list[Reply]:
+        """
+        Send the batch, return the messages that were not acknowledged.
+        A message whose send() raised never reached the producer buffer,
+        the ones before and after it did and are only awaited.
+        """
+        acks: dict[int, asyncio.Future] = {}
+        failed: set[int] = set()
+        for i, (value, _) in enumerate(batch):
+            try:
+                acks[i] = await self.producer.send(topic=self.topic, value=value)
+            except Exception as e:
+                self._last_error = e
+                failed.add(i)
+        results = await asyncio.gather(*acks.values(), return_exceptions=True)
+        for i, result in zip(acks, results):
+            if isinstance(result, Exception):
+                self._last_error = result
+                failed.add(i)
+        return [batch[i] for i in sorted(failed)]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            pending = batch
+            try:
+                for attempt in range(self.max_retries + 1):
+                    if attempt:
+                        await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                    pending = await self._publish(pending)
+                    if not pending:
+                        break
+                if pending:
+                    logger.error(
+                        "Failed to publish %s replies to %s, error: %s",
+                        len(pending),
+                        self.topic,
+                        self._last_error,
+                    )
+            finally:
+                # whatever is still pending when cancelled counts as lost
+                self._report(pending, self._last_error or STOPPED)
+                self._report(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _report(self, replies: list[Reply], error: Exception | None = None) -> None:
+        for _, sent in replies:
+            if sent is None or sent.done():
+                continue
+            if error is not None:
+                sent.set_exception(error)
+            else:
+                sent.set_result(None)
+
+
+class ReplyScope(BrokerProducer):
+    """
+    The replies one caller sends through a BufferedBrokerProducer.
+
+    `flush()` waits for the replies sent through this scope and raises if
+    any of them was dropped since the last flush, whatever other scopes
+    of the publisher do. The replies of a child scope (`scope()`) count
+    for its parent as well.
+    """
+
+    def __init__(
+        self, publisher: BufferedBrokerProducer, parent: "ReplyScope | None" = None
+    ) -> None:
+        super().__init__(publisher.producer, publisher.topic)
+        self.publisher = publisher
+        self.parent = parent
+        # replies are handled in the order they are queued
+        self._pending: deque[asyncio.Future[None]] = deque()
+        self._failed = 0
+        self._error: BaseException | None = None
+
+    def scope(self) -> "ReplyScope":
+        return ReplyScope(self.publisher, parent=self)
+
+    async def send_message(self, value: BaseModel) -> None:
+        sent = await self.publisher.enqueue(value)
+        scope: ReplyScope | None = self
+        while scope is not None:
+            scope._settle()
+            scope._pending.append(sent)
+            scope = scope.parent
+
+    async def flush(self) -> None:
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+        self._settle()
+        if self._failed:
+            failed, error = self._failed, self._error
+            self._failed, self._error = 0, None
+            raise Exception(f"Failed to send {failed} replies to {self.topic}: {error}")
+
+    def _settle(self) -> None:
+        """Count the failures of the replies handled so far and forget them."""
+        while self._pending and self._pending[0].done():
+            error = self._pending.popleft().exception()
+            if error is not None:
+                self._failed += 1
+                if self._error is None:
+                    self._error = error
+
+
+#######################
+### Shared Producer ###
+#######################
+
+# Started once in Litestar on_startup and reused by every consumer
+_producer: AIOKafkaProducer | None = None
+_reply_publishers: dict[str, BufferedBrokerProducer] = {}
+
+
+async def start_producer() -> None:
+    global _producer
+    if _producer is not None:
+        return
+    # no aiokafka linger_ms, the reply publishers already linger before sending a batch
+    producer = AIOKafkaProducer(
+        bootstrap_servers=settings.broker.kafka_bootstrap_servers,
+        compression_type=settings.broker.compression_type,
+    )
+    await producer.start()
+    _producer = producer
+    for topic in (settings.broker.receive_topic, settings.broker.receive_csv_topic):
+        publisher = BufferedBrokerProducer(
+            producer,
+            topic,
+            linger_ms=settings.broker.reply_linger_ms,
+            max_batch_size=settings.broker.reply_max_batch_size,
+            queue_size=settings.broker.reply_queue_size,
+            max_retries=settings.broker.reply_max_retries,
+            retry_backoff_ms=settings.broker.reply_retry_backoff_ms,
+        )
+        await publisher.start()
+        _reply_publishers[topic] = publisher
+    logger.info("Producer started")
+
 
-    def __del__(self):
-        asyncio.run(self.close_connection())
-        logger.info("Producer deleted")
+async def stop_producer() -> None:
+    global _producer
+    if _producer is None:
+        return
+    try:
+        # Flush pending replies before the connection goes away
+        for publisher in _reply_publishers.values():
+            await publisher.stop()
+        await _producer.stop()
+    finally:
+        _reply_publishers.clear()
+        _producer = None
+        logger.info("Producer stopped")
 
 
 ######################
@@ -55,15 +295,16 @@ class BrokerProducer:
 
 
 async def get_broker() -> AIOKafkaProducer:
-    return AIOKafkaProducer(bootstrap_servers=settings.broker.kafka_bootstrap_servers)
-    # return AIOKafkaProducer(bootstrap_servers="localhost:9092")
+    if _producer is None:
+        raise RuntimeError("Producer is not started")
+    return _producer
 
 
 async def get_send_mail_producer() -> BrokerProducer:
-    broker = await get_broker()
-    return BrokerProducer(broker, settings.broker.receive_topic)
+    await get_broker()
+    return _reply_publishers[settings.broker.receive_topic]
 
 
 async def get_send_csv_producer() -> BrokerProducer:
-    broker = await get_broker()
-    return BrokerProducer(broker, settings.broker.receive_csv_topic)
+    await get_broker()
+    return _reply_publishers[settings.broker.receive_csv_topic]
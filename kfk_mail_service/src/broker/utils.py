@@ -4,13 +4,48 @@ import logging
 
 
 from .base_consumer import MessageConsumer
-from src.broker.consumers import ConsumeCSV, ConsumeEmail
+from src.broker.consumers import ConsumeBase, ConsumeCSV, ConsumeEmail
 from src.config import settings
 
 event_loop = asyncio.get_event_loop()
 
 logger = logging.getLogger(__name__)
 
+AUTO_COMMIT = settings.broker.consume_mode == "stream"
+
+running_consumers: List[MessageConsumer] = []
+
+
+async def _consume(consumer: MessageConsumer, message_service: ConsumeBase) -> None:
+    running_consumers.append(consumer)
+    try:
+        if settings.broker.consume_mode == "batch":
+            await consumer.consume_batches(
+                message_service=message_service,
+                max_records=settings.broker.batch_max_records,
+                timeout_ms=settings.broker.batch_timeout_ms,
+            )
+        elif settings.broker.consume_mode == "partitioned":
+            await consumer.consume_partitions(
+                message_service=message_service,
+                queue_size=settings.broker.partition_queue_size,
+                commit_interval_ms=settings.broker.commit_interval_ms,
+                max_records=settings.broker.batch_max_records,
+            )
+        else:
+            await consumer.consume_message(message_service=message_service)
+    finally:
+        running_consumers.remove(consumer)
+
+
+def get_consumers_lag() -> dict[str, dict]:
+    """Per-partition lag of consumers running in partitioned mode."""
+    return {
+        consumer.topic: consumer.runner.lag()
+        for consumer in running_consumers
+        if consumer.runner is not None
+    }
+
 
 async def start_email_consuming() -> None:
     consumer1 = MessageConsumer(
@@ -18,11 +53,12 @@ async def start_email_consuming() -> None:
         group_id="EmailGroupID",
         bootstrap_servers=settings.broker.kafka_bootstrap_servers,
         loop=event_loop,
+        enable_auto_commit=AUTO_COMMIT,
+        max_poll_records=settings.broker.max_poll_records,
+        max_poll_interval_ms=settings.broker.max_poll_interval_ms,
     )
 
-    await consumer1.consume_message(
-        message_service=ConsumeEmail(),
-    )
+    await _consume(consumer1, ConsumeEmail())
 
 
 async def start_csv_consuming() -> None:
@@ -31,10 +67,11 @@ async def start_csv_consuming() -> None:
         group_id="CSVGroupID",
         bootstrap_servers=settings.broker.kafka_bootstrap_servers,
         loop=event_loop,
+        enable_auto_commit=AUTO_COMMIT,
+        max_poll_records=settings.broker.csv_max_poll_records,
+        max_poll_interval_ms=settings.broker.csv_max_poll_interval_ms,
     )
-    await consumer.consume_message(
-        message_service=ConsumeCSV(),
-    )
+    await _consume(consumer, ConsumeCSV())
 
 
 background_tasks: List[asyncio.Task] = []
@@ -1,5 +1,5 @@
 from typing import Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
@@ -25,13 +25,53 @@ class SmtpConfig(BaseModel):
     maildev_host: str
     maildev_port: int
     smtp_type: Literal["maildev", "smtp"]
+    # CSV campaign pipeline
+    render_workers: int = 4
+    send_workers: int = 8
+    pipeline_queue_size: int = 100
+    render_threads: int = 4
+    # Connection pool
+    pool_min_size: int = 1
+    pool_max_size: int = 8
+    pool_idle_timeout: int = 60
+    pool_max_messages: int = 100
+    pool_health_check_interval: int = 5
 
 
 class StorageConfig(BaseModel):
-    storage_type: Literal["local", "google_drive"] = "local"
+    storage_type: Literal["local", "google_drive", "s3"] = "local"
     local_storage_csv_path: str = "src/static/csv"
-    local_storage_template_path: str = "src/static/templates/template.html"
-    global_path: str = "/Users/jerry/Projects/Study/Kafka Study/kfk_client"
+    template_dir: str = "src/static/templates"
+    default_template: str = "template.html"
+    template_bytecode_cache_dir: str | None = None
+    template_reload_interval: int = 5  # seconds, 0 disables reloading
+    # other files in template_dir are ignored
+    template_extensions: list[str] = ["html", "htm", "txt", "jinja", "j2"]
+    # local storage only: the client service directory, file paths are relative to it
+    global_path: str = str(BASE_DIR.parent / "kfk_client")
+    read_chunk_size: int = 1024 * 1024  # 1MB
+    # seconds to wait for the next chunk from storage before a CSV read fails
+    read_timeout: float = 60.0
+    # "block": C csv parser in a worker thread, "aiocsv": row by row
+    csv_reader: Literal["block", "aiocsv"] = "block"
+    csv_batch_size: int = 1000
+    # S3-compatible object store shared with the client service
+    s3_endpoint_url: str = "http://localhost:9010"
+    s3_region: str = "us-east-1"
+    s3_bucket: str = "campaigns"
+    # required with storage_type "s3", there are no default credentials
+    s3_access_key: str | None = None
+    s3_secret_key: str | None = None
+    s3_max_connections: int = 20
+
+    @model_validator(mode="after")
+    def check_s3_credentials(self) -> "StorageConfig":
+        if self.storage_type == "s3" and not (self.s3_access_key and self.s3_secret_key):
+            raise ValueError(
+                "storage.s3_access_key and storage.s3_secret_key are required "
+                'with storage_type "s3"'
+            )
+        return self
 
 
 class BrokerConfig(BaseModel):
@@ -40,6 +80,46 @@ class BrokerConfig(BaseModel):
     receive_topic: str = "receive_mail"
     send_csv_topic: str = "send_csv"
     receive_csv_topic: str = "receive_csv"
+    # Status reply publishing
+    reply_linger_ms: int = 50
+    reply_max_batch_size: int = 500
+    reply_queue_size: int = 10_000
+    reply_max_retries: int = 3
+    reply_retry_backoff_ms: int = 200
+    compression_type: Literal["gzip", "snappy", "lz4", "zstd"] | None = None
+    # "stream": one message at a time, "batch": getmany() + explicit commit,
+    # "partitioned": one concurrent worker per assigned partition
+    consume_mode: Literal["stream", "batch", "partitioned"] = "stream"
+    batch_max_records: int = 10
+    batch_timeout_ms: int = 1000
+    partition_queue_size: int = 100
+    commit_interval_ms: int = 1000
+    # Polling: the records of one poll must be done within max_poll_interval_ms
+    max_poll_records: int = 10
+    max_poll_interval_ms: int = 300_000
+    # a CSV message is a whole shard, dispatched before the next poll, so take
+    # one at a time and allow for the time a full shard takes to send
+    csv_max_poll_records: int = 1
+    csv_max_poll_interval_ms: int = 1_800_000
+
+
+class CheckpointConfig(BaseModel):
+    # CSV campaign progress, a SQLite file shared by the worker processes of a host
+    enabled: bool = True
+    path: str = str(BASE_DIR / "checkpoints.sqlite3")
+    interval_rows: int = 100
+    retention_days: int = 7
+
+
+class SupervisorConfig(BaseModel):
+    # > 1 runs the consumers in that many child processes
+    workers: int = 1
+    heartbeat_interval: float = 1.0
+    heartbeat_timeout: float = 10.0
+    # first restart delay, doubled on every crash in a row up to restart_max_delay
+    restart_delay: float = 1.0
+    restart_max_delay: float = 60.0
+    shutdown_timeout: float = 30.0
 
 
 class Settings(BaseSettings):
@@ -57,6 +137,8 @@ class Settings(BaseSettings):
     mode: Literal["DEV", "PROD", "TEST"] = "DEV"
     storage: StorageConfig = StorageConfig()
     broker: BrokerConfig
+    supervisor: SupervisorConfig = SupervisorConfig()
+    checkpoint: CheckpointConfig = CheckpointConfig()
 
 
 settings = Settings()  # type: ignore
@@ -0,0 +1,124 @@
+"""
+In-process latency metrics module
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram
+    """
+
+    def __init__(self, name: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+        # observed from the render threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        count = sum(self.counts)
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": count,
+            "avg": self.total / count if count else 0.0,
+            "max": self.max,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+render_latency = LatencyHistogram("email_render_seconds")
+loop_lag = LatencyHistogram("event_loop_lag_seconds")
+
+
+###########################
+## EVENT LOOP MONITORING ##
+###########################
+
+LOOP_LAG_INTERVAL = 0.1
+
+_monitor: asyncio.Task | None = None
+
+
+async def _measure_loop_lag() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        loop_lag.observe(max(loop.time() - started - LOOP_LAG_INTERVAL, 0.0))
+
+
+async def start_loop_monitor() -> None:
+    global _monitor
+    if _monitor is None:
+        _monitor = asyncio.create_task(_measure_loop_lag())
+
+
+async def stop_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        _monitor.cancel()
+        await asyncio.gather(_monitor, return_exceptions=True)
+        _monitor = None
+
+
+def get_metrics() -> dict:
+    return {
+        render_latency.name: render_latency.snapshot(),
+        loop_lag.name: loop_lag.snapshot(),
+    }
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    """Sum histogram snapshots of the same metric, e.g. from several processes."""
+    count = sum(snapshot["count"] for snapshot in snapshots)
+    total = sum(snapshot["avg"] * snapshot["count"] for snapshot in snapshots)
+    buckets: dict[str, int] = {}
+    for snapshot in snapshots:
+        for label, value in snapshot["buckets"].items():
+            buckets[label] = buckets.get(label, 0) + value
+    return {
+        "count": count,
+        "avg": total / count if count else 0.0,
+        "max": max((snapshot["max"] for snapshot in snapshots), default=0.0),
+        "buckets": buckets,
+    }
+
+
+def merge_metrics(reports: list[dict]) -> dict:
+    """Merge `get_metrics()` results of several processes."""
+    names = {name for report in reports for name in report}
+    return {
+        name: merge_snapshots([report[name] for report in reports if name in report])
+        for name in sorted(names)
+    }
+
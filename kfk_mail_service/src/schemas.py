@@ -17,6 +17,7 @@ class EmailBaseModel(BaseModel):
     from_email: Annotated[EmailStr, MinLen(5), MaxLen(100)]
     to_email: Annotated[EmailStr, MinLen(5), MaxLen(100)]
     message_body: str | None = None
+    template_name: str | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -35,6 +36,15 @@ class UploadedFileRead(BaseModel):
     file_name: str
     file_path: str
     user_id: int
+    # campaign shard: rows `byte_start..byte_end` of the file, without the header.
+    # Messages without shard fields cover the whole file.
+    shard: int | None = None
+    shard_count: int = 1
+    row_start: int = 0
+    row_count: int | None = None
+    byte_start: int = 0
+    byte_end: int | None = None
+    fieldnames: list[str] | None = None
 
 
 class EmailReturnFromCsv(BaseModel):
@@ -45,5 +55,11 @@ class EmailReturnFromCsv(BaseModel):
     message_body: str | None = None
     status: str = "error"
     status_message: str | None = None
+    file_id: int | None = None
+    shard: int | None = None
+    # index of the row inside its shard, the client stores every row once
+    row_index: int | None = None
+    # set on the reply for a shard that could not be dispatched as a whole
+    shard_failed: bool = False
 
     model_config = ConfigDict(from_attributes=True)
@@ -12,12 +12,26 @@ from src.smtp.service import (
 
 # from faststream import Depends
 
+# Shared by all consumers so they draw from one connection pool
+_smtp_service: SMTPService | None = None
 
-def get_smtp_service() -> SMTPService:
+
+def _pool_options() -> dict[str, int]:
+    return {
+        "pool_min_size": settings.smtp.pool_min_size,
+        "pool_max_size": settings.smtp.pool_max_size,
+        "pool_idle_timeout": settings.smtp.pool_idle_timeout,
+        "pool_max_messages": settings.smtp.pool_max_messages,
+        "pool_health_check_interval": settings.smtp.pool_health_check_interval,
+    }
+
+
+def _create_smtp_service() -> SMTPService:
     if settings.smtp.smtp_type == "maildev":
         return SMTPServiceMailDev(
             host=settings.smtp.maildev_host,
             port=settings.smtp.maildev_port,
+            **_pool_options(),
         )
 
     if settings.smtp.smtp_type == "smtp":
@@ -27,5 +41,24 @@ def get_smtp_service() -> SMTPService:
             host=settings.smtp.smtp_host,
             port=settings.smtp.smtp_port,
             timeout=settings.smtp.smtp_timeout,
+            **_pool_options(),
         )
     raise ValueError("Unknown smtp type")
+
+
+def get_smtp_service() -> SMTPService:
+    global _smtp_service
+    if _smtp_service is None:
+        _smtp_service = _create_smtp_service()
+    return _smtp_service
+
+
+async def start_smtp_service() -> None:
+    await get_smtp_service().start()
+
+
+async def close_smtp_service() -> None:
+    global _smtp_service
+    if _smtp_service is not None:
+        await _smtp_service.close()
+        _smtp_service = None
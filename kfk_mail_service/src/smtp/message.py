@@ -1,43 +1,77 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
-from pathlib import Path
-from typing import BinaryIO
+import time
+
+from jinja2 import Template
 
-import aiofiles
 from src.config import settings
-from src.schemas import EmailBaseModel, EmailRecieve
-from src.storage import StorageService
+from src.metrics import render_latency
+from src.schemas import EmailBaseModel
+from src.smtp.templates import get_template_registry
 
-from jinja2 import Template
+#####################
+## RENDER EXECUTOR ##
+#####################
+
+# Rendering and MIME assembly are CPU bound, keep them off the event loop
+_render_executor: ThreadPoolExecutor | None = None
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(
+            max_workers=settings.smtp.render_threads,
+            thread_name_prefix="email-render",
+        )
+    return _render_executor
+
+
+async def start_render_executor() -> None:
+    get_render_executor()
+
+
+async def stop_render_executor() -> None:
+    global _render_executor
+    if _render_executor is not None:
+        executor, _render_executor = _render_executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True)
+
+
+def _build_email(template: Template, message: EmailBaseModel) -> EmailMessage:
+    # Timed in the render thread, so executor queue wait is not counted
+    started = time.perf_counter()
+    #  Jinja2
+    html_content = template.render(
+        header_text="This is a test email",
+        message_body=message.message_body,
+    )
+
+    msg = EmailMessage()
+    msg["Subject"] = message.subject
+    msg["From"] = message.from_email
+    msg["To"] = message.to_email
+
+    msg.set_content(
+        "Please view this email in an HTML-capable email client.", subtype="plain"
+    )
+    msg.add_alternative(html_content, subtype="html")
+    render_latency.observe(time.perf_counter() - started)
+    return msg
 
 
 async def get_prepared_email_template(
     message: EmailBaseModel,
 ) -> EmailMessage:
     try:
-        # Get HTML template
-        filepath: str | Path = settings.storage.local_storage_template_path
-        # file_content: BinaryIO = await storage.get_file(filepath)
-        async with aiofiles.open(filepath, "rb") as f:
-            html_template = (await f.read()).decode("utf-8")
-
-        #  Jinja2
-        template = Template(html_template)
-        html_content = template.render(
-            header_text="This is a test email",
-            message_body=message.message_body,
-        )
+        # Get compiled HTML template
+        template = get_template_registry().get(message.template_name)
 
-        msg = EmailMessage()
-        msg["Subject"] = message.subject
-        msg["From"] = message.from_email
-        msg["To"] = message.to_email
-
-        msg.set_content(
-            "Please view this email in an HTML-capable email client.", subtype="plain"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_render_executor(), _build_email, template, message
         )
-        msg.add_alternative(html_content, subtype="html")
-
-        return msg
 
     except Exception as e:
         raise ValueError(f"Error preparing email template: {str(e)}")
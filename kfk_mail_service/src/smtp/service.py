@@ -1,17 +1,207 @@
 from abc import ABC, abstractmethod
-from contextlib import asynccontextmanager, contextmanager
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
 from email.message import EmailMessage
-from functools import lru_cache
-from typing import AsyncGenerator
-import aiosmtplib
-import smtplib
 import ssl
+import time
+from typing import Awaitable, Callable
+
+import aiosmtplib
+from aiosmtplib.email import extract_recipients, extract_sender, flatten_message
 
 from logging import getLogger
 
 logger = getLogger(__name__)
 
 
+#####################
+## CONNECTION POOL ##
+#####################
+
+# "Service not available, closing transmission channel"
+SMTP_SERVICE_UNAVAILABLE = 421
+
+
+@dataclass
+class PooledConnection:
+    client: aiosmtplib.SMTP
+    messages_sent: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    # set once the message body is handed to the server, a message may be
+    # delivered already when the connection drops after that
+    data_started: bool = False
+
+
+class SMTPConnectionPool:
+    """
+    Async pool of logged-in SMTP connections.
+
+    * `min_size` connections are opened by `start()` and kept open
+    * at most `max_size` connections are in use at the same time
+    * idle connections older than `idle_timeout` seconds are closed
+    * a connection is recycled after `max_messages` messages
+    * a connection idle for more than `health_check_interval` seconds is
+      checked with NOOP before reuse
+    * a send failing with 421 or a disconnect before DATA is retried once
+      on a new connection, later failures are not, to avoid double delivery
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[aiosmtplib.SMTP]],
+        min_size: int,
+        max_size: int,
+        idle_timeout: int,
+        max_messages: int,
+        health_check_interval: int,
+    ) -> None:
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.health_check_interval = health_check_interval
+        self._idle: deque[PooledConnection] = deque()
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._reaper: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Open `min_size` connections up front, failures are left to the first sends."""
+        self._start_reaper()
+        results = await asyncio.gather(
+            *(self._new_connection() for _ in range(self.min_size - len(self._idle))),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("Failed to pre-open SMTP connection: %s", result)
+            else:
+                self._idle.append(result)
+
+    async def send_message(self, msg: EmailMessage) -> None:
+        async with self._semaphore:
+            self._start_reaper()
+            conn = await self._checkout()
+            failure: BaseException | None = None
+            try:
+                try:
+                    await self._send(conn, msg)
+                except Exception as e:
+                    if not _is_connection_lost(e) or conn.data_started:
+                        raise
+                    logger.warning("SMTP connection lost before DATA, reconnecting: %s", e)
+                    await self._discard(conn)
+                    conn = await self._new_connection()
+                    await self._send(conn, msg)
+                conn.messages_sent += 1
+            except BaseException as e:
+                failure = e
+                raise
+            finally:
+                # on success, failure and cancellation alike
+                await self._release(conn, failure)
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    async def _checkout(self) -> PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            idle_for = time.monotonic() - conn.last_used
+            if not conn.client.is_connected or idle_for > self.idle_timeout:
+                await self._discard(conn)
+                continue
+            if idle_for > self.health_check_interval:
+                try:
+                    await conn.client.noop()
+                except Exception:
+                    await self._discard(conn)
+                    continue
+            return conn
+        return await self._new_connection()
+
+    @staticmethod
+    async def _send(conn: PooledConnection, msg: EmailMessage) -> None:
+        conn.data_started = False
+        sender = extract_sender(msg)
+        recipients = extract_recipients(msg)
+        if sender is None or not recipients:
+            raise ValueError("Message has no sender or recipients")
+        await conn.client.mail(sender)
+        for recipient in recipients:
+            await conn.client.rcpt(recipient)
+        conn.data_started = True
+        await conn.client.data(flatten_message(msg))
+
+    async def _release(
+        self, conn: PooledConnection, failure: BaseException | None
+    ) -> None:
+        if failure is None:
+            await self._checkin(conn)
+        elif isinstance(failure, Exception) and not _is_connection_lost(failure):
+            # e.g. a refused recipient, the session itself is still usable
+            await self._reset_or_discard(conn)
+        else:
+            # cancelled or disconnected mid-dialogue, no awaiting the server here
+            conn.client.close()
+
+    async def _checkin(self, conn: PooledConnection) -> None:
+        if conn.messages_sent >= self.max_messages:
+            await self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+
+    async def _new_connection(self) -> PooledConnection:
+        return PooledConnection(client=await self._connect())
+
+    async def _reset_or_discard(self, conn: PooledConnection) -> None:
+        try:
+            await conn.client.rset()
+        except Exception:
+            await self._discard(conn)
+        else:
+            await self._checkin(conn)
+
+    async def _discard(self, conn: PooledConnection) -> None:
+        try:
+            if conn.client.is_connected:
+                await conn.client.quit()
+        except Exception as e:
+            logger.warning("Failed closing SMTP connection, error: %s", e)
+            conn.client.close()
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1))
+            now = time.monotonic()
+            # oldest connections are at the left side of the deque
+            while (
+                len(self._idle) > self.min_size
+                and now - self._idle[0].last_used > self.idle_timeout
+            ):
+                await self._discard(self._idle.popleft())
+
+
+def _is_connection_lost(exc: Exception) -> bool:
+    if isinstance(exc, aiosmtplib.SMTPServerDisconnected):
+        return True
+    return (
+        isinstance(exc, aiosmtplib.SMTPResponseException)
+        and exc.code == SMTP_SERVICE_UNAVAILABLE
+    )
+
+
 ###################
 ## EMAIL SERVICE ##
 ###################
@@ -22,71 +212,90 @@ class SMTPService(ABC):
     async def send_email(self, msg: EmailMessage):
         pass
 
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class PooledSMTPService(SMTPService):
+    def __init__(
+        self,
+        pool_min_size: int = 1,
+        pool_max_size: int = 8,
+        pool_idle_timeout: int = 60,
+        pool_max_messages: int = 100,
+        pool_health_check_interval: int = 5,
+    ):
+        self.pool = SMTPConnectionPool(
+            connect=self.connect,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            idle_timeout=pool_idle_timeout,
+            max_messages=pool_max_messages,
+            health_check_interval=pool_health_check_interval,
+        )
+
+    @abstractmethod
+    async def connect(self) -> aiosmtplib.SMTP:
+        pass
+
+    async def send_email(self, msg: EmailMessage):
+        try:
+            await self.pool.send_message(msg)
+            logger.info("Email successfully sent to %s", msg["TO"])
+        except Exception as e:
+            logger.error("Failed to send email to %s, error: %s", msg["TO"], str(e))
+            raise ValueError(f"Failed to send email: {str(e)}")
+
+    async def start(self) -> None:
+        await self.pool.start()
+
+    async def close(self) -> None:
+        await self.pool.close()
+
 
 ###################
 # MailDevService #
 ###################
 
 
-class SMTPServiceMailDev(SMTPService):
-    def __init__(self, host, port):
+class SMTPServiceMailDev(PooledSMTPService):
+    def __init__(self, host, port, **pool_options):
+        super().__init__(**pool_options)
         self.host = host
         self.port = port
 
-    async def send_email(self, msg: EmailMessage):
-        try:
-            async with aiosmtplib.SMTP(
-                hostname=self.host,
-                port=self.port,
-            ) as server:
-                await server.send_message(msg)
-            logger.info("Email successfully sent to %s", msg["TO"])
-        except Exception as e:
-            raise ValueError(f"Failed to load file: {str(e)}")
-            logger.error("Failed to send email to %s, error: %s", (msg["TO"], str(e)))
+    async def connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(hostname=self.host, port=self.port)
+        await client.connect()
+        return client
 
 
-class SMTPServiceSMTP(SMTPService):
+class SMTPServiceSMTP(PooledSMTPService):
 
-    def __init__(self, username, password, host, port, timeout):
+    def __init__(self, username, password, host, port, timeout, **pool_options):
+        super().__init__(**pool_options)
         self.username = username
         self.password = password
         self.host = host
         self.port = port
         self.timeout = timeout
 
-    @asynccontextmanager
-    @lru_cache
-    async def connection(self) -> AsyncGenerator[aiosmtplib.SMTP, None]:
-        client = None
+    async def connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            timeout=self.timeout,
+            start_tls=False,
+        )
+        await client.connect()
         try:
-
-            client = aiosmtplib.SMTP(
-                hostname=self.host, port=self.port, timeout=self.timeout
-            )
-
-            await client.ehlo()
             await client.starttls(tls_context=ssl.create_default_context())
             await client.login(self.username, self.password)
-            logger.info("Connected to %s", self.host)
-            yield client
-        except Exception as e:
-            logger.error("Failed to connect to %s, error: %s", (self.host, str(e)))
-        finally:
-            if client:
-                try:
-                    await client.quit()
-                except Exception as e:
-                    logger.warning(
-                        "Failed closing SMTP connection to %s, error: %s",
-                        (self.host, str(e)),
-                    )
-
-    async def send_email(self, msg: EmailMessage):
-        try:
-            async with self.connection() as client:
-                await client.send_message(msg)
-            logger.info("Email successfully sent to %s", msg["TO"])
-        except Exception as e:
-            raise Exception
-            logger.error("Failed to send email to %s, error: %s", (msg["TO"], str(e)))
+        except Exception:
+            client.close()
+            raise
+        logger.info("Connected to %s", self.host)
+        return client
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+#######################
+## TEMPLATE REGISTRY ##
+#######################
+
+
+class TemplateRegistry:
+    """
+    Compiled email templates, loaded once at startup.
+
+    Rendering only reads from memory. A background task compares template
+    mtimes every `reload_interval` seconds and recompiles changed files.
+    """
+
+    def __init__(
+        self,
+        template_dir: str | Path,
+        default_template: str,
+        bytecode_cache_dir: str | None = None,
+        reload_interval: int = 0,
+        extensions: tuple[str, ...] = ("html", "htm", "txt", "jinja", "j2"),
+    ) -> None:
+        self.template_dir = Path(template_dir)
+        self.default_template = default_template
+        self.reload_interval = reload_interval
+        self.extensions = extensions
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        self.env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+        )
+        self._templates: dict[str, Template] = {}
+        self._mtimes: dict[str, float] = {}
+        self._watcher: asyncio.Task | None = None
+
+    def get(self, name: str | None = None) -> Template:
+        name = name or self.default_template
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise ValueError(f'Unknown email template "{name}"')
+
+    def load_all(self) -> None:
+        """Compile every template in `template_dir`, dropping removed ones."""
+        mtimes = self._scan()
+        for name in self._templates.keys() - mtimes.keys():
+            del self._templates[name]
+            del self._mtimes[name]
+        for name, mtime in mtimes.items():
+            if self._mtimes.get(name) != mtime:
+                self._templates[name] = self.env.loader.load(  # type: ignore
+                    self.env, name, self.env.globals
+                )
+                self._mtimes[name] = mtime
+                logger.info('Email template "%s" loaded', name)
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self.load_all)
+        if self.reload_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def _scan(self) -> dict[str, float]:
+        return {
+            name: (self.template_dir / name).stat().st_mtime
+            for name in self.env.list_templates(filter_func=self._is_template)
+        }
+
+    def _is_template(self, name: str) -> bool:
+        # skip READMEs, editor swap files, .DS_Store and other non-templates
+        basename = name.rsplit("/", 1)[-1]
+        if basename.startswith("."):
+            return False
+        return "." in basename and basename.rsplit(".", 1)[1] in self.extensions
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.load_all)
+            except Exception as e:
+                logger.error("Failed to reload email templates: %s", e)
+
+
+_registry: TemplateRegistry | None = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry(
+            template_dir=settings.storage.template_dir,
+            default_template=settings.storage.default_template,
+            bytecode_cache_dir=settings.storage.template_bytecode_cache_dir,
+            reload_interval=settings.storage.template_reload_interval,
+            extensions=tuple(settings.storage.template_extensions),
+        )
+    return _registry
+
+
+async def start_template_registry() -> None:
+    await get_template_registry().start()
+
+
+async def stop_template_registry() -> None:
+    await get_template_registry().stop()
@@ -1,9 +1,11 @@
 from typing import Literal
 
 
+from kfk_common.s3 import S3Client
 from src.config import settings
 from src.storage.storage import (
     LocalStorageService,
+    S3StorageService,
     StorageService,
 )
 
@@ -12,12 +14,44 @@ from src.storage.storage import (
 ## STORAGE DEPENDENCIES ##
 ##########################
 
+# Shared by all consumers so they use one connection pool
+_s3_client: S3Client | None = None
+
+
+def get_s3_client() -> S3Client:
+    global _s3_client
+    if _s3_client is None:
+        access_key = settings.storage.s3_access_key
+        secret_key = settings.storage.s3_secret_key
+        if not (access_key and secret_key):
+            raise RuntimeError(
+                "storage.s3_access_key and storage.s3_secret_key are not set"
+            )
+        _s3_client = S3Client(
+            endpoint_url=settings.storage.s3_endpoint_url,
+            bucket=settings.storage.s3_bucket,
+            access_key=access_key,
+            secret_key=secret_key,
+            region=settings.storage.s3_region,
+            max_connections=settings.storage.s3_max_connections,
+        )
+    return _s3_client
+
+
+async def close_storage() -> None:
+    global _s3_client
+    if _s3_client is not None:
+        await _s3_client.close()
+        _s3_client = None
+
 
 def get_storage_service(filetype: Literal["html", "csv"]) -> StorageService:
-    local_path = settings.storage.local_storage_csv_path
+    if settings.storage.storage_type == "s3":
+        return S3StorageService(client=get_s3_client(), filetype=filetype)
+    # paths in the messages are relative to the client service directory
     return LocalStorageService(
         filetype=filetype,
-        base_path=local_path,
+        base_path=settings.storage.global_path,
     )
 
 
@@ -1,18 +1,35 @@
 from abc import ABC, abstractmethod
+import asyncio
+import codecs
 import csv
+from dataclasses import dataclass
+import io
+import itertools
+import logging
 import aiocsv
-from typing import AsyncGenerator, BinaryIO, Literal
+from typing import AsyncGenerator, AsyncIterator, BinaryIO, Literal
 from pathlib import Path
 import shutil
 import aiofiles
 from aiofiles.threadpool.binary import AsyncBufferedReader
 
+from kfk_common.s3 import S3Client
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
 
 class StorageService(ABC):
     @abstractmethod
     async def get_file(self, file_path_or_id: str) -> BinaryIO:
         pass
 
+    @abstractmethod
+    def iter_file(
+        self, file_path_or_id: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """Stream bytes `start..end` (end exclusive) of the file."""
+
 
 ###########################
 ## LOCAL STORAGE SERVICE ##
@@ -24,10 +41,12 @@ class LocalStorageService(StorageService):
         self,
         filetype: Literal["csv", "html", "template"],
         base_path: str,
+        chunk_size: int = settings.storage.read_chunk_size,
     ):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
         self.filetype = filetype
+        self.chunk_size = chunk_size
 
     async def get_file(self, file_path_or_id: str | Path) -> AsyncBufferedReader:
         try:
@@ -37,14 +56,252 @@ class LocalStorageService(StorageService):
         except IOError as e:
             raise IOError(f"Failed to save file: {str(e)}")
 
+    async def iter_file(
+        self, file_path_or_id: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        path = self.base_path / file_path_or_id
+        if not path.exists():
+            raise FileNotFoundError(f'File "{path}" not found')
+        async with aiofiles.open(path, "rb") as f:
+            await f.seek(start)
+            position = start
+            while end is None or position < end:
+                size = self.chunk_size if end is None else min(self.chunk_size, end - position)
+                chunk = await f.read(size)
+                if not chunk:
+                    return
+                position += len(chunk)
+                yield chunk
+
+
+########################
+## S3 STORAGE SERVICE ##
+########################
+
+
+class S3StorageService(StorageService):
+    """Reads files uploaded by the client service, the path is the object key."""
+
+    def __init__(
+        self,
+        client: S3Client,
+        filetype: Literal["csv", "html", "template"],
+        chunk_size: int = settings.storage.read_chunk_size,
+    ):
+        self.client = client
+        self.filetype = filetype
+        self.chunk_size = chunk_size
+
+    async def get_file(self, file_path_or_id: str) -> bytes:
+        size = await self.client.head_object(file_path_or_id)
+        if size is None:
+            raise FileNotFoundError(f'Object "{file_path_or_id}" not found')
+        return b"".join(
+            [chunk async for chunk in self.iter_file(file_path_or_id, 0, size)]
+        )
+
+    def iter_file(
+        self, file_path_or_id: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        return self.client.iter_object(file_path_or_id, self.chunk_size, start, end)
+
+
+#################
+## CSV READING ##
+#################
+
+
+class AsyncTextReader:
+    """
+    File-like `read(size)` over a stream of byte chunks, the interface
+    aiocsv expects. Multi-byte characters split between chunks are
+    handled by the incremental decoder.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], encoding: str = "utf-8-sig"):
+        self._chunks = chunks
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._buffer = ""
+        self._eof = False
+
+    async def read(self, size: int = -1) -> str:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                chunk = await anext(self._chunks)
+            except StopAsyncIteration:
+                self._eof = True
+                self._buffer += self._decoder.decode(b"", final=True)
+            else:
+                self._buffer += self._decoder.decode(chunk)
+        if size < 0:
+            size = len(self._buffer)
+        text, self._buffer = self._buffer[:size], self._buffer[size:]
+        return text
+
+
+async def read_csv_file(
+    storage: StorageService,
+    file_path_or_id: str,
+    start: int = 0,
+    end: int | None = None,
+    fieldnames: list[str] | None = None,
+) -> AsyncGenerator[dict, None]:
+    """
+    Rows of the file or of its byte range `start..end`. A range past
+    the header line needs the column names passed as `fieldnames`.
+    """
+    try:
+        reader = aiocsv.AsyncDictReader(
+            AsyncTextReader(storage.iter_file(file_path_or_id, start, end)),
+            fieldnames=fieldnames,
+            delimiter=",",
+        )
+        async for row in reader:
+            yield row
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to read file: {str(e)}")
+
+
+###########################
+## BLOCK CSV READER       ##
+###########################
+
+
+@dataclass(slots=True)
+class CsvBatch:
+    """Rows as plain lists sharing one header, instead of a dict per row."""
+
+    header: tuple[str, ...]
+    rows: list[list[str]]
+    # absolute byte offset right after every row, where a resumed read starts
+    offsets: list[int]
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    Blocking file object over an async byte iterator. It is read from a
+    worker thread, every chunk is fetched on the event loop.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[bytes],
+        loop: asyncio.AbstractEventLoop,
+        timeout: float | None = None,
+    ):
+        self._chunks = chunks
+        self._loop = loop
+        self._timeout = timeout
+        self._pending = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending and not self._eof:
+            future = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop)
+            try:
+                self._pending = future.result(self._timeout)
+            except TimeoutError:
+                # a stalled storage read must not pin the worker thread forever
+                future.cancel()
+                raise TimeoutError(
+                    f"No data from storage within {self._timeout} seconds"
+                ) from None
+            self._eof = not self._pending
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    async def _next_chunk(self) -> bytes:
+        return await anext(self._chunks, b"")
+
+
+class _LineReader:
+    """
+    Decoded lines for csv.reader, counting the bytes consumed. csv.reader
+    pulls exactly the lines of one record, so after every record `offset`
+    is the byte offset of the next one.
+    """
+
+    def __init__(self, stream: io.BufferedReader, offset: int):
+        self._stream = stream
+        self.offset = offset
+        self._at_start = offset == 0
 
-async def read_csv_file(file_path_or_id: str | Path) -> AsyncGenerator[dict, None]:
+    def __iter__(self) -> "_LineReader":
+        return self
+
+    def __next__(self) -> str:
+        line = self._stream.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        if self._at_start:
+            self._at_start = False
+            line = line.removeprefix(codecs.BOM_UTF8)
+        return line.decode("utf-8")
+
+
+def _read_batch(
+    reader, lines: _LineReader, size: int
+) -> tuple[list[list[str]], list[int]]:
+    rows, offsets = [], []
+    for row in itertools.islice(reader, size):
+        rows.append(row)
+        offsets.append(lines.offset)
+    return rows, offsets
+
+
+async def read_csv_batches(
+    storage: StorageService,
+    file_path_or_id: str,
+    start: int = 0,
+    end: int | None = None,
+    fieldnames: list[str] | None = None,
+    batch_size: int = settings.storage.csv_batch_size,
+) -> AsyncGenerator[CsvBatch, None]:
+    """
+    Parses the file with the C `csv` module in a worker thread, one thread
+    hop per `batch_size` rows instead of one per row as with aiocsv.
+    """
+    chunks = storage.iter_file(file_path_or_id, start, end)
+    lines = _LineReader(
+        io.BufferedReader(
+            _ChunkStream(
+                chunks,
+                asyncio.get_running_loop(),
+                timeout=settings.storage.read_timeout,
+            ),
+            buffer_size=settings.storage.read_chunk_size,
+        ),
+        offset=start,
+    )
+    reader = csv.reader(lines, delimiter=",")
     try:
-        if not Path(file_path_or_id).exists():
-            raise FileNotFoundError(f'File "{file_path_or_id}" not found')
-        async with aiofiles.open(file_path_or_id, "r", encoding="utf-8-sig") as f:
-            reader = aiocsv.AsyncDictReader(f, delimiter=",")
-            async for row in reader:
-                yield row
+        if fieldnames:
+            header = tuple(fieldnames)
+        else:
+            header = tuple(await asyncio.to_thread(next, reader, ()))
+        while True:
+            rows, offsets = await asyncio.to_thread(
+                _read_batch, reader, lines, batch_size
+            )
+            if not rows:
+                break
+            yield CsvBatch(header=header, rows=rows, offsets=offsets)
+    except FileNotFoundError:
+        raise
     except Exception as e:
         raise ValueError(f"Failed to read file: {str(e)}")
+    finally:
+        try:
+            await chunks.aclose()
+        except RuntimeError as e:
+            # still being read by a cancelled worker thread, the stream is
+            # closed once that read returns or times out
+            logger.warning("Storage stream of %s not closed: %s", file_path_or_id, e)
@@ -0,0 +1,264 @@
+"""
+Multi-process consumer supervisor module
+
+Runs the Kafka consumers in `settings.supervisor.workers` child processes.
+Every child joins the same consumer groups, so partitions are spread
+across them. Crashed children are restarted with exponential backoff,
+SIGTERM is forwarded to the children and they are given
+`shutdown_timeout` seconds to drain. Children report their metrics and
+consumer lag to the parent over a queue with every heartbeat.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.process import BaseProcess
+import queue
+import signal
+import time
+
+from src.config import settings
+from src.logging_conf import configure_logging
+from src.metrics import get_metrics, merge_metrics
+
+logger = logging.getLogger(__name__)
+
+
+###################
+## CHILD PROCESS ##
+###################
+
+
+def run_worker(index: int, heartbeats, reports) -> None:
+    configure_logging(level=settings.logging.log_level)
+    # reports are best effort, never block the exit on an unread queue
+    reports.cancel_join_thread()
+    asyncio.run(_worker_main(index, heartbeats, reports))
+
+
+async def _worker_main(index: int, heartbeats, reports) -> None:
+    from src.broker.utils import get_consumers_lag
+    from src.worker import start_worker, stop_worker
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    async def beat() -> None:
+        while True:
+            heartbeats[index] = time.time()
+            reports.put(
+                (index, {"metrics": get_metrics(), "consumers": get_consumers_lag()})
+            )
+            await asyncio.sleep(settings.supervisor.heartbeat_interval)
+
+    await start_worker()
+    heartbeat = asyncio.create_task(beat())
+    logger.info("Worker %s started", index)
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Worker %s draining", index)
+        heartbeat.cancel()
+        await stop_worker()
+        logger.info("Worker %s stopped", index)
+
+
+################
+## SUPERVISOR ##
+################
+
+
+class Supervisor:
+    def __init__(
+        self,
+        workers: int,
+        heartbeat_timeout: float,
+        restart_delay: float,
+        shutdown_timeout: float,
+        restart_max_delay: float = 60.0,
+    ) -> None:
+        self.workers = workers
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restart_delay = restart_delay
+        self.restart_max_delay = restart_max_delay
+        self.shutdown_timeout = shutdown_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self.heartbeats = self._ctx.Array("d", workers, lock=False)
+        self.reports = self._ctx.Queue()
+        self.processes: list[BaseProcess | None] = [None] * workers
+        self.restarts = [0] * workers
+        # latest report of every worker: {"metrics": ..., "consumers": ...}
+        self.stats: dict[int, dict] = {}
+        # crashes in a row, reset once a worker stays up for restart_max_delay
+        self._crashes = [0] * workers
+        self._started_at = [0.0] * workers
+        self._restart_at: list[float | None] = [None] * workers
+        self._monitor: asyncio.Task | None = None
+        self._collector: asyncio.Task | None = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+        self._collector = asyncio.create_task(self._collect())
+        self._monitor = asyncio.create_task(self._watch())
+        logger.info("Supervisor started %s workers", self.workers)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()  # SIGTERM, the worker drains and exits
+        await asyncio.to_thread(self._join_all)
+        # read reports until the children are gone, so none blocks on a full pipe
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+        logger.info("Supervisor stopped")
+
+    def metrics(self) -> dict:
+        """Metrics summed over the workers, with the per-worker values."""
+        workers = {index: report["metrics"] for index, report in self.stats.items()}
+        return {
+            **merge_metrics(list(workers.values())),
+            "workers": workers,
+        }
+
+    def consumers_lag(self) -> dict[str, dict]:
+        """Lag of every partition, tagged with the worker that owns it."""
+        result: dict[str, dict] = {}
+        for index, report in self.stats.items():
+            for topic, partitions in report["consumers"].items():
+                for name, lag in partitions.items():
+                    result.setdefault(topic, {})[name] = {**lag, "worker": index}
+        return result
+
+    def health(self) -> dict:
+        now = time.time()
+        workers = []
+        for index, process in enumerate(self.processes):
+            alive = process is not None and process.is_alive()
+            last_beat = self.heartbeats[index]
+            heartbeat_age = now - last_beat if last_beat else None
+            workers.append(
+                {
+                    "index": index,
+                    "pid": process.pid if process is not None else None,
+                    "alive": alive,
+                    "restarts": self.restarts[index],
+                    "restart_at": self._restart_at[index],
+                    "heartbeat_age": heartbeat_age,
+                    "healthy": alive
+                    and heartbeat_age is not None
+                    and heartbeat_age < self.heartbeat_timeout,
+                }
+            )
+        status = "OK" if all(w["healthy"] for w in workers) else "DEGRADED"
+        return {"status": status, "workers": workers}
+
+    def _spawn(self, index: int) -> None:
+        self.heartbeats[index] = 0.0
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(index, self.heartbeats, self.reports),
+            name=f"consumer-worker-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info("Worker %s spawned, pid: %s", index, process.pid)
+
+    def _restart_delay(self, index: int) -> float:
+        if time.monotonic() - self._started_at[index] >= self.restart_max_delay:
+            self._crashes[index] = 0
+        delay = min(
+            self.restart_delay * 2 ** self._crashes[index], self.restart_max_delay
+        )
+        self._crashes[index] += 1
+        return delay
+
+    async def _watch(self) -> None:
+        while not self._stopping:
+            now = time.monotonic()
+            for index, process in enumerate(self.processes):
+                if process is None or process.is_alive():
+                    continue
+                if self._restart_at[index] is None:
+                    delay = self._restart_delay(index)
+                    self._restart_at[index] = now + delay
+                    self.stats.pop(index, None)
+                    logger.error(
+                        "Worker %s (pid %s) exited with code %s, restarting in %.1fs",
+                        index,
+                        process.pid,
+                        process.exitcode,
+                        delay,
+                    )
+                restart_at = self._restart_at[index]
+                if restart_at is not None and now >= restart_at:
+                    self._restart_at[index] = None
+                    self.restarts[index] += 1
+                    self._spawn(index)
+            await asyncio.sleep(min(self.restart_delay, 1.0))
+
+    async def _collect(self) -> None:
+        while True:
+            try:
+                index, report = await asyncio.to_thread(self.reports.get, True, 1.0)
+            except queue.Empty:
+                continue
+            self.stats[index] = report
+
+    def _join_all(self) -> None:
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning("Worker pid %s did not stop in time, killing", process.pid)
+                process.kill()
+                process.join()
+
+
+#########################
+## SUPERVISOR INSTANCE ##
+#########################
+
+# Created by the app on startup, never at import: the spawned children
+# import this module too
+_supervisor: Supervisor | None = None
+
+
+async def start_supervisor() -> Supervisor:
+    global _supervisor
+    if _supervisor is None:
+        supervisor = Supervisor(
+            workers=settings.supervisor.workers,
+            heartbeat_timeout=settings.supervisor.heartbeat_timeout,
+            restart_delay=settings.supervisor.restart_delay,
+            restart_max_delay=settings.supervisor.restart_max_delay,
+            shutdown_timeout=settings.supervisor.shutdown_timeout,
+        )
+        await supervisor.start()
+        _supervisor = supervisor
+    return _supervisor
+
+
+async def stop_supervisor() -> None:
+    global _supervisor
+    if _supervisor is None:
+        return
+    try:
+        await _supervisor.stop()
+    finally:
+        _supervisor = None
+
+
+def get_supervisor() -> Supervisor | None:
+    return _supervisor
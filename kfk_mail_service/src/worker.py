@@ -0,0 +1,33 @@
+"""
+Consumer worker lifecycle module
+"""
+
+from src.broker.checkpoints import start_checkpoint_store, stop_checkpoint_store
+from src.broker.producer import start_producer, stop_producer
+from src.broker.utils import start_consumers, stop_consumers
+from src.smtp.dependencies import close_smtp_service, start_smtp_service
+from src.smtp.message import start_render_executor, stop_render_executor
+from src.smtp.templates import start_template_registry, stop_template_registry
+from src.config import settings
+from src.storage.dependencies import close_storage
+
+
+async def start_worker() -> None:
+    await start_template_registry()
+    await start_render_executor()
+    if settings.checkpoint.enabled:
+        await start_checkpoint_store()
+    await start_smtp_service()
+    await start_producer()
+    await start_consumers()
+
+
+async def stop_worker() -> None:
+    # consumers first, so their pending replies are flushed by stop_producer
+    await stop_consumers()
+    await stop_producer()
+    await close_smtp_service()
+    await stop_render_executor()
+    await close_storage()
+    await stop_checkpoint_store()
+    await stop_template_registry()
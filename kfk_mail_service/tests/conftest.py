@@ -0,0 +1,19 @@
+import os
+
+# Settings() is built at import time, give the required fields test values
+# so that the unit tests run without a .env file
+for name, value in {
+    "APP_CONFIG__PROJECT_NAME": "mail-service-test",
+    "APP_CONFIG__MODE": "TEST",
+    "APP_CONFIG__LOGGING__LOG_LEVEL": "WARNING",
+    "APP_CONFIG__SMTP__SMTP_HOST": "localhost",
+    "APP_CONFIG__SMTP__SMTP_PORT": "25",
+    "APP_CONFIG__SMTP__SMTP_USER": "test",
+    "APP_CONFIG__SMTP__SMTP_PASS": "test",
+    "APP_CONFIG__SMTP__SMTP_TIMEOUT": "10",
+    "APP_CONFIG__SMTP__MAILDEV_HOST": "localhost",
+    "APP_CONFIG__SMTP__MAILDEV_PORT": "1025",
+    "APP_CONFIG__SMTP__SMTP_TYPE": "maildev",
+    "APP_CONFIG__BROKER__KAFKA_BOOTSTRAP_SERVERS": "localhost:9092",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,90 @@
+import codecs
+import io
+
+import pytest
+
+from src.storage.storage import (
+    LocalStorageService,
+    _LineReader,
+    read_csv_batches,
+    read_csv_file,
+)
+
+HEADER = "subject,from_email,to_email,message_body\r\n"
+ROWS = [
+    'Hello,sender@example.com,user0@example.com,"Two\r\nlines"\r\n',
+    '"Comma, quoted",sender@example.com,user1@example.com,Body\r\n',
+    'Ünïcödé,sender@example.com,user2@example.com,""\r\n',
+    'Quote ""inside"",sender@example.com,user3@example.com,Body\r\n',
+    "Last,sender@example.com,user4@example.com,\r\n",
+]
+DATA = codecs.BOM_UTF8 + (HEADER + "".join(ROWS)).encode()
+FIELDNAMES = ["subject", "from_email", "to_email", "message_body"]
+
+
+def row_ends() -> list[int]:
+    """Absolute byte offset after every row, the header included."""
+    ends, position = [], len(codecs.BOM_UTF8)
+    for line in [HEADER, *ROWS]:
+        position += len(line.encode())
+        ends.append(position)
+    return ends
+
+
+@pytest.fixture
+def storage(tmp_path):
+    # one-byte chunks split every multi-byte character and CRLF
+    storage = LocalStorageService(filetype="csv", base_path=str(tmp_path), chunk_size=1)
+    (tmp_path / "campaign.csv").write_bytes(DATA)
+    return storage
+
+
+async def collect(batches) -> tuple[tuple[str, ...], list[list[str]], list[int]]:
+    header, rows, offsets = (), [], []
+    async for batch in batches:
+        header = batch.header
+        rows += batch.rows
+        offsets += batch.offsets
+    return header, rows, offsets
+
+
+def test_line_reader_strips_bom_and_counts_bytes():
+    lines = _LineReader(io.BufferedReader(io.BytesIO(DATA), buffer_size=7), offset=0)
+    assert next(lines) == HEADER
+    assert lines.offset == row_ends()[0]
+    assert list(lines) == "".join(ROWS).splitlines(keepends=True)
+    assert lines.offset == len(DATA)
+
+
+def test_line_reader_keeps_bom_past_the_start():
+    lines = _LineReader(io.BufferedReader(io.BytesIO(DATA)), offset=3)
+    assert next(lines).startswith("\ufeff")
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+async def test_batches_match_aiocsv(storage, batch_size):
+    header, rows, offsets = await collect(
+        read_csv_batches(storage, "campaign.csv", batch_size=batch_size)
+    )
+    expected = [row async for row in read_csv_file(storage, "campaign.csv")]
+
+    assert list(header) == FIELDNAMES
+    assert [dict(zip(header, row)) for row in rows] == expected
+    assert rows[0][3] == "Two\r\nlines"
+    assert offsets == row_ends()[1:]
+
+
+async def test_resume_from_a_row_offset(storage):
+    ends = row_ends()
+    _, rows, offsets = await collect(
+        read_csv_batches(
+            storage, "campaign.csv", start=ends[2], end=ends[4], fieldnames=FIELDNAMES
+        )
+    )
+    assert [row[2] for row in rows] == ["user2@example.com", "user3@example.com"]
+    assert offsets == ends[3:5]
+
+
+async def test_missing_file(storage):
+    with pytest.raises(FileNotFoundError):
+        await collect(read_csv_batches(storage, "missing.csv"))
@@ -0,0 +1,183 @@
+import asyncio
+from email.message import EmailMessage
+
+import pytest
+
+from src.broker.checkpoints import CheckpointStore
+from src.broker.pipeline import CsvDispatchPipeline
+from src.config import settings
+from src.smtp.message import start_render_executor, stop_render_executor
+from src.smtp.templates import start_template_registry, stop_template_registry
+from src.storage.storage import CsvBatch
+
+HEADER = ("subject", "from_email", "to_email", "message_body", "file_id", "shard")
+ROWS = 10
+
+
+class MailService:
+    def __init__(self, hang_after: int | None = None):
+        self.sent: list[str] = []
+        # sends past this many never return, as on a process that is dying
+        self.hang_after = hang_after
+
+    async def send_email(self, message: EmailMessage) -> None:
+        if self.hang_after is not None and len(self.sent) >= self.hang_after:
+            await asyncio.Event().wait()
+        self.sent.append(message["To"])
+
+
+class Producer:
+    """Reply publisher that records what was published at every flush."""
+
+    def __init__(self, fail_flush: int | None = None):
+        self.queued: list = []
+        self.published: list = []
+        self.flushes = 0
+        self.fail_flush = fail_flush
+
+    async def send_message(self, value) -> None:
+        self.queued.append(value)
+
+    async def flush(self) -> None:
+        self.flushes += 1
+        if self.flushes == self.fail_flush:
+            self.queued.clear()
+            raise Exception("Failed to send replies")
+        self.published += self.queued
+        self.queued.clear()
+
+
+async def batches(start_row: int = 0):
+    rows, offsets = [], []
+    for i in range(start_row, ROWS):
+        # a CSV may carry columns named like the reply fields
+        to_email = f"user{i}@example.com"
+        rows.append([f"Subject {i}", "sender@example.com", to_email, "", "x", "y"])
+        offsets.append(100 * (i + 1))
+    yield CsvBatch(header=HEADER, rows=rows, offsets=offsets)
+
+
+@pytest.fixture(autouse=True)
+async def rendering(monkeypatch):
+    monkeypatch.setattr(settings.checkpoint, "interval_rows", 4)
+    await start_template_registry()
+    await start_render_executor()
+    yield
+    await stop_render_executor()
+    await stop_template_registry()
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    await store.start()
+    yield store
+    await store.stop()
+
+
+def pipeline(producer: Producer, mail_service: MailService, checkpoint=None):
+    return CsvDispatchPipeline(
+        mail_service=mail_service,  # type: ignore
+        producer=producer,  # type: ignore
+        render_workers=2,
+        send_workers=3,
+        queue_size=4,
+        file_id=7,
+        shard=1,
+        checkpoint=checkpoint,
+    )
+
+
+async def test_checkpoint_covers_published_replies_only(store):
+    producer, mail_service = Producer(), MailService()
+    checkpoint = await store.open("7:1", 0, None)
+    saved: list[tuple[int, int]] = []
+    save = store.save
+
+    async def recording_save(campaign, progress):
+        saved.append((progress[0], len(producer.published)))
+        await save(campaign, progress)
+
+    store.save = recording_save  # type: ignore
+    await pipeline(producer, mail_service, checkpoint).run_batches(batches())
+
+    assert len(mail_service.sent) == ROWS
+    assert [(r.file_id, r.shard, r.status) for r in producer.published] == [
+        (7, 1, "success")
+    ] * ROWS
+    # one write per interval_rows rows plus the final one, never ahead of the replies
+    assert 2 <= len(saved) <= 3
+    assert all(row_offset <= published for row_offset, published in saved)
+
+    reopened = await store.open("7:1", 0, None)
+    assert (reopened.done, reopened.row_offset, reopened.byte_offset) == (True, ROWS, 1000)
+
+
+async def test_redelivered_rows_are_replied_to_not_sent(store):
+    for index in (3, 5):
+        await store.mark_sent("7:1", index)
+    await store.save("7:1", (3, 300, list(HEADER), False))
+
+    producer, mail_service = Producer(), MailService()
+    checkpoint = await store.open("7:1", 0, None)
+    assert checkpoint.row_offset == 3
+    await pipeline(producer, mail_service, checkpoint).run_batches(batches(start_row=3))
+
+    assert sorted(mail_service.sent) == sorted(
+        f"user{i}@example.com" for i in (4, 6, 7, 8, 9)
+    )
+    assert sorted(r.to_email for r in producer.published) == [
+        f"user{i}@example.com" for i in range(3, ROWS)
+    ]
+    # the client recognizes the replies of rows it already stored by their index
+    assert sorted(r.row_index for r in producer.published) == list(range(3, ROWS))
+
+
+async def test_lost_replies_keep_the_checkpoint_behind(store):
+    producer, mail_service = Producer(fail_flush=1), MailService()
+    checkpoint = await store.open("7:1", 0, None)
+
+    with pytest.raises(Exception, match="Failed to send replies"):
+        await pipeline(producer, mail_service, checkpoint).run_batches(batches())
+
+    reopened = await store.open("7:1", 0, None)
+    assert (reopened.done, reopened.row_offset) == (False, 0)
+    # the sent rows are still known, a redelivery replies without sending again
+    assert reopened.sent == {
+        int(to.removeprefix("user").removesuffix("@example.com"))
+        for to in mail_service.sent
+    }
+
+
+async def test_crash_between_checkpoints_sends_nothing_twice(store, monkeypatch):
+    producer, mail_service = Producer(), MailService(hang_after=6)
+    checkpoint = await store.open("7:1", 0, None)
+    run = asyncio.create_task(
+        pipeline(producer, mail_service, checkpoint).run_batches(batches())
+    )
+    async with asyncio.timeout(2):
+        while len(mail_service.sent) < 6:
+            await asyncio.sleep(0.01)
+
+    # the process dies: no checkpoint is written on the way down
+    async def lost_save(campaign, progress):
+        pass
+
+    save = store.save
+    monkeypatch.setattr(store, "save", lost_save)
+    run.cancel()
+    await asyncio.gather(run, return_exceptions=True)
+    monkeypatch.setattr(store, "save", save)
+
+    reopened = await store.open("7:1", 0, None)
+    # the checkpoint is behind rows that were sent
+    assert reopened.row_offset < 6
+    redelivery = MailService()
+    await pipeline(Producer(), redelivery, reopened).run_batches(
+        batches(start_row=reopened.row_offset)
+    )
+
+    assert not set(mail_service.sent) & set(redelivery.sent)
+    assert sorted(mail_service.sent + redelivery.sent) == sorted(
+        f"user{i}@example.com" for i in range(ROWS)
+    )
@@ -0,0 +1,87 @@
+import asyncio
+
+from pydantic import BaseModel
+import pytest
+
+from src.broker.producer import BufferedBrokerProducer
+
+
+class Reply(BaseModel):
+    row: int
+
+
+class KafkaProducer:
+    """AIOKafkaProducer.send() over an in-memory topic."""
+
+    def __init__(self) -> None:
+        self.published: list[int] = []
+        # rows whose send() raises, and rows that are never acknowledged
+        self.refuse: dict[int, int] = {}
+        self.lose: set[int] = set()
+
+    async def send(self, topic: str, value: bytes) -> asyncio.Future:
+        row = Reply.model_validate_json(value).row
+        if self.refuse.get(row):
+            self.refuse[row] -= 1
+            raise Exception(f"Buffer full at row {row}")
+        ack = asyncio.get_running_loop().create_future()
+        if row in self.lose:
+            ack.set_exception(Exception(f"Row {row} timed out"))
+        else:
+            self.published.append(row)
+            ack.set_result(None)
+        return ack
+
+
+@pytest.fixture
+async def kafka():
+    return KafkaProducer()
+
+
+@pytest.fixture
+async def publisher(kafka):
+    publisher = BufferedBrokerProducer(
+        kafka,  # type: ignore[arg-type]
+        "replies",
+        linger_ms=5,
+        max_batch_size=10,
+        queue_size=100,
+        max_retries=2,
+        retry_backoff_ms=1,
+    )
+    await publisher.start()
+    yield publisher
+    await publisher.stop()
+
+
+async def test_flush_raises_only_the_callers_failures(kafka, publisher):
+    kafka.lose = {1}
+    consumer = publisher.scope()
+    first, second = consumer.scope(), consumer.scope()
+
+    await first.send_message(Reply(row=1))
+    await second.send_message(Reply(row=2))
+
+    # the second caller flushes first, the failure of the first is not its own
+    await second.flush()
+    with pytest.raises(Exception, match="Failed to send 1 replies"):
+        await first.flush()
+    # both are the consumer's replies
+    with pytest.raises(Exception, match="Failed to send 1 replies"):
+        await consumer.flush()
+
+    # reported once
+    await first.flush()
+    await consumer.flush()
+    assert kafka.published == [2]
+
+
+async def test_only_unsent_messages_are_retried(kafka, publisher):
+    kafka.refuse = {2: 1, 4: 2}
+    replies = publisher.scope()
+
+    for row in range(6):
+        await replies.send_message(Reply(row=row))
+    await replies.flush()
+
+    assert sorted(kafka.published) == list(range(6))